@@ -1,12 +1,33 @@
 import streamlit as st
+import numpy as np
 import pandas as pd
 from datetime import datetime
 import calendar
-from scheduler import generate_schedule
-from export_utils import generate_excel
+from scheduler import repair_schedule
+from export_utils import generate_workbook
+from feasibility import analyze_feasibility, describe, solve_checked
+from schedule_matrix import DAY, NIGHT, schedule_pivot, schedule_stats, schedule_to_matrix
+from schedule_cache import ScheduleCache, schedule_key
+from schedule_store import ScheduleStore
+from solution_pool import default_min_changes, solve_alternatives
+from solve_jobs import CANCELLED, DONE, ERROR, QUEUED, SolveJobManager
+from what_if import evaluate_leave_requests
 
 st.set_page_config(page_title="Générateur de Planning Intelligent", layout="wide")
 
+@st.cache_resource
+def get_schedule_cache():
+    return ScheduleCache()
+
+@st.cache_resource
+def get_schedule_store():
+    return ScheduleStore()
+
+@st.cache_resource
+def get_job_manager():
+    # Pool partagé par toutes les sessions : les résolutions survivent aux ré-exécutions du script
+    return SolveJobManager(cache=get_schedule_cache())
+
 st.title("📅 Générateur de Planning Mensuel")
 st.markdown("Système pour une planification équitable et flexible.")
 
@@ -44,6 +65,36 @@ with st.sidebar:
             help="Ces jours impactent uniquement les jours de travail de Mme Mliyani."
         )
 
+    st.divider()
+    with st.expander("⏱️ Critères d'arrêt", expanded=False):
+        max_time = st.number_input("Délai maximal (s)", min_value=5, max_value=600, value=120, step=5)
+        gap_pct = st.number_input("Écart relatif visé (%)", min_value=0.0, max_value=50.0, value=0.0, step=0.5,
+                                  help="Arrête dès que la solution est à moins de ce pourcentage de l'optimum (0 = désactivé).")
+        no_improvement = st.number_input("Arrêt sans amélioration (s)", min_value=0, max_value=600, value=0, step=5,
+                                         help="Arrête si aucune meilleure solution n'est trouvée pendant ce délai (0 = désactivé).")
+        model_kind = st.selectbox("Formulation du modèle", ["standard", "compact", "template"],
+                                  help="« compact » : même objectif, modèle plus petit (utile pour les grandes équipes). "
+                                       "« template » : modèle standard réutilisé d'une résolution à l'autre (construction plus rapide).")
+        objective_mode = st.selectbox("Objectif", ["weighted", "lexicographic"],
+                                      format_func={"weighted": "Pondéré", "lexicographic": "Hiérarchique"}.get,
+                                      help="« Hiérarchique » : les règles critiques sont optimisées d'abord, puis les "
+                                           "suivantes sans dégrader les précédentes (délai réparti par niveau).")
+    stop_rules = {"max_time": max_time, "relative_gap": gap_pct / 100, "no_improvement": no_improvement}
+
+    with st.expander("🗄️ Plannings publiés", expanded=False):
+        team_name = st.text_input("Équipe", value="Équipe principale",
+                                  help="Les plannings publiés sont enregistrés par équipe.")
+        use_stored_history = st.checkbox("Reprendre l'historique enregistré", value=True,
+                                         help="Pré-remplit les 3 derniers jours du mois précédent à partir du planning publié.")
+        carry_fairness = st.checkbox("Équité depuis le début de l'année", value=True,
+                                     help="Les matins, nuits et jours disponibles des mois publiés comptent dans l'équité.")
+
+    with st.expander("♻️ Re-calcul après modification", expanded=False):
+        warm_start = st.checkbox("Partir du dernier planning généré", value=True,
+                                 help="Le planning précédent sert de point de départ au solveur (re-calcul plus rapide).")
+        change_penalty = st.number_input("Pénalité par journée modifiée", min_value=0, max_value=1000, value=0, step=10,
+                                         help="Décourage les changements inutiles par rapport au planning précédent (0 = désactivé).")
+
 # --- INTERFACE PRINCIPALE ---
 col_c1, col_c2 = st.columns([2, 1])
 
@@ -63,13 +114,19 @@ with col_c2:
     st.header("⏳ Continuité")
     # Historique de continuité
     history_input = {}
+    stored_history = {}
+    if use_stored_history:
+        stored_history = get_schedule_store().history(team_name, year, month, [e['name'] for e in employees])
     with st.expander("Historique (3 derniers jours)", expanded=False):
         for emp in employees:
             st.markdown(f"**{emp['name']}**")
             h_cols = st.columns(3)
-            h3 = h_cols[0].selectbox("J-3", ["REP", "DAY", "NIGHT"], key=f"h3_{emp['name']}")
-            h2 = h_cols[1].selectbox("J-2", ["REP", "DAY", "NIGHT"], key=f"h2_{emp['name']}")
-            h1 = h_cols[2].selectbox("J-1", ["REP", "DAY", "NIGHT"], key=f"h1_{emp['name']}")
+            # Valeurs par défaut : planning publié du mois précédent (clé par période pour les rafraîchir)
+            defaults = stored_history.get(emp['name'], ["REP", "REP", "REP"])
+            suffix = f"{team_name}_{year}_{month}_{emp['name']}" if use_stored_history else emp['name']
+            h3 = h_cols[0].selectbox("J-3", ["REP", "DAY", "NIGHT"], index=["REP", "DAY", "NIGHT"].index(defaults[0]), key=f"h3_{suffix}")
+            h2 = h_cols[1].selectbox("J-2", ["REP", "DAY", "NIGHT"], index=["REP", "DAY", "NIGHT"].index(defaults[1]), key=f"h2_{suffix}")
+            h1 = h_cols[2].selectbox("J-1", ["REP", "DAY", "NIGHT"], index=["REP", "DAY", "NIGHT"].index(defaults[2]), key=f"h1_{suffix}")
             history_input[emp['name']] = [h3, h2, h1]
 
 # Fusion des congés : Uniquement les congés personnels
@@ -78,97 +135,358 @@ leaves = personal_leaves.copy()
 st.divider()
 
 # --- GÉNÉRATION ---
-if st.button("🚀 Générer le Planning Optimisé", type="primary", width='stretch'):
-    with st.spinner("L'application de Abdennour Ryahi calcule la meilleure solution..."):
-        try:
-            params = {"holidays": holidays, "history": history_input}
-            df_result = generate_schedule(year, month, employees, leaves, params)
-            
-            if df_result is not None:
-                st.success("✅ Planning généré avec succès !")
-                
-                # --- DASHBOARD ---
-                st.header("📊 Équité & Statistiques")
-                
-                # Couleurs
-                AGENT_COLORS = ["#E8F5E9", "#FFF3E0", "#E1F5FE", "#F3E5F5", "#FBE9E7", "#EFEBE9", "#F1F8E9", "#FFFDE7"]
-                text_colors = ["#2E7D32", "#EF6C00", "#0277BD", "#7B1FA2", "#D84315", "#4E342E", "#558B2F", "#F9A825"]
-                color_map = {emp['name']: (AGENT_COLORS[idx % 8], text_colors[idx % 8]) for idx, emp in enumerate(employees)}
-
-                # Stats
-                stats = []
-                for emp in employees:
-                    name = emp['name']
-                    m_count = sum(1 for row in df_result["Matin"] if name in [n.strip() for n in str(row).split(",")])
-                    n_count = sum(1 for row in df_result["Nuit"] if name in [n.strip() for n in str(row).split(",")])
-                    total = m_count + n_count
-                    avail = num_days - len(leaves.get(name, []))
-                    charge = (total / avail * 100) if avail > 0 else 0
-                    stats.append({
-                        "Agent": name, "Matins": m_count, "Nuits": n_count, "Total": total, 
-                        "Charge %": round(charge, 1)
-                    })
-                df_stats = pd.DataFrame(stats)
-                
-                st.dataframe(df_stats, hide_index=True, width='stretch')
-                st.bar_chart(df_stats.set_index("Agent")[["Matins", "Nuits"]], color=["#ffaa00", "#5555ff"])
-
-                # --- TABS FOR VIEWS ---
-                st.header("📅 Planning")
-                
-                tab_global, tab_agent = st.tabs(["Vue Globale", "Vue par Agent"])
-                
-                with tab_global:
-                    def colorize(cell):
-                        if not isinstance(cell, str) or "," not in cell: return cell
-                        names = [n.strip() for n in cell.split(",")]
-                        spans = []
-                        for n in names:
-                            bg, fg = color_map.get(n, ("#ddd", "#333"))
-                            spans.append(f'<span style="background-color:{bg}; color:{fg}; padding:2px 6px; border-radius:4px; font-weight:bold; margin-right:2px;">{n}</span>')
-                        return " ".join(spans)
-
-                    df_styled = df_result.copy()
-                    df_styled["Matin"] = df_styled["Matin"].apply(colorize)
-                    df_styled["Nuit"] = df_styled["Nuit"].apply(colorize)
-                    st.write(df_styled.to_html(escape=False, index=False), unsafe_allow_html=True)
-                    
-                    st.divider()
-                    excel_data = generate_excel(df_result)
-                    st.download_button("📥 Télécharger Excel Global", excel_data, f"Planning_Global_{month}.xlsx", width='stretch')
-                
-                with tab_agent:
-                    # Helper function for pivot view
-                    def transform_schedule_to_pivot(df, emp_list):
-                        days = sorted(df["Jour"].unique())
-                        agent_names = [e["name"] for e in emp_list]
-                        pivot_df = pd.DataFrame("", index=agent_names, columns=days)
-                        for _, row in df.iterrows():
-                            day = row["Jour"]
-                            for agent in row["Matin"].split(","):
-                                agent = agent.strip()
-                                if agent in pivot_df.index: pivot_df.at[agent, day] = "J"
-                            for agent in row["Nuit"].split(","):
-                                agent = agent.strip()
-                                if agent in pivot_df.index: pivot_df.at[agent, day] = "N"
-                        return pivot_df
-
-                    df_pivot = transform_schedule_to_pivot(df_result, employees)
-                    
-                    def style_pivot(val):
-                        if val == "J": return 'background-color: #FFF9C4; color: #F57F17; font-weight: bold; text-align: center;'
-                        elif val == "N": return 'background-color: #E8EAF6; color: #3F51B5; font-weight: bold; text-align: center;'
-                        return 'text-align: center;'
-
-                    st.dataframe(df_pivot.style.map(style_pivot), width='stretch')
-                    
-                    # Download Agent Pivot Excel
-                    import io
-                    towrap = io.BytesIO()
-                    df_pivot.to_excel(towrap, index=True)
-                    st.download_button("📥 Télécharger Excel par Agent", towrap.getvalue(), f"Planning_Agents_{month}.xlsx", width='stretch')
+params = {"holidays": holidays, "history": history_input, "stop_rules": stop_rules, "model": model_kind,
+          "objective_mode": objective_mode}
+if carry_fairness and month > 1:
+    params["carry_over"] = get_schedule_store().carry_over(team_name, year, month, [e['name'] for e in employees])
+# Le planning précédent n'est réutilisé que s'il porte sur le même mois
+if warm_start and st.session_state.get("schedule_result") is not None \
+        and st.session_state.get("schedule_period") == (year, month):
+    params["previous_schedule"] = st.session_state.get("schedule_matrix") or st.session_state["schedule_result"]
+    params["change_penalty"] = change_penalty
+
+def adopt_result(result):
+    """Conserve un résultat de solve_schedule comme planning courant."""
+    st.session_state["schedule_result"] = result["schedule"]
+    st.session_state["schedule_run"] = result
+    if result["matrix"] is not None:
+        st.session_state["schedule_matrix"] = dict(zip(result["agents"], result["matrix"]))
+    analysis = result.get("feasibility")
+    if analysis is not None and analysis["feasible"] is False:
+        st.session_state["solve_message"] = "⚠️ Aucun planning possible avec ces congés :"
+        st.session_state["infeasibility"] = describe(analysis)
+    elif result["schedule"] is None:
+        st.session_state["solve_message"] = "⚠️ Aucune solution trouvée."
+
+manager = get_job_manager()
+
+# Calculs de fond sur le planning courant (clés de st.session_state des jobs)
+TASK_JOBS = ("repair_job", "alternatives_job", "what_if_job")
+
+def finished_task(key):
+    """
+    Job terminé de la tâche `key`, récupéré une seule fois (None s'il tourne encore,
+    s'il n'y en a pas ou s'il n'a pas abouti : l'échec est alors affiché).
+    """
+    job_id = st.session_state.get(key)
+    job = manager.get(job_id) if job_id else None
+    if not job_id or (job is not None and not job.done):
+        return None
+    st.session_state.pop(key)
+    manager.forget(job_id)
+    if job is None:
+        st.error("⚠️ Le calcul a été interrompu (redémarrage du serveur).")
+    elif job.status == ERROR:
+        st.error(f"Erreur: {job.error}")
+    elif job.status == CANCELLED:
+        st.toast("⏹️ Calcul annulé.")
+    return job if job is not None and job.status == DONE else None
+
+@st.fragment(run_every=1.0)
+def task_progress(key, message):
+    """Suivi d'une tâche de fond, rafraîchi chaque seconde ; arrêt en gardant les résultats, ou annulation."""
+    job = manager.get(st.session_state.get(key))
+    if job is None:
+        return
+    if job.done:
+        st.rerun(scope="app")
+    if job.status == QUEUED:
+        st.info("⏳ En attente d'un solveur disponible (autres calculs en cours sur le serveur)...")
+    else:
+        st.info(f"⏳ {message} — {job.elapsed:.0f} s, {len(job.partial)} résultat(s) intermédiaire(s) "
+                "(vous pouvez continuer à utiliser la page).")
+    c_keep, c_cancel = st.columns(2)
+    c_keep.button("✋ Arrêter et garder les résultats", key=f"{key}_keep", width='stretch',
+                  disabled=not job.partial, on_click=job.cancel, kwargs={"keep_best": True})
+    c_cancel.button("⏹️ Annuler", key=f"{key}_cancel", width='stretch', on_click=job.cancel)
+
+run_clicked = st.button("🚀 Générer le Planning Optimisé", type="primary", width='stretch')
+
+if run_clicked:
+    # Nouvelle résolution : les calculs encore en cours sur l'ancien planning sont abandonnés
+    for key in ("solve_job", *TASK_JOBS):
+        previous_job = st.session_state.pop(key, None)
+        if previous_job is not None:
+            manager.cancel(previous_job)
+    st.session_state["schedule_period"] = (year, month)
+    st.session_state["schedule_result"] = None
+    st.session_state["schedule_matrix"] = None
+    st.session_state["schedule_run"] = None
+    st.session_state["solve_message"] = None
+    st.session_state["infeasibility"] = None
+    st.session_state.pop("alternatives", None)
+    cache = get_schedule_cache()
+    cache_key = schedule_key(year, month, employees, leaves, params)
+    cached = cache.get(cache_key)
+    if cached is not None:
+        st.toast("⚡ Planning retrouvé dans le cache.")
+        adopt_result(cached)
+    else:
+        # Règles DURES vérifiées avant la résolution complète : le comptage (instantané) explique
+        # immédiatement un mois impossible ; la recherche de conflit CP-SAT a lieu dans le job, après
+        # une résolution sans planning
+        analysis = analyze_feasibility(year, month, employees, leaves, params, use_solver=False)
+        if analysis["feasible"] is False:
+            st.session_state["solve_message"] = "⚠️ Aucun planning possible avec ces congés :"
+            st.session_state["infeasibility"] = describe(analysis)
+        else:
+            st.session_state["solve_job"] = manager.submit(year, month, employees, leaves, params, cache_key=cache_key,
+                                                           solve=solve_checked)
+
+# Récupération d'une résolution terminée (éventuellement pendant une ré-exécution précédente)
+job_id = st.session_state.get("solve_job")
+job = manager.get(job_id) if job_id else None
+if job_id and (job is None or job.done):
+    st.session_state.pop("solve_job")
+    manager.forget(job_id)
+    if job is None:
+        st.session_state["solve_message"] = "⚠️ La résolution a été interrompue (redémarrage du serveur)."
+    elif job.status == DONE:
+        adopt_result(job.result)
+    elif job.status == ERROR:
+        st.session_state["solve_message"] = f"Erreur: {job.error}"
+    elif job.status == CANCELLED:
+        st.toast("⏹️ Résolution annulée.")
+    job = None
+
+if st.session_state.get("solve_message"):
+    st.error(st.session_state["solve_message"])
+    for line in st.session_state.get("infeasibility") or []:
+        st.markdown(f"- {line}")
+
+@st.fragment(run_every=1.0)
+def solve_progress():
+    """Suivi du job en cours, rafraîchi chaque seconde sans ré-exécuter toute la page."""
+    job = manager.get(st.session_state.get("solve_job"))
+    if job is None:
+        return
+    if job.done:
+        st.rerun(scope="app")
+
+    info = job.latest
+    if job.status == QUEUED:
+        st.info("⏳ En attente d'un solveur disponible (autres calculs en cours sur le serveur)...")
+    else:
+        st.info("L'application de Abdennour Ryahi calcule la meilleure solution... "
+                "(vous pouvez continuer à utiliser la page)")
+    m1, m2, m3, m4 = st.columns(4)
+    m1.metric("Pénalité actuelle", f"{info['objective']:.0f}" if info else "—")
+    m2.metric("Borne inférieure", f"{info['best_bound']:.0f}" if info else "—")
+    m3.metric("Écart", f"{info['gap'] * 100:.1f} %" if info else "—")
+    m4.metric("Temps écoulé", f"{job.elapsed:.1f} s")
+
+    c_keep, c_cancel = st.columns(2)
+    c_keep.button("✋ Garder cette solution", width='stretch', disabled=info is None,
+                  on_click=job.cancel, kwargs={"keep_best": True},
+                  help="Arrête la recherche et conserve la meilleure solution affichée.")
+    c_cancel.button("⏹️ Annuler", width='stretch', on_click=job.cancel,
+                    help="Arrête la recherche sans conserver de résultat.")
+
+    if len(job.progress) >= 2:
+        st.line_chart(pd.DataFrame(job.progress, columns=["Temps (s)", "Pénalité"]).set_index("Temps (s)"))
+    if info is not None:
+        st.dataframe(info["schedule"], hide_index=True, width='stretch')
+
+if job is not None:
+    solve_progress()
+
+df_result = st.session_state.get("schedule_result")
+if df_result is not None:
+    st.success("✅ Planning généré avec succès !")
+
+    # Matrice agent×jour (REST/DAY/NIGHT) alignée sur l'équipe actuelle : source des vues ci-dessous
+    agent_names = [e['name'] for e in employees]
+    schedule_rows = st.session_state.get("schedule_matrix")
+    matrix = schedule_to_matrix(schedule_rows if schedule_rows is not None else df_result, agent_names, num_days)
+
+    run = st.session_state.get("schedule_run")
+    if run is not None:
+        with st.expander("🔎 Diagnostics du solveur", expanded=False):
+            d1, d2, d3, d4 = st.columns(4)
+            d1.metric("Statut", run["status"])
+            d2.metric("Pénalité", f"{run['objective']:.0f}")
+            d3.metric("Borne inférieure", f"{run['best_bound']:.0f}")
+            d4.metric("Écart à l'optimum", f"{run['gap'] * 100:.1f} %")
+            d5, d6, d7, d8 = st.columns(4)
+            d5.metric("Résolution", f"{run['wall_time']:.1f} s")
+            d6.metric("Construction du modèle", f"{run['build_time']:.2f} s")
+            d7.metric("Branches", f"{run['num_branches']:,}")
+            d8.metric("Conflits", f"{run['num_conflicts']:,}")
+            st.caption(f"Modèle : {run['num_variables']:,} variables, {run['num_constraints']:,} contraintes "
+                       f"— {run['num_solutions']} solution(s) améliorante(s).")
+
+            g1, g2 = st.columns(2)
+            with g1:
+                st.markdown("**Taille du modèle par famille de règles**")
+                st.dataframe(pd.DataFrame.from_dict(run["model_size"], orient="index")
+                             .rename(columns={"variables": "Variables", "constraints": "Contraintes"}), width='stretch')
+            with g2:
+                st.markdown("**Pénalité réalisée par règle**")
+                st.dataframe(pd.Series(run["penalties_by_rule"], name="Pénalité"), width='stretch')
+            if run.get("tiers"):
+                st.markdown("**Objectif hiérarchique : résultat par niveau**")
+                st.dataframe(pd.DataFrame([{"Règles": ", ".join(t["rules"]), "Statut": t["status"],
+                                            "Pénalité": t["objective"], "Borne": t["best_bound"],
+                                            "Temps (s)": round(t["wall_time"], 1)} for t in run["tiers"]]),
+                             width='stretch', hide_index=True)
+            if run["penalty_breakdown"]:
+                st.markdown("**Pénalité par règle et par agent**")
+                breakdown = pd.DataFrame(run["penalty_breakdown"]).pivot_table(
+                    index="agent", columns="rule", values="penalty", aggfunc="sum", fill_value=0)
+                st.dataframe(breakdown, width='stretch')
+
+    p1, p2 = st.columns([3, 1])
+    p1.caption(f"Publier enregistre ce planning pour l'équipe « {team_name} » : il alimentera l'historique "
+               "et l'équité des mois suivants.")
+    if p2.button("💾 Publier ce planning", width='stretch'):
+        get_schedule_store().save_schedule(team_name, year, month, agent_names, matrix, leaves,
+                                           st.session_state.get("schedule_run"))
+        st.toast(f"💾 Planning {month:02d}/{year} publié pour « {team_name} ».")
+
+    with st.expander("🩹 Réparation en cours de mois", expanded=False):
+        st.caption("Les jours avant le jour choisi restent inchangés ; seuls les jours suivants sont recalculés "
+                   "avec les congés actuellement saisis (ex. arrêt maladie ajouté dans l'onglet Congés).")
+        r1, r2 = st.columns([2, 1])
+        repair_from = r1.number_input("Recalculer à partir du jour", min_value=1, max_value=num_days, value=1)
+        if r2.button("🩹 Réparer", width='stretch'):
+            if st.session_state.get("repair_job"):
+                manager.cancel(st.session_state["repair_job"])
+            st.session_state["repair_job"] = manager.submit(year, month, employees, leaves, params,
+                                                            solve=repair_schedule, published=matrix,
+                                                            from_day=repair_from)
+        repair_job = finished_task("repair_job")
+        if repair_job is not None:
+            if repair_job.result["schedule"] is not None:
+                adopt_result(repair_job.result)
+                st.rerun()
             else:
-                st.error("⚠️ Aucune solution trouvée.")
-        except Exception as e:
-            st.error(f"Erreur: {e}")
+                st.error("⚠️ Aucune solution trouvée pour la période restante.")
+        task_progress("repair_job", "Réparation du planning")
+
+    with st.expander("🔀 Plannings alternatifs", expanded=False):
+        st.caption("Plusieurs bons plannings, différents entre eux, calculés en une fois à partir de ce planning : "
+                   "passez de l'un à l'autre sans relancer la résolution.")
+        a1, a2, a3, a4 = st.columns([1, 1, 1, 1])
+        alt_count = a1.number_input("Plannings", min_value=2, max_value=6, value=3)
+        alt_changes = a2.number_input("Journées différentes (min.)", min_value=1, max_value=len(agent_names) * num_days,
+                                      value=default_min_changes(employees, num_days, params),
+                                      help="Nombre minimal de journées d'agent qui diffèrent entre deux plannings.")
+        alt_time = a3.number_input("Délai par alternative (s)", min_value=5, max_value=600, value=30, step=5)
+        if a4.button("🔀 Chercher", width='stretch') and run is not None:
+            if st.session_state.get("alternatives_job"):
+                manager.cancel(st.session_state["alternatives_job"])
+            st.session_state["alternatives_job"] = manager.submit(
+                year, month, employees, leaves, params, solve=solve_alternatives, callback="on_result",
+                count=alt_count, min_changes=alt_changes, best=run, time_limit=alt_time)
+        alternatives_job = finished_task("alternatives_job")
+        if alternatives_job is not None:
+            st.session_state["alternatives"] = alternatives_job.result
+            st.session_state["alternative_shown"] = 0
+        task_progress("alternatives_job", "Recherche de plannings alternatifs")
+        alternatives = st.session_state.get("alternatives")
+        if alternatives is not None:
+            solutions = alternatives["solutions"]
+            if len(solutions) < alt_count:
+                st.warning(f"{len(solutions) - 1} alternative(s) trouvée(s) (dernier statut : {alternatives['status']}).")
+            st.dataframe(pd.DataFrame([{
+                "Planning": "Référence" if i == 0 else f"Alternative {i}",
+                "Pénalité": sol["objective"],
+                "Δ Pénalité": sol["delta"],
+                "Journées modifiées": sol["changed_days"],
+                "Agents impactés": ", ".join(sol["affected"]),
+            } for i, sol in enumerate(solutions)]), hide_index=True, width='stretch')
+            shown = st.radio("Planning affiché", range(len(solutions)), horizontal=True,
+                             index=st.session_state.get("alternative_shown", 0),
+                             format_func=lambda i: "Référence" if i == 0 else f"Alternative {i}")
+            if shown != st.session_state.get("alternative_shown", 0):
+                st.session_state["alternative_shown"] = shown
+                adopt_result(solutions[shown])
+                st.rerun()
+
+    with st.expander("🔍 Simulation de demandes de congés", expanded=False):
+        st.caption("Avant d'accepter des demandes : chacune est simulée séparément à partir de ce planning "
+                   "(faisabilité, pénalité et équité en plus, agents dont le planning change).")
+        pending = st.session_state.setdefault("leave_requests", [])
+        w1, w2, w3 = st.columns([2, 3, 1])
+        request_agent = w1.selectbox("Agent", agent_names, key="what_if_agent")
+        request_days = w2.multiselect("Jours demandés", range(1, num_days + 1), key="what_if_days")
+        if w3.button("➕ Ajouter", width='stretch', disabled=not request_days):
+            pending.append({"id": f"D{len(pending) + 1}", "agent": request_agent, "days": sorted(request_days)})
+        if pending:
+            st.dataframe(pd.DataFrame([{"Demande": r["id"], "Agent": r["agent"], "Jours": ", ".join(map(str, r["days"]))}
+                                       for r in pending]), hide_index=True, width='stretch')
+            e1, e2 = st.columns(2)
+            if e1.button("🔍 Évaluer les demandes", type="primary", width='stretch'):
+                if st.session_state.get("what_if_job"):
+                    manager.cancel(st.session_state["what_if_job"])
+                st.session_state["what_if_job"] = manager.submit(
+                    year, month, employees, leaves, params, solve=evaluate_leave_requests, callback="on_result",
+                    requests=list(pending), base_schedule=matrix)
+            if e2.button("🗑️ Vider la liste", width='stretch'):
+                st.session_state["leave_requests"] = []
+                st.session_state.pop("what_if", None)
+                if st.session_state.get("what_if_job"):
+                    manager.cancel(st.session_state.pop("what_if_job"))
+                st.rerun()
+        what_if_job = finished_task("what_if_job")
+        if what_if_job is not None:
+            st.session_state["what_if"] = what_if_job.result
+        task_progress("what_if_job", f"Simulation de {len(pending)} demande(s)")
+        what_if = st.session_state.get("what_if")
+        if what_if is not None:
+            verdicts = {True: "✅ Oui", False: "❌ Non", None: "❓ Indéterminé"}
+            st.dataframe(pd.DataFrame([{
+                "Demande": sc["id"],
+                "Congés": "; ".join(f"{name} : {', '.join(map(str, days))}" for name, days in sc["leaves"].items()),
+                "Réalisable": verdicts[sc["feasible"]],
+                "Δ Pénalité": sc["delta"],
+                "Δ Équité": sc["fairness_delta"],
+                "Agents impactés": ", ".join(sc["affected"]),
+            } for sc in what_if["scenarios"]]), hide_index=True, width='stretch')
+            st.caption(f"Pénalité du planning de base : {what_if['base']['objective']} — "
+                       f"simulation en {what_if['wall_time']:.1f} s.")
+
+    # --- DASHBOARD ---
+    st.header("📊 Équité & Statistiques")
+
+    # Couleurs
+    AGENT_COLORS = ["#E8F5E9", "#FFF3E0", "#E1F5FE", "#F3E5F5", "#FBE9E7", "#EFEBE9", "#F1F8E9", "#FFFDE7"]
+    text_colors = ["#2E7D32", "#EF6C00", "#0277BD", "#7B1FA2", "#D84315", "#4E342E", "#558B2F", "#F9A825"]
+    color_map = {emp['name']: (AGENT_COLORS[idx % 8], text_colors[idx % 8]) for idx, emp in enumerate(employees)}
+
+    # Stats
+    available_days = [num_days - len(leaves.get(name, [])) for name in agent_names]
+    df_stats = schedule_stats(matrix, agent_names, available_days)
+
+    st.dataframe(df_stats, hide_index=True, width='stretch')
+    st.bar_chart(df_stats.set_index("Agent")[["Matins", "Nuits"]], color=["#ffaa00", "#5555ff"])
+
+    # --- TABS FOR VIEWS ---
+    st.header("📅 Planning")
+
+    tab_global, tab_agent = st.tabs(["Vue Globale", "Vue par Agent"])
+
+    with tab_global:
+        badges = np.array([
+            f'<span style="background-color:{color_map[n][0]}; color:{color_map[n][1]}; padding:2px 6px; border-radius:4px; font-weight:bold; margin-right:2px;">{n}</span>'
+            for n in agent_names], dtype=object)
+
+        df_styled = df_result.copy()
+        df_styled["Matin"] = [" ".join(badges[col == DAY]) for col in matrix.T]
+        df_styled["Nuit"] = [" ".join(badges[col == NIGHT]) for col in matrix.T]
+        st.write(df_styled.to_html(escape=False, index=False), unsafe_allow_html=True)
+
+    with tab_agent:
+        df_pivot = schedule_pivot(matrix, agent_names)
+
+        def style_pivot(val):
+            if val == "J": return 'background-color: #FFF9C4; color: #F57F17; font-weight: bold; text-align: center;'
+            elif val == "N": return 'background-color: #E8EAF6; color: #3F51B5; font-weight: bold; text-align: center;'
+            return 'text-align: center;'
+
+        st.dataframe(df_pivot.style.map(style_pivot), width='stretch')
 
+    # Un seul classeur : planning global, vue par agent, statistiques et diagnostics
+    excel_data = generate_workbook(df_result, matrix, agent_names, available_days, run)
+    st.download_button("📥 Télécharger Excel (planning, agents, statistiques, diagnostics)", excel_data,
+                       f"Planning_{year}-{month:02d}.xlsx", width='stretch')
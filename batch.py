@@ -0,0 +1,248 @@
+"""
+Génération de plannings en lot, sans interface (une équipe = un fichier).
+
+Usage :
+    python batch.py equipes/ --year 2026 --month 3 --output plannings/ --jobs 4
+
+Formats acceptés (un répertoire est parcouru pour ses fichiers .json et .csv) :
+
+- JSON : {"name", "year", "month", "employees": [{"name", "sex"}], "leaves": {nom: [jours]},
+  "holidays": [jours], "history": {nom: [J-3, J-2, J-1]}, "params": {...}}
+  (year/month/holidays peuvent venir de la ligne de commande).
+  Sur plusieurs mois ("months" ou --months) : "leaves_by_month" / "holidays_by_month"
+  indexés par "AAAA-MM" (cf. horizon.solve_horizon).
+- Sites génériques (postes, effectifs et postes autorisés en données) : JSON dont les
+  "params" contiennent "shift_types" ; résolus par engine.solve_engine (un seul mois).
+- CSV : une ligne par agent, colonnes name, sex, leaves (ex. "3;4;10-12"),
+  history (ex. "REP;DAY;NIGHT") ; nom de l'équipe = nom du fichier.
+
+Chaque équipe est résolue dans un processus du pool ; les cœurs de la machine
+sont répartis entre les résolutions simultanées (params["num_workers"]).
+Sauf params["model"] contraire, les modèles sont instanciés depuis le cache de
+gabarits (model_template.py), partagé sur disque entre les processus.
+Un classeur Excel est écrit par équipe (planning, vue par agent, statistiques,
+diagnostics), ainsi qu'un récapitulatif summary.csv ; --bundle les réunit dans
+un seul classeur ou une archive .zip.
+"""
+import argparse
+import calendar
+import csv
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from engine import solve_engine
+from export_utils import export_bundle, schedule_sheets, workbook_entries, write_workbook
+from feasibility import describe, solve_checked
+from horizon import _for_month, solve_horizon
+
+SUMMARY_FIELDS = ["team", "year", "month", "months", "status", "objective", "gap", "wall_time", "total_time", "output", "error"]
+
+
+def _parse_days(text):
+    """'3;4;10-12' -> [3, 4, 10, 11, 12]"""
+    days = []
+    for part in re.split(r"[;,\s]+", str(text or "").strip()):
+        if not part:
+            continue
+        if "-" in part:
+            start, end = part.split("-", 1)
+            days.extend(range(int(start), int(end) + 1))
+        else:
+            days.append(int(part))
+    return sorted(set(days))
+
+
+def _load_csv(path):
+    employees, leaves, history = [], {}, {}
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        for row in csv.DictReader(f):
+            name = row["name"].strip()
+            employees.append({"name": name, "sex": (row.get("sex") or "M").strip().upper()})
+            days = _parse_days(row.get("leaves"))
+            if days:
+                leaves[name] = days
+            if (row.get("history") or "").strip():
+                history[name] = [h.strip().upper() for h in re.split(r"[;,\s]+", row["history"].strip())]
+    return {"employees": employees, "leaves": leaves, "history": history}
+
+
+def load_team(path, year=None, month=None, holidays=None, months=1):
+    """
+    Lit la définition d'une équipe (JSON ou CSV).
+
+    year, month, holidays et months s'appliquent quand le fichier ne les précise pas.
+
+    Returns:
+        dict: {name, year, month, months, employees, leaves, leaves_by_month,
+            holidays_by_month, params}
+    """
+    if path.lower().endswith(".json"):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    else:
+        data = _load_csv(path)
+    team_year, team_month = data.get("year", year), data.get("month", month)
+    if team_year is None or team_month is None:
+        raise ValueError(f"{path} : année/mois manquants (fichier ou --year/--month)")
+    params = dict(data.get("params", {}))
+    params.setdefault("holidays", data.get("holidays", holidays or []))
+    params.setdefault("history", data.get("history", {}))
+    return {
+        "name": data.get("name") or os.path.splitext(os.path.basename(path))[0],
+        "year": int(team_year),
+        "month": int(team_month),
+        "months": int(data.get("months", months)),
+        "employees": data["employees"],
+        "leaves": {name: list(days) for name, days in data.get("leaves", {}).items()},
+        "leaves_by_month": data.get("leaves_by_month", {}),
+        "holidays_by_month": data.get("holidays_by_month", {}),
+        "params": params,
+    }
+
+
+def load_teams(paths, year=None, month=None, holidays=None, months=1):
+    """Lit des fichiers d'équipes et/ou tous les .json / .csv des répertoires donnés."""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(os.path.join(path, name) for name in sorted(os.listdir(path))
+                         if name.lower().endswith((".json", ".csv")))
+        else:
+            files.append(path)
+    return [load_team(f, year, month, holidays, months) for f in files]
+
+
+def _output_path(output_dir, team, year, month):
+    safe = re.sub(r"[^\w.-]+", "_", team["name"]).strip("_") or "equipe"
+    return os.path.join(output_dir, f"Planning_{safe}_{year}-{month:02d}.xlsx")
+
+
+def _write_workbook(path, result, year, month, leaves, pivot_labels=None):
+    """Classeur complet d'un planning : global, par agent, statistiques, diagnostics."""
+    names = result["agents"]
+    if pivot_labels is None:
+        num_days = calendar.monthrange(year, month)[1]
+        available = [num_days - len(leaves.get(name, [])) for name in names]
+        sheets = schedule_sheets(result["schedule"], result["matrix"], names, available, result)
+    else: # Moteur générique : statistiques Matin / Nuit sans objet
+        sheets = schedule_sheets(result["schedule"], result["matrix"], names, None, result, pivot_labels)
+    write_workbook(path, sheets)
+
+
+def _solve_team(team, output_dir, num_workers, time_limit):
+    """Résout une équipe et écrit son classeur (exécuté dans un processus du pool)."""
+    start = time.monotonic()
+    months = team.get("months", 1)
+    row = {"team": team["name"], "year": team["year"], "month": team["month"], "months": months,
+           "status": "ERROR", "objective": None, "gap": None, "wall_time": None, "output": None, "error": None}
+    # Gabarits de modèle (model_template.py) : les équipes de même forme partagent le modèle construit
+    params = {"model": "template", **team["params"], "num_workers": num_workers}
+    if time_limit:
+        params["stop_rules"] = {**params.get("stop_rules", {}), "max_time": time_limit}
+    try:
+        if "shift_types" in params:
+            if months > 1:
+                raise ValueError("moteur générique : un seul mois par résolution")
+            result = solve_engine(team["year"], team["month"], team["employees"], team["leaves"], params)
+            row.update(status=result["status"], objective=result["objective"], wall_time=round(result["wall_time"], 2))
+            if result["schedule"] is not None:
+                row["output"] = _output_path(output_dir, team, team["year"], team["month"])
+                _write_workbook(row["output"], result, team["year"], team["month"], team["leaves"],
+                                pivot_labels=["", *result["shifts"]])
+        elif months > 1:
+            # Horizon : congés du premier mois pris dans "leaves" s'ils ne sont pas donnés par mois
+            leaves_by_month = {f"{team['year']}-{team['month']:02d}": team["leaves"], **team["leaves_by_month"]}
+            result = solve_horizon(team["year"], team["month"], months, team["employees"], leaves_by_month,
+                                   params, team["holidays_by_month"],
+                                   time_budget=time_limit * months if time_limit else None)
+            outputs = []
+            for month_result in result["months"]:
+                if month_result["schedule"] is not None:
+                    outputs.append(_output_path(output_dir, team, month_result["year"], month_result["month"]))
+                    _write_workbook(outputs[-1], month_result, month_result["year"], month_result["month"],
+                                    _for_month(leaves_by_month, month_result["year"], month_result["month"]) or {})
+            row.update(status=result["status"], objective=result["objective"],
+                       wall_time=round(result["wall_time"], 2), output=";".join(outputs) or None)
+        else:
+            # Mois impossible (règles DURES) : expliqué sans lancer la résolution complète
+            result = solve_checked(team["year"], team["month"], team["employees"], team["leaves"], params)
+            row.update(status=result["status"], objective=result["objective"], gap=result["gap"],
+                       wall_time=round(result["wall_time"], 2))
+            if result["feasibility"]["feasible"] is False:
+                row["error"] = " ".join(describe(result["feasibility"]))
+            if result["schedule"] is not None:
+                row["output"] = _output_path(output_dir, team, team["year"], team["month"])
+                _write_workbook(row["output"], result, team["year"], team["month"], team["leaves"])
+    except Exception as e:
+        row["error"] = f"{type(e).__name__}: {e}"
+    row["total_time"] = round(time.monotonic() - start, 2)
+    return row
+
+
+def run_batch(teams, output_dir, jobs=None, time_limit=None, log=None, bundle=None):
+    """
+    Résout toutes les équipes en parallèle et écrit un classeur par équipe.
+
+    Args:
+        teams (list): Équipes (cf. load_team).
+        output_dir (str): Répertoire des classeurs et du récapitulatif summary.csv.
+        jobs (int): Résolutions simultanées (défaut : min(équipes, cœurs)).
+        time_limit (float): Délai maximal par équipe et par mois (secondes), sinon celui des params.
+        bundle (str): Export groupé de tous les classeurs produits : fichier .zip, ou .xlsx
+            (un seul classeur, cf. export_utils.export_bundle) ; relus un par un.
+
+    Returns:
+        list: Une ligne de récapitulatif par équipe (même ordre que `teams`).
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    cores = os.cpu_count() or 1
+    jobs = max(1, min(jobs or cores, len(teams) or 1, cores))
+    num_workers = max(1, cores // jobs)  # Pas de sur-souscription : jobs × num_workers <= cœurs
+
+    rows = [None] * len(teams)
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = {pool.submit(_solve_team, team, output_dir, num_workers, time_limit): i
+                   for i, team in enumerate(teams)}
+        for future in as_completed(futures):
+            row = future.result()
+            rows[futures[future]] = row
+            if log:
+                log(f"{row['team']:<20} {row['status']:<10} obj={row['objective']} t={row['total_time']}s")
+
+    with open(os.path.join(output_dir, "summary.csv"), "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=SUMMARY_FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+
+    if bundle:
+        paths = [path for row in rows if row["output"] for path in row["output"].split(";")]
+        export_bundle(bundle, workbook_entries(paths), "zip" if bundle.lower().endswith(".zip") else "xlsx")
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Génération de plannings en lot")
+    parser.add_argument("paths", nargs="+", help="Fichiers d'équipes (.json/.csv) ou répertoires")
+    parser.add_argument("--year", type=int)
+    parser.add_argument("--month", type=int)
+    parser.add_argument("--holidays", default="", help="Jours fériés communs (ex. \"1;14\")")
+    parser.add_argument("--months", type=int, default=1, help="Nombre de mois consécutifs (12 = une année)")
+    parser.add_argument("--output", default="plannings")
+    parser.add_argument("--jobs", type=int, help="Résolutions simultanées (défaut : nombre de cœurs)")
+    parser.add_argument("--time-limit", type=float, help="Délai maximal par équipe (s)")
+    parser.add_argument("--bundle", help="Export groupé de tous les plannings (.xlsx ou .zip)")
+    args = parser.parse_args(argv)
+
+    teams = load_teams(args.paths, args.year, args.month, _parse_days(args.holidays), args.months)
+    rows = run_batch(teams, args.output, args.jobs, args.time_limit, log=print, bundle=args.bundle)
+    failed = [r for r in rows if r["output"] is None]
+    print(f"{len(rows) - len(failed)}/{len(rows)} planning(s) générés dans {args.output}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
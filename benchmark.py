@@ -0,0 +1,276 @@
+"""
+Banc d'essai du moteur de planning : instances synthétiques et suivi des régressions.
+
+Usage :
+    python benchmark.py --quick                              # sous-ensemble rapide
+    python benchmark.py --output benchmark_results.json      # suite complète
+    python benchmark.py --baseline benchmark_baseline.json   # comparaison (code retour 1 si régression)
+    python benchmark.py --save-baseline benchmark_baseline.json
+
+Chaque instance est générée à partir d'une graine fixe : deux exécutions de la
+même suite résolvent exactement les mêmes plannings. La graine et le nombre de
+threads du solveur sont fixés eux aussi (params["random_seed"], params["num_workers"]).
+"""
+import argparse
+import calendar
+import json
+import platform
+import random
+import sys
+import time
+
+import ortools
+
+from scheduler import MODEL_VERSION, solve_schedule
+
+DEFAULT_TIME_LIMIT = 20.0
+DEFAULT_NUM_WORKERS = 8
+DEFAULT_SEED = 0
+
+# Tolérances de comparaison à la référence
+OBJECTIVE_TOLERANCE = 0.02  # +2 % de pénalité
+TIME_TOLERANCE = 0.5        # +50 % de temps...
+TIME_SLACK = 1.0            # ...et au moins 1 s d'écart (bruit de mesure)
+
+# Statuts avec un planning exploitable
+SOLVED_STATUSES = {"OPTIMAL", "FEASIBLE"}
+
+# Mois de référence par nombre de jours
+MONTHS_BY_LENGTH = {
+    28: (2026, 2),
+    29: (2028, 2),
+    30: (2026, 4),
+    31: (2026, 1),
+}
+
+
+def make_instance(name, num_agents, num_females=0, leave_days=0, num_days=28, num_holidays=0,
+                  with_history=False, seed=DEFAULT_SEED):
+    """
+    Génère une instance de planning reproductible.
+
+    Args:
+        name (str): Identifiant de l'instance (clé de comparaison avec la référence).
+        num_agents (int): Taille de l'équipe.
+        num_females (int): Nombre d'agentes parmi `num_agents`.
+        leave_days (int): Total des jours de congés du mois, répartis en blocs
+            consécutifs (au-delà de 31 puis de 40, le modèle assouplit ses règles).
+            Au plus un agent absent par jour (deux à partir de 8 agents), pour
+            rester dans le domaine des plannings réalisables.
+        num_days (int): Longueur du mois (28 à 31).
+        num_holidays (int): Nombre de jours fériés tirés au hasard.
+        with_history (bool): Génère les 3 derniers jours du mois précédent.
+        seed (int): Graine du générateur.
+
+    Returns:
+        dict: {name, year, month, employees, leaves, params}
+    """
+    rng = random.Random(f"{name}:{seed}")
+    year, month = MONTHS_BY_LENGTH[num_days]
+    employees = [{"name": f"Agent {i + 1:02d}", "sex": "F" if i < num_females else "M"}
+                 for i in range(num_agents)]
+
+    max_absent = 2 if num_agents >= 8 else 1
+    if leave_days > max_absent * num_days:
+        raise ValueError(f"{name}: {leave_days} jours de congés pour {max_absent} absent(s) max par jour")
+    leaves = {}
+    absent = [0] * (num_days + 1)
+    remaining = leave_days
+    while remaining > 0:
+        emp = rng.choice(employees)["name"]
+        taken = set(leaves.get(emp, []))
+        length = min(remaining, rng.randint(2, 7))
+        start = rng.randint(1, num_days - length + 1)
+        block = [d for d in range(start, start + length) if d not in taken and absent[d] < max_absent]
+        for d in block:
+            absent[d] += 1
+        leaves[emp] = sorted(taken.union(block))
+        remaining -= len(block)
+    leaves = {emp: days for emp, days in leaves.items() if days}
+
+    params = {}
+    if num_holidays:
+        params["holidays"] = sorted(rng.sample(range(1, num_days + 1), num_holidays))
+    if with_history:
+        params["history"] = {e["name"]: [rng.choice(["DAY", "NIGHT", "REP"]) for _ in range(3)]
+                             for e in employees}
+    return {"name": name, "year": year, "month": month,
+            "employees": employees, "leaves": leaves, "params": params}
+
+
+def default_suite(seed=DEFAULT_SEED, quick=False):
+    """
+    Suite de référence : tailles d'équipe 3 à 10 (+ grandes équipes), mixité,
+    densité de congés (dont les seuils 31 et 40), jours fériés, historique et
+    toutes les longueurs de mois.
+    """
+    specs = [
+        # Tailles d'équipe
+        *[dict(name=f"size{n:02d}", num_agents=n, num_females=1 if n >= 5 else 0, num_days=30)
+          for n in range(3, 11)],
+        dict(name="size14", num_agents=14, num_females=2, num_days=31, leave_days=20),
+        dict(name="size20", num_agents=20, num_females=3, num_days=31, leave_days=30),
+        # Mixité
+        dict(name="mix7_f0", num_agents=7, num_females=0, num_days=31),
+        dict(name="mix7_f2", num_agents=7, num_females=2, num_days=31),
+        dict(name="mix7_f3", num_agents=7, num_females=3, num_days=31),
+        # Densité de congés (max_consecutive_work passe à 5 au-delà de 31)
+        dict(name="leaves09_10", num_agents=9, num_females=1, num_days=31, leave_days=10),
+        dict(name="leaves09_31", num_agents=9, num_females=1, num_days=31, leave_days=31),
+        dict(name="leaves09_32", num_agents=9, num_females=1, num_days=31, leave_days=32),
+        dict(name="leaves09_41", num_agents=9, num_females=1, num_days=31, leave_days=41),
+        dict(name="leaves10_55", num_agents=10, num_females=1, num_days=31, leave_days=55),
+        # Jours fériés et historique
+        dict(name="holidays7", num_agents=7, num_females=2, num_days=30, num_holidays=3),
+        dict(name="history7", num_agents=7, num_females=1, num_days=30, with_history=True),
+        dict(name="full8", num_agents=8, num_females=1, num_days=31, leave_days=35,
+             num_holidays=2, with_history=True),
+        # Longueurs de mois
+        *[dict(name=f"month{days}", num_agents=7, num_females=1, num_days=days, leave_days=12,
+               with_history=True) for days in sorted(MONTHS_BY_LENGTH)],
+    ]
+    if quick:
+        keep = {"size04", "size07", "leaves09_32", "full8", "month28"}
+        specs = [spec for spec in specs if spec["name"] in keep]
+    return [make_instance(seed=seed, **spec) for spec in specs]
+
+
+def run_instance(instance, time_limit=DEFAULT_TIME_LIMIT, num_workers=DEFAULT_NUM_WORKERS, seed=DEFAULT_SEED,
+                 model="standard"):
+    """Résout une instance et retourne ses mesures (dict sérialisable en JSON)."""
+    params = {**instance["params"], "model": model, "random_seed": seed, "num_workers": num_workers,
+              "stop_rules": {"max_time": time_limit}}
+    start = time.monotonic()
+    result = solve_schedule(instance["year"], instance["month"], instance["employees"],
+                            instance["leaves"], params)
+    return {
+        "name": instance["name"],
+        "num_agents": len(instance["employees"]),
+        "num_days": calendar.monthrange(instance["year"], instance["month"])[1],
+        "leave_days": sum(len(days) for days in instance["leaves"].values()),
+        "status": result["status"],
+        "objective": result["objective"],
+        "best_bound": result["best_bound"],
+        "gap": result["gap"],
+        "build_time": result["build_time"],
+        "first_solution_time": result["first_solution_time"],
+        "best_solution_time": result["best_solution_time"],
+        "wall_time": result["wall_time"],
+        "total_time": time.monotonic() - start,
+        "num_solutions": result["num_solutions"],
+        "num_variables": result["num_variables"],
+        "num_constraints": result["num_constraints"],
+    }
+
+
+def run_benchmark(instances, time_limit=DEFAULT_TIME_LIMIT, num_workers=DEFAULT_NUM_WORKERS, seed=DEFAULT_SEED,
+                  model="standard", log=None):
+    """
+    Résout toutes les instances.
+
+    Returns:
+        dict: {meta: {...configuration...}, results: [mesures par instance]}
+    """
+    results = []
+    for instance in instances:
+        record = run_instance(instance, time_limit, num_workers, seed, model)
+        results.append(record)
+        if log:
+            log(f"{record['name']:<12} {record['status']:<10} obj={record['objective']} "
+                f"build={record['build_time']:.2f}s best={_fmt_time(record['best_solution_time'])}")
+    return {
+        "meta": {
+            "model_version": MODEL_VERSION,
+            "model": model,
+            "ortools": ortools.__version__,
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "time_limit": time_limit,
+            "num_workers": num_workers,
+            "seed": seed,
+            "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+
+
+def compare_to_baseline(current, baseline, objective_tolerance=OBJECTIVE_TOLERANCE,
+                        time_tolerance=TIME_TOLERANCE, time_slack=TIME_SLACK):
+    """
+    Compare deux exécutions du banc d'essai, instance par instance.
+
+    Une régression est signalée si une instance n'est plus résolue, si sa pénalité
+    augmente de plus de `objective_tolerance` (relatif), ou si la construction du
+    modèle / l'obtention de la meilleure solution ralentit au-delà de
+    `time_tolerance` (relatif) ET de `time_slack` secondes.
+
+    Returns:
+        list: [{name, metric, baseline, current}] (vide = aucune régression).
+    """
+    reference = {r["name"]: r for r in baseline["results"]}
+    regressions = []
+    for record in current["results"]:
+        ref = reference.get(record["name"])
+        if ref is None:
+            continue
+
+        def flag(metric):
+            regressions.append({"name": record["name"], "metric": metric,
+                                "baseline": ref[metric], "current": record[metric]})
+
+        if ref["status"] in SOLVED_STATUSES and record["status"] not in SOLVED_STATUSES:
+            flag("status")
+            continue
+        if ref["status"] == "OPTIMAL" and record["status"] == "FEASIBLE":
+            flag("status")
+        if ref["objective"] is not None and record["objective"] is not None:
+            if record["objective"] > ref["objective"] * (1 + objective_tolerance) + 1e-9:
+                flag("objective")
+        for metric in ("build_time", "best_solution_time"):
+            if ref[metric] is None or record[metric] is None:
+                continue
+            if record[metric] > ref[metric] * (1 + time_tolerance) and record[metric] - ref[metric] > time_slack:
+                flag(metric)
+    return regressions
+
+
+def _fmt_time(seconds):
+    return "-" if seconds is None else f"{seconds:.2f}s"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Banc d'essai du moteur de planning")
+    parser.add_argument("--quick", action="store_true", help="Sous-ensemble rapide de la suite")
+    parser.add_argument("--only", nargs="*", help="Noms des instances à résoudre")
+    parser.add_argument("--time-limit", type=float, default=DEFAULT_TIME_LIMIT)
+    parser.add_argument("--workers", type=int, default=DEFAULT_NUM_WORKERS)
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--model", default="standard", choices=["standard", "compact", "template"])
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", help="Fichier de référence à comparer")
+    parser.add_argument("--save-baseline", help="Enregistre aussi les résultats comme référence")
+    args = parser.parse_args(argv)
+
+    instances = default_suite(seed=args.seed, quick=args.quick)
+    if args.only:
+        instances = [inst for inst in instances if inst["name"] in args.only]
+    report = run_benchmark(instances, args.time_limit, args.workers, args.seed, args.model, log=print)
+
+    for path in filter(None, [args.output, args.save_baseline]):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+    if not args.baseline:
+        return 0
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    regressions = compare_to_baseline(report, baseline)
+    for reg in regressions:
+        print(f"REGRESSION {reg['name']}: {reg['metric']} {reg['baseline']} -> {reg['current']}")
+    if not regressions:
+        print("OK: aucune régression par rapport à la référence")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
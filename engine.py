@@ -0,0 +1,491 @@
+"""
+Moteur de planification générique (grandes équipes, postes et effectifs paramétrables).
+
+scheduler.py modélise une équipe précise (Matin / Nuit, 1 ou 2 agents par poste,
+règles de l'agente). Ce moteur reçoit ces éléments en données :
+- params["shift_types"] : postes [{"code", "label"}] (défaut : DAY « Matin », NIGHT « Nuit ») ;
+- params["demand"] : effectif requis par jour et par poste (cf. daily_demand),
+  params["group_demand"] : effectifs propres à un sous-groupe {groupe: demande} ;
+- par agent : "shifts" (postes autorisés, défaut : tous), "group" (sous-équipe),
+  "restrictions" ([{"shifts", "days"}] : postes interdits certains jours,
+  days = "weekend", "holidays", "weekend_holidays" ou liste de jours) ;
+- params["forbidden_sequences"] : enchaînements interdits d'un jour au suivant
+  ([["NIGHT", "DAY"]] : pas de matin après une nuit), historique compris ;
+- params["max_consecutive_work"] : jours travaillés de suite tolérés (règle MOLLE).
+
+Règles DURES : effectif exact, un poste par jour, congés, postes autorisés,
+enchaînements interdits. Règles MOLLES (ENGINE_WEIGHTS) : charge totale et
+répartition par poste proches de la part de chaque agent (au prorata de ses
+jours disponibles), jours travaillés de suite, jours travaillés isolés.
+
+Passage à l'échelle :
+1. Décomposition : deux agents ne sont dans le même sous-problème que s'ils
+   appartiennent au même groupe et peuvent tenir un même poste (composantes
+   connexes). Les sous-problèmes sont indépendants et résolus en parallèle.
+2. Recherche à grand voisinage (LNS) pour les sous-problèmes d'au moins
+   LNS_MIN_AGENTS agents : première solution, puis ré-optimisation répétée
+   d'un voisinage (quelques agents sur tout le mois, ou tous les agents sur
+   quelques jours), le reste du planning étant figé.
+"""
+import calendar
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+from ortools.sat import cp_model_pb2
+from ortools.sat.python import cp_model
+
+from schedule_matrix import REST, WEEKDAY_LABELS
+from scheduler import MAX_TIME_IN_SECONDS, _max_consecutive_work, _watch_stop_rules
+
+DEFAULT_SHIFT_TYPES = [{"code": "DAY", "label": "Matin"}, {"code": "NIGHT", "label": "Nuit"}]
+DEFAULT_MAX_CONSECUTIVE_WORK = 5
+
+# Poids des pénalités (règles MOLLES)
+ENGINE_WEIGHTS = {
+    "workload": 100,          # Par poste d'écart entre la charge d'un agent et sa part
+    "shift_balance": 20,      # Par poste d'écart, poste par poste
+    "over_consecutive": 1500, # Plus de max_consecutive_work jours travaillés de suite
+    "isolated_work": 200,     # Jour travaillé isolé
+}
+
+# Recherche à grand voisinage
+LNS_MIN_AGENTS = 16
+LNS_ITERATION_TIME = 0.5
+LNS_NEIGHBORHOOD_AGENTS = 4
+LNS_NEIGHBORHOOD_DAYS = 3
+
+_DEMAND_KEYS = ("default", "weekdays", "holidays", "days")
+
+
+def daily_demand(year, month, spec, holidays, codes):
+    """
+    Effectif requis {(jour, code): nombre}.
+
+    Args:
+        spec (dict): {code: n} (tous les jours), ou {"default": {code: n},
+            "weekdays": {0-6: {code: n}} (0 = lundi), "holidays": {code: n},
+            "days": {jour: {code: n}}} ; le plus précis l'emporte (jour > férié >
+            jour de semaine > défaut), un poste absent vaut 0.
+    """
+    if not any(key in spec for key in _DEMAND_KEYS):
+        spec = {"default": spec}
+    weekdays = {int(wd): counts for wd, counts in spec.get("weekdays", {}).items()}
+    days = {int(d): counts for d, counts in spec.get("days", {}).items()}
+    demand = {}
+    for d in range(1, calendar.monthrange(year, month)[1] + 1):
+        if d in days:
+            counts = days[d]
+        elif d in holidays and "holidays" in spec:
+            counts = spec["holidays"]
+        else:
+            counts = weekdays.get(calendar.weekday(year, month, d), spec.get("default", {}))
+        for code in codes:
+            demand[(d, code)] = int(counts.get(code, 0))
+    return demand
+
+
+def _restricted_days(year, month, days, holidays):
+    num_days = calendar.monthrange(year, month)[1]
+    if isinstance(days, str):
+        weekend = {d for d in range(1, num_days + 1) if calendar.weekday(year, month, d) >= 5}
+        return {"weekend": weekend, "holidays": set(holidays), "weekend_holidays": weekend | set(holidays)}[days]
+    return set(days)
+
+
+def _eligible(year, month, employees, leaves, params, codes):
+    """Postes possibles {(agent, jour): set de codes} (postes autorisés, congés, restrictions)."""
+    num_days = calendar.monthrange(year, month)[1]
+    holidays = set(params.get("holidays", []))
+    eligible = {}
+    for n, emp in enumerate(employees):
+        allowed = set(emp.get("shifts", codes)) & set(codes)
+        banned = {}
+        for rule in emp.get("restrictions", []):
+            for d in _restricted_days(year, month, rule["days"], holidays):
+                banned.setdefault(d, set()).update(rule["shifts"])
+        emp_leaves = set(leaves.get(emp['name'], []))
+        for d in range(1, num_days + 1):
+            eligible[(n, d)] = set() if d in emp_leaves else allowed - banned.get(d, set())
+    return eligible
+
+
+def decompose(employees, params, codes):
+    """
+    Sous-problèmes indépendants : agents d'un même groupe reliés par un poste autorisé commun.
+
+    Returns:
+        list: [{group, agents (indices), shifts (codes)}] ; un poste sans aucun agent
+            autorisé forme un sous-problème sans agents.
+    """
+    components = []
+    groups = {}
+    for n, emp in enumerate(employees):
+        groups.setdefault(emp.get("group"), []).append(n)
+    for group, members in groups.items():
+        parent = {}
+
+        def find(key):
+            while parent[key] != key:
+                parent[key] = parent[parent[key]]
+                key = parent[key]
+            return key
+
+        for code in codes:
+            parent[("shift", code)] = ("shift", code)
+        for n in members:
+            parent[("agent", n)] = ("agent", n)
+            for code in set(employees[n].get("shifts", codes)) & set(codes):
+                parent[find(("agent", n))] = find(("shift", code))
+        by_root = {}
+        for key in parent:
+            by_root.setdefault(find(key), []).append(key)
+        for keys in by_root.values():
+            components.append({
+                "group": group,
+                "agents": sorted(n for kind, n in keys if kind == "agent"),
+                "shifts": [code for code in codes if ("shift", code) in keys],
+            })
+    return components
+
+
+def _build_engine_model(year, month, employees, leaves, params, component, demand, eligible, codes):
+    """
+    Modèle CP-SAT d'un sous-problème.
+
+    Returns:
+        dict: Contexte {model, shifts ({(n, d, code): var}, n = indice global), penalties
+            ([(règle, n, terme, mesure)], mesure : cf. _realized_penalty), agents, num_days}.
+    """
+    model = cp_model.CpModel()
+    num_days = calendar.monthrange(year, month)[1]
+    agents, comp_shifts = component["agents"], component["shifts"]
+    history = params.get("history", {})
+    max_consecutive = params.get("max_consecutive_work", DEFAULT_MAX_CONSECUTIVE_WORK)
+
+    shifts = {}
+    for n in agents:
+        for d in range(1, num_days + 1):
+            for code in comp_shifts:
+                if code in eligible[(n, d)]:
+                    shifts[(n, d, code)] = model.NewBoolVar(f'x_n{n}_d{d}_{code}')
+
+    def shift(n, d, code):
+        if d <= 0: # Historique [J-3, J-2, J-1] -> jours -2, -1, 0
+            past = history.get(employees[n]['name'], [])
+            return 1 if len(past) >= 1 - d and past[d - 1] == code else 0
+        return shifts.get((n, d, code), 0)
+
+    def working(n, d):
+        if d > num_days:
+            return 0
+        return sum(shift(n, d, code) for code in comp_shifts)
+
+    penalties = []
+
+    def add_soft_indicator(rule, n, expr, name):
+        if isinstance(expr, int):
+            if expr >= 1: penalties.append((rule, n, ENGINE_WEIGHTS[rule], ("indicator", expr)))
+            return
+        indicator = model.NewBoolVar(name)
+        model.Add(expr <= indicator)
+        penalties.append((rule, n, indicator * ENGINE_WEIGHTS[rule], ("indicator", expr)))
+
+    # Effectif exact (DURE)
+    for d in range(1, num_days + 1):
+        for code in comp_shifts:
+            model.Add(sum(shifts.get((n, d, code), 0) for n in agents) == demand[(d, code)])
+    # Un poste par jour (DURE)
+    for n in agents:
+        for d in range(1, num_days + 1):
+            day_vars = [shifts[(n, d, code)] for code in comp_shifts if (n, d, code) in shifts]
+            if len(day_vars) > 1:
+                model.Add(sum(day_vars) <= 1)
+    # Enchaînements interdits (DURE), historique compris
+    for first, second in params.get("forbidden_sequences", []):
+        if second not in comp_shifts:
+            continue
+        for n in agents:
+            for d in range(0, num_days):
+                expr = shift(n, d, first) + shift(n, d + 1, second)
+                if not isinstance(expr, int):
+                    model.Add(expr <= 1)
+
+    for n in agents:
+        # Jours travaillés de suite (MOLLE) : fenêtre de max_consecutive + 1 jours
+        for d in range(-2, num_days - max_consecutive + 1):
+            window = sum(working(n, d + k) for k in range(max_consecutive + 1))
+            add_soft_indicator("over_consecutive", n, window - max_consecutive, f'over_consecutive_n{n}_d{d}')
+        # Jour travaillé isolé (MOLLE)
+        for d in range(1, num_days + 1):
+            expr = working(n, d) - working(n, d - 1) - working(n, d + 1)
+            add_soft_indicator("isolated_work", n, expr, f'isolated_work_n{n}_d{d}')
+
+    # Équité (MOLLE) : part de chaque agent au prorata de ses jours disponibles pour le(s) poste(s)
+    def add_fair_share(rule, codes_subset, suffix):
+        available = {n: sum(1 for d in range(1, num_days + 1) if eligible[(n, d)] & set(codes_subset))
+                     for n in agents}
+        total_available = sum(available.values())
+        required = sum(demand[(d, code)] for d in range(1, num_days + 1) for code in codes_subset)
+        if not total_available:
+            return
+        for n in agents:
+            if not available[n]:
+                continue
+            target = round(required * available[n] / total_available)
+            count = sum(shifts.get((n, d, code), 0) for d in range(1, num_days + 1) for code in codes_subset)
+            deviation = model.NewIntVar(0, max(num_days, target), f'{rule}_n{n}_{suffix}')
+            model.Add(deviation >= count - target)
+            model.Add(deviation >= target - count)
+            penalties.append((rule, n, deviation * ENGINE_WEIGHTS[rule], ("deviation", count - target)))
+
+    add_fair_share("workload", comp_shifts, "all")
+    if len(comp_shifts) > 1:
+        for code in comp_shifts:
+            add_fair_share("shift_balance", [code], code)
+
+    model.Minimize(sum(term for _, _, term, _ in penalties))
+    return {"model": model, "shifts": shifts, "penalties": penalties, "agents": agents, "num_days": num_days}
+
+
+def _realized_penalty(rule, measure, value):
+    """
+    Pénalité réellement encourue, recalculée sur les affectations.
+
+    Indicateurs et écarts ne sont bornés que par en dessous : hors optimum (première
+    solution du LNS, résolue sans objectif), leur valeur peut dépasser la violation réelle.
+
+    Args:
+        measure (tuple): ("indicator", expr) : violée si expr >= 1 ;
+            ("deviation", expr) : écart |expr|.
+        value (callable): Valeur d'une expression linéaire (ou d'un entier) dans la solution.
+    """
+    kind, expr = measure
+    amount = value(expr)
+    if kind == "indicator":
+        return ENGINE_WEIGHTS[rule] if amount >= 1 else 0
+    return ENGINE_WEIGHTS[rule] * abs(amount)
+
+
+def _solver(time_limit, num_workers, seed):
+    solver = cp_model.CpSolver()
+    solver.parameters.max_time_in_seconds = max(0.1, time_limit)
+    solver.parameters.num_workers = num_workers
+    solver.parameters.random_seed = seed
+    return solver
+
+
+def _run(solver, model, stop_event):
+    done = threading.Event()
+    watcher = threading.Thread(target=_watch_stop_rules, args=(solver, None, done, stop_event, None), daemon=True)
+    watcher.start()
+    try:
+        return solver.Solve(model)
+    finally:
+        done.set()
+        watcher.join()
+
+
+def _solve_lns(ctx, params, time_limit, num_workers, seed, stop_event):
+    """
+    Première solution, puis ré-optimisation de voisinages tant que le délai le permet
+    (arrêt anticipé : objectif nul, ou params["stop_rules"]["no_improvement"] secondes
+    sans amélioration).
+
+    Returns:
+        tuple: (solveur de la meilleure solution, statut, itérations)
+    """
+    model, shifts, agents = ctx["model"], ctx["shifts"], ctx["agents"]
+    domains = model.Proto().variables
+    deadline = time.monotonic() + time_limit
+    # Première solution sans objectif : les règles DURES seules se résolvent bien plus vite
+    objective = cp_model_pb2.CpObjectiveProto()
+    objective.CopyFrom(model.Proto().objective)
+    model.ClearObjective()
+    solver = _solver(time_limit, num_workers, seed)
+    status = _run(solver, model, stop_event)
+    model.Proto().objective.CopyFrom(objective)
+    if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        return solver, status, 0
+
+    best, best_objective = solver, None
+    no_improvement = params.get("stop_rules", {}).get("no_improvement")
+    last_improvement = time.monotonic()
+    rng = random.Random(seed)
+    iterations = 0
+    while time.monotonic() < deadline - 0.1 and not (stop_event is not None and stop_event.is_set()):
+        if best_objective == 0 or (no_improvement and time.monotonic() - last_improvement >= no_improvement):
+            break
+        if iterations % 2 == 0: # Quelques agents, tout le mois
+            free = set(rng.sample(agents, min(LNS_NEIGHBORHOOD_AGENTS, len(agents))))
+            relaxed = lambda key: key[0] in free
+        else: # Tous les agents, une fenêtre de jours
+            start = rng.randint(1, max(1, ctx["num_days"] - LNS_NEIGHBORHOOD_DAYS + 1))
+            relaxed = lambda key: start <= key[1] < start + LNS_NEIGHBORHOOD_DAYS
+        model.ClearHints()
+        fixed = []
+        for key, var in shifts.items():
+            value = best.Value(var)
+            model.AddHint(var, value)
+            if not relaxed(key):
+                fixed.append((var.Index(), list(domains[var.Index()].domain)))
+                domains[var.Index()].domain[:] = [value, value]
+        solver = _solver(min(LNS_ITERATION_TIME, deadline - time.monotonic()), num_workers, seed + iterations + 1)
+        status = _run(solver, model, stop_event)
+        for index, domain in fixed:
+            domains[index].domain[:] = domain
+        iterations += 1
+        if status in (cp_model.OPTIMAL, cp_model.FEASIBLE) and \
+                (best_objective is None or solver.ObjectiveValue() < best_objective):
+            best, best_objective = solver, solver.ObjectiveValue()
+            last_improvement = time.monotonic()
+    model.ClearHints()
+    return best, cp_model.FEASIBLE, iterations
+
+
+def _solve_component(year, month, employees, leaves, params, component, eligible, codes,
+                     time_limit, num_workers, stop_event):
+    start = time.monotonic()
+    holidays = params.get("holidays", [])
+    spec = params.get("group_demand", {}).get(component["group"], params.get("demand", {}))
+    demand = daily_demand(year, month, spec, holidays, codes)
+    outcome = {"group": component["group"], "agents": [employees[n]['name'] for n in component["agents"]],
+               "shifts": component["shifts"], "status": "INFEASIBLE", "objective": None, "lns_iterations": 0,
+               "values": {}, "penalties_by_rule": {}, "wall_time": 0.0}
+    if not component["agents"]:
+        if any(demand[(d, code)] for d, code in demand if code in component["shifts"]):
+            return outcome
+        outcome.update(status="OPTIMAL", objective=0)
+        return outcome
+
+    ctx = _build_engine_model(year, month, employees, leaves, params, component, demand, eligible, codes)
+    seed = int(params.get("random_seed", 0))
+    if len(component["agents"]) >= LNS_MIN_AGENTS:
+        solver, status, outcome["lns_iterations"] = _solve_lns(ctx, params, time_limit, num_workers, seed, stop_event)
+    else:
+        solver = _solver(time_limit, num_workers, seed)
+        status = _run(solver, ctx["model"], stop_event)
+    outcome["status"] = solver.StatusName(status)
+    if status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        outcome["values"] = {key: solver.Value(var) for key, var in ctx["shifts"].items()}
+        value = lambda expr: expr if isinstance(expr, int) else solver.Value(expr)
+        by_rule = {}
+        for rule, _, _, measure in ctx["penalties"]:
+            by_rule[rule] = by_rule.get(rule, 0) + _realized_penalty(rule, measure, value)
+        # Pénalités recalculées sur les affectations (et non ObjectiveValue ni valeur des indicateurs :
+        # la première solution du LNS est résolue sans objectif)
+        outcome["objective"] = sum(by_rule.values())
+        outcome["penalties_by_rule"] = {rule: amount for rule, amount in by_rule.items() if amount}
+    outcome["wall_time"] = time.monotonic() - start
+    return outcome
+
+
+def engine_frame(matrix, names, shift_types, year, month):
+    """
+    DataFrame Jour/Date/Semaine + une colonne par poste (libellé) ; avec les postes
+    par défaut, même format que schedule_matrix.schedule_frame.
+    """
+    matrix = np.asarray(matrix).reshape(len(names), -1)
+    names = np.asarray(names, dtype=object)
+    frame = {
+        "Jour": np.arange(1, matrix.shape[1] + 1),
+        "Date": [f"{d:02d}/{month:02d}/{year}" for d in range(1, matrix.shape[1] + 1)],
+        "Semaine": [WEEKDAY_LABELS[calendar.weekday(year, month, d)] for d in range(1, matrix.shape[1] + 1)],
+    }
+    for i, shift_type in enumerate(shift_types):
+        frame[shift_type["label"]] = [", ".join(names[col == i]) for col in matrix.T]
+    return pd.DataFrame(frame)
+
+
+def solve_engine(year, month, employees, leaves, params, stop_event=None):
+    """
+    Résout un mois avec le moteur générique.
+
+    Args:
+        employees (list): Agents {"name", "shifts"?, "group"?, "restrictions"?}.
+        leaves (dict): {nom: [jours]}.
+        params (dict): shift_types, demand, group_demand, forbidden_sequences,
+            max_consecutive_work, holidays, history, random_seed, num_workers,
+            stop_rules["max_time"] (délai par sous-problème).
+
+    Returns:
+        dict: schedule (DataFrame, cf. engine_frame), matrix (agent×jour int8 : REST ou indice
+            du poste dans shift_types), agents, shifts (codes), status, objective,
+            penalties_by_rule, components ([{group, agents, shifts, status, objective,
+            lns_iterations, wall_time}]), wall_time.
+    """
+    start = time.monotonic()
+    shift_types = params.get("shift_types", DEFAULT_SHIFT_TYPES)
+    codes = [shift_type["code"] for shift_type in shift_types]
+    num_days = calendar.monthrange(year, month)[1]
+    time_limit = float(params.get("stop_rules", {}).get("max_time") or MAX_TIME_IN_SECONDS)
+    eligible = _eligible(year, month, employees, leaves, params, codes)
+    components = decompose(employees, params, codes)
+
+    cores = os.cpu_count() or 1
+    jobs = max(1, min(cores, len(components)))
+    num_workers = int(params.get("num_workers") or max(1, cores // jobs))
+    with ThreadPoolExecutor(max_workers=jobs, thread_name_prefix="engine") as pool:
+        outcomes = list(pool.map(
+            lambda component: _solve_component(year, month, employees, leaves, params, component, eligible, codes,
+                                               time_limit, num_workers, stop_event),
+            components))
+
+    statuses = [o["status"] for o in outcomes]
+    result = {"schedule": None, "matrix": None, "agents": [e['name'] for e in employees], "shifts": codes,
+              "status": "OPTIMAL", "objective": None, "penalties_by_rule": {}, "components": [], "wall_time": 0.0}
+    for status in ("INFEASIBLE", "MODEL_INVALID", "UNKNOWN", "FEASIBLE"):
+        if status in statuses:
+            result["status"] = status
+            break
+    for outcome in outcomes:
+        values = outcome.pop("values")
+        result["components"].append(outcome)
+        if result["status"] in ("OPTIMAL", "FEASIBLE"):
+            if result["matrix"] is None:
+                result["matrix"] = np.full((len(employees), num_days), REST, dtype=np.int8)
+            for (n, d, code), value in values.items():
+                if value:
+                    result["matrix"][n, d - 1] = codes.index(code)
+            for rule, amount in outcome["penalties_by_rule"].items():
+                result["penalties_by_rule"][rule] = result["penalties_by_rule"].get(rule, 0) + amount
+    if result["matrix"] is not None:
+        result["objective"] = sum(o["objective"] for o in outcomes)
+        result["schedule"] = engine_frame(result["matrix"], result["agents"], shift_types, year, month)
+    result["wall_time"] = time.monotonic() - start
+    return result
+
+
+def from_scheduler_config(year, month, employees, leaves, params):
+    """
+    Traduit une équipe de scheduler.py en entrées du moteur (règles DURES 1 à 5) :
+    Matin / Nuit, 1 ou 2 agents par poste, pas de Nuit -> Jour, agentes au poste
+    du matin hors week-ends et fériés.
+
+    Returns:
+        tuple: (employees, params) pour solve_engine
+    """
+    capacity = 1 if len(employees) < 6 else 2
+    engine_employees = []
+    for emp in employees:
+        agent = {"name": emp['name']}
+        if emp['sex'] == 'F':
+            agent["shifts"] = ["DAY"]
+            agent["restrictions"] = [{"shifts": ["DAY"], "days": "weekend_holidays"}]
+        engine_employees.append(agent)
+    engine_params = {
+        "shift_types": DEFAULT_SHIFT_TYPES,
+        "demand": {"DAY": capacity, "NIGHT": capacity},
+        "forbidden_sequences": [["NIGHT", "DAY"]],
+        "max_consecutive_work": _max_consecutive_work(employees, leaves),
+        "holidays": params.get("holidays", []),
+        "history": params.get("history", {}),
+    }
+    for key in ("stop_rules", "random_seed", "num_workers"):
+        if key in params:
+            engine_params[key] = params[key]
+    return engine_employees, engine_params
@@ -1,18 +1,203 @@
-import pandas as pd
+"""
+Export Excel des plannings.
+
+Un classeur par planning réunit le planning global, la vue agent×jour, les
+statistiques et les diagnostics du solveur (schedule_sheets / generate_workbook).
+Les classeurs sont écrits en mode write_only d'openpyxl : les lignes sont
+envoyées au fichier au fur et à mesure, sans garder les feuilles en mémoire.
+
+Export groupé (plusieurs équipes / mois, cf. export_bundle) : dans un seul
+classeur (une série de feuilles par planning et un sommaire) ou dans une
+archive .zip (un classeur par planning). Les plannings sont fournis par un
+itérable et traités un par un : un seul planning est en mémoire à la fois
+(plannings publiés : store_entries, classeurs existants : workbook_entries).
+"""
 import io
+import re
+import zipfile
+
+import pandas as pd
+from openpyxl import Workbook, load_workbook
+from openpyxl.utils import get_column_letter
+
+from schedule_matrix import PIVOT_LABELS, schedule_frame, schedule_pivot, schedule_stats
+
+SHEET_PLANNING = "Planning"
+SHEET_PIVOT = "Par agent"
+SHEET_STATS = "Statistiques"
+SHEET_DIAGNOSTICS = "Diagnostics"
+SHEET_INDEX = "Sommaire"
+
+# Excel : 31 caractères au plus, sans []:*?/\
+MAX_SHEET_TITLE = 31
+MAX_COLUMN_WIDTH = 60
+
+# Indicateurs du résultat de solve_schedule repris dans la feuille Diagnostics
+DIAGNOSTIC_FIELDS = [
+    ("status", "Statut"), ("objective", "Pénalité"), ("best_bound", "Borne inférieure"), ("gap", "Écart relatif"),
+    ("wall_time", "Résolution (s)"), ("build_time", "Construction du modèle (s)"), ("num_solutions", "Solutions"),
+    ("num_branches", "Branches"), ("num_conflicts", "Conflits"), ("num_variables", "Variables"),
+    ("num_constraints", "Contraintes"),
+]
+
+
+def _sheet_title(title, used):
+    """Titre de feuille valide et unique dans le classeur."""
+    title = re.sub(r"[\[\]:*?/\\]+", "-", str(title)).strip() or "Feuille"
+    base, k = title[:MAX_SHEET_TITLE], 1
+    while base.lower() in used:
+        k += 1
+        suffix = f" ({k})"
+        base = title[:MAX_SHEET_TITLE - len(suffix)] + suffix
+    used.add(base.lower())
+    return base
+
+
+def _cell(value):
+    if hasattr(value, "item"): # Scalaires numpy
+        return value.item()
+    return None if value is pd.NA else value
+
+
+def _write_frame(ws, df):
+    """Écrit un DataFrame dans une feuille write_only (largeurs ajustées, puis lignes en flux)."""
+    columns = list(df.columns)
+    for idx, col in enumerate(columns, start=1):
+        longest = df[col].astype(str).map(len).max() if len(df) else 0
+        width = min(max(longest, len(str(col))) + 2, MAX_COLUMN_WIDTH)
+        ws.column_dimensions[get_column_letter(idx)].width = width
+    ws.append([_cell(col) for col in columns])
+    for row in df.itertuples(index=False, name=None):
+        ws.append([_cell(value) for value in row])
+
+
+def diagnostics_frame(result):
+    """Indicateurs du solveur et pénalité par règle (feuille Diagnostics)."""
+    rows = [(label, _cell(result[key])) for key, label in DIAGNOSTIC_FIELDS if result.get(key) is not None]
+    rows += [(f"Pénalité : {rule}", _cell(amount)) for rule, amount in (result.get("penalties_by_rule") or {}).items()]
+    return pd.DataFrame(rows, columns=["Indicateur", "Valeur"])
+
+
+def schedule_sheets(schedule, matrix, names, available_days=None, result=None, pivot_labels=PIVOT_LABELS):
+    """
+    Feuilles d'un planning : [(titre, DataFrame)].
+
+    Args:
+        schedule (DataFrame): Planning global (Jour/Date/Semaine/postes).
+        matrix: Matrice agent×jour (lignes dans l'ordre de `names`).
+        available_days (list): Jours disponibles de chaque agent ; sans elle, pas de statistiques.
+        result (dict): Résultat du solveur ; sans lui, pas de diagnostics.
+        pivot_labels: Libellés de la vue par agent, indexés par code + 1 (cf. schedule_matrix.PIVOT_LABELS).
+    """
+    pivot = schedule_pivot(matrix, names, pivot_labels)
+    sheets = [(SHEET_PLANNING, schedule), (SHEET_PIVOT, pivot.rename_axis("Agent").reset_index())]
+    if available_days is not None:
+        sheets.append((SHEET_STATS, schedule_stats(matrix, names, available_days)))
+    if result is not None:
+        sheets.append((SHEET_DIAGNOSTICS, diagnostics_frame(result)))
+    return sheets
+
+
+def write_workbook(target, sheets):
+    """
+    Écrit des feuilles [(titre, DataFrame)] dans un classeur (chemin ou fichier binaire).
+    """
+    workbook = Workbook(write_only=True)
+    used = set()
+    for title, df in sheets:
+        _write_frame(workbook.create_sheet(_sheet_title(title, used)), df)
+    workbook.save(target)
+
+
+def generate_workbook(schedule, matrix, names, available_days=None, result=None):
+    """Classeur complet d'un planning (cf. schedule_sheets), en octets."""
+    output = io.BytesIO()
+    write_workbook(output, schedule_sheets(schedule, matrix, names, available_days, result))
+    return output.getvalue()
+
 
 def generate_excel(df):
     """
     Génère un fichier Excel en mémoire à partir d'un DataFrame.
     """
     output = io.BytesIO()
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        df.to_excel(writer, index=False, sheet_name='Planning')
-        
-        # Ajustement automatique de la largeur des colonnes
-        worksheet = writer.sheets['Planning']
-        for idx, col in enumerate(df.columns):
-            max_len = max(df[col].astype(str).map(len).max(), len(col)) + 2
-            worksheet.column_dimensions[chr(65 + idx)].width = max_len
-            
+    write_workbook(output, [(SHEET_PLANNING, df)])
     return output.getvalue()
+
+
+def export_bundle(target, entries, fmt="xlsx"):
+    """
+    Export groupé de plusieurs plannings, traités un par un.
+
+    Args:
+        target: Chemin ou fichier binaire de sortie.
+        entries: Itérable de (libellé, feuilles) ; feuilles : [(titre, DataFrame)]
+            (cf. schedule_sheets). Un générateur évite de charger tous les plannings.
+        fmt (str): "xlsx" (un classeur : sommaire puis feuilles « libellé - titre »)
+            ou "zip" (un classeur « libellé.xlsx » par planning).
+
+    Returns:
+        int: Nombre de plannings exportés.
+    """
+    count = 0
+    if fmt == "zip":
+        used = set()
+        with zipfile.ZipFile(target, "w", zipfile.ZIP_DEFLATED) as archive:
+            for label, sheets in entries:
+                name = re.sub(r"[^\w.-]+", "_", str(label)).strip("_") or "planning"
+                while name.lower() in used:
+                    name += "_"
+                used.add(name.lower())
+                with archive.open(f"{name}.xlsx", "w") as f:
+                    write_workbook(f, sheets)
+                count += 1
+        return count
+    if fmt != "xlsx":
+        raise ValueError(f"Format d'export inconnu : {fmt}")
+
+    workbook = Workbook(write_only=True)
+    used = {SHEET_INDEX.lower()}
+    index = workbook.create_sheet(SHEET_INDEX)
+    index.column_dimensions["A"].width = 40
+    index.column_dimensions["B"].width = MAX_SHEET_TITLE + 2
+    index.append(["Planning", "Feuille"])
+    for label, sheets in entries:
+        for title, df in sheets:
+            sheet_title = _sheet_title(f"{label} - {title}", used)
+            index.append([str(label), sheet_title])
+            _write_frame(workbook.create_sheet(sheet_title), df)
+        count += 1
+    workbook.save(target)
+    return count
+
+
+def store_entries(store, team=None, year=None):
+    """
+    Plannings publiés (schedule_store.ScheduleStore) pour export_bundle, relus un mois à la fois.
+    """
+    for team_name, y, m in store.published(team, year):
+        names, matrix = store.load_schedule(team_name, y, m)
+        leaves = store.load_leaves(team_name, y, m)
+        available = [matrix.shape[1] - len(leaves.get(name, [])) for name in names]
+        yield f"{team_name} {y}-{m:02d}", schedule_sheets(schedule_frame(matrix, names, y, m), matrix, names, available)
+
+
+def workbook_entries(paths, labels=None):
+    """
+    Relit des classeurs existants feuille par feuille (mode read_only) pour export_bundle.
+
+    Args:
+        labels (list): Libellé de chaque classeur (défaut : nom du fichier).
+    """
+    for i, path in enumerate(paths):
+        workbook = load_workbook(path, read_only=True)
+        try:
+            sheets = []
+            for ws in workbook.worksheets:
+                rows = ws.iter_rows(values_only=True)
+                header = next(rows, None) or []
+                sheets.append((ws.title, pd.DataFrame(list(rows), columns=list(header))))
+            label = labels[i] if labels else re.sub(r"\.xlsx$", "", str(path).replace("\\", "/").split("/")[-1])
+            yield label, sheets
+        finally:
+            workbook.close()
@@ -0,0 +1,267 @@
+"""
+Analyse de faisabilité avant résolution, avec explication des impossibilités.
+
+Seules les règles DURES du modèle peuvent rendre un mois impossible :
+capacité exacte par poste (règle 1), un poste par jour (règle 2), pas de
+Nuit -> Jour (règle 3, historique compris), congés (règle 4), agentes sans
+nuit ni jour de week-end / férié (règle 5).
+
+1. Comptage (quelques millisecondes) : pour chaque jour, agents disponibles
+   pour le matin, pour la nuit et au total ; pour chaque nuit suivie d'un
+   matin, agents disponibles pour l'un ou l'autre (les deux équipes doivent
+   être disjointes). Ces conditions de Hall sont nécessaires.
+2. Si le comptage ne trouve rien, un modèle CP-SAT réduit aux règles DURES
+   est résolu sous hypothèses (un littéral par congé, jour férié, historique
+   et effectif journalier). S'il est infaisable, le noyau d'hypothèses
+   renvoyé par le solveur est réduit par suppression jusqu'à un ensemble
+   minimal : les congés / jours qui, ensemble, rendent le mois impossible.
+   Le solveur se limite à params["num_workers"] threads, comme la résolution.
+
+solve_checked encadre la résolution complète (jobs de fond de l'application,
+traitement par lots) : comptage avant, recherche de conflit après un échec.
+"""
+import calendar
+import time
+
+from ortools.sat.python import cp_model
+
+from schedule_matrix import DAY, NIGHT, schedule_to_matrix
+from scheduler import SHIFTS, _history_code, empty_result, solve_schedule
+
+DEFAULT_TIME_LIMIT = 10.0
+
+SHIFT_LABELS = {DAY: "matin", NIGHT: "nuit"}
+
+
+def _capacity(employees):
+    return 1 if len(employees) < 6 else 2
+
+
+def _eligibility(year, month, employees, leaves, params):
+    """
+    Agents pouvant tenir chaque poste, jour par jour (d'après les seules règles DURES).
+
+    Returns:
+        tuple: (first_day, num_days, {(d, s): set d'indices}, {d: [agents en congé]})
+    """
+    num_days = calendar.monthrange(year, month)[1]
+    first_day = params.get("freeze_before", 1)
+    holidays = set(params.get("holidays", []))
+    history = params.get("history", {})
+    # Nuit la veille du premier jour recalculé : historique, ou dernier jour figé (réparation)
+    if first_day > 1:
+        frozen = schedule_to_matrix(params["frozen_schedule"], [e['name'] for e in employees], num_days)
+        night_before = {n for n in range(len(employees)) if frozen[n, first_day - 2] == NIGHT}
+    else:
+        night_before = {n for n, e in enumerate(employees) if _history_code(history, e['name'], 0) == NIGHT}
+
+    eligible, on_leave = {}, {}
+    for d in range(first_day, num_days + 1):
+        weekend_or_holiday = calendar.weekday(year, month, d) >= 5 or d in holidays
+        on_leave[d] = [e['name'] for e in employees if d in leaves.get(e['name'], [])]
+        for s in SHIFTS:
+            eligible[(d, s)] = set()
+        for n, emp in enumerate(employees):
+            if d in leaves.get(emp['name'], []):
+                continue
+            if emp['sex'] != 'F':
+                eligible[(d, NIGHT)].add(n)
+            if not (emp['sex'] == 'F' and weekend_or_holiday) and not (d == first_day and n in night_before):
+                eligible[(d, DAY)].add(n)
+    return first_day, num_days, eligible, on_leave
+
+
+def check_counts(year, month, employees, leaves, params):
+    """
+    Conditions nécessaires de faisabilité par comptage.
+
+    Returns:
+        list: Problèmes {rule, day, shift, available, required, on_leave}, par jour :
+            "shift_capacity" (un poste n'a pas assez d'agents possibles),
+            "daily_capacity" (matin + nuit du jour), "night_to_day" (nuit de la veille + matin).
+    """
+    capacity = _capacity(employees)
+    first_day, num_days, eligible, on_leave = _eligibility(year, month, employees, leaves, params)
+    issues = []
+    for d in range(first_day, num_days + 1):
+        for s in SHIFTS:
+            if len(eligible[(d, s)]) < capacity:
+                issues.append({"rule": "shift_capacity", "day": d, "shift": s, "available": len(eligible[(d, s)]),
+                               "required": capacity, "on_leave": on_leave[d]})
+        pairs = [("daily_capacity", eligible[(d, NIGHT)])]
+        if d > first_day:
+            pairs.append(("night_to_day", eligible[(d - 1, NIGHT)]))
+        for rule, night_agents in pairs:
+            available = len(eligible[(d, DAY)] | night_agents)
+            if available < 2 * capacity:
+                issues.append({"rule": rule, "day": d, "shift": None, "available": available,
+                               "required": 2 * capacity, "on_leave": on_leave[d]})
+    return issues
+
+
+def find_conflict(year, month, employees, leaves, params, time_limit=DEFAULT_TIME_LIMIT):
+    """
+    Résout le modèle réduit aux règles DURES ; en cas d'impossibilité, extrait un
+    ensemble minimal d'hypothèses incompatibles.
+
+    Returns:
+        dict: status ("FEASIBLE", "INFEASIBLE" ou "UNKNOWN"), conflict ([{kind, agent, day}],
+            kind parmi "leave", "holiday", "history", "staffing" ; vide si faisable).
+    """
+    num_days = calendar.monthrange(year, month)[1]
+    first_day = params.get("freeze_before", 1)
+    holidays = set(params.get("holidays", []))
+    history = params.get("history", {})
+    capacity = _capacity(employees)
+    frozen = None
+    if first_day > 1:
+        frozen = schedule_to_matrix(params["frozen_schedule"], [e['name'] for e in employees], num_days)
+
+    model = cp_model.CpModel()
+    x = {(n, d, s): model.NewBoolVar(f'x_n{n}_d{d}_s{s}')
+         for n in range(len(employees)) for d in range(first_day, num_days + 1) for s in SHIFTS}
+    assumptions = {} # littéral -> élément du conflit
+
+    def assume(item, name):
+        lit = model.NewBoolVar(name)
+        assumptions[lit.Index()] = (lit, item)
+        return lit
+
+    for d in range(first_day, num_days + 1):
+        staffed = assume({"kind": "staffing", "agent": None, "day": d}, f'staffing_d{d}')
+        for s in SHIFTS:
+            model.Add(sum(x[(n, d, s)] for n in range(len(employees))) == capacity).OnlyEnforceIf(staffed)
+    for n, emp in enumerate(employees):
+        for d in range(first_day, num_days + 1):
+            model.Add(x[(n, d, DAY)] + x[(n, d, NIGHT)] <= 1)
+            if d > first_day:
+                model.Add(x[(n, d - 1, NIGHT)] + x[(n, d, DAY)] <= 1)
+            if emp['sex'] == 'F':
+                model.Add(x[(n, d, NIGHT)] == 0)
+                if calendar.weekday(year, month, d) >= 5:
+                    model.Add(x[(n, d, DAY)] == 0)
+                elif d in holidays:
+                    model.Add(x[(n, d, DAY)] == 0).OnlyEnforceIf(
+                        assume({"kind": "holiday", "agent": emp['name'], "day": d}, f'holiday_n{n}_d{d}'))
+        for d in sorted(set(leaves.get(emp['name'], []))):
+            if first_day <= d <= num_days:
+                lit = assume({"kind": "leave", "agent": emp['name'], "day": d}, f'leave_n{n}_d{d}')
+                for s in SHIFTS:
+                    model.Add(x[(n, d, s)] == 0).OnlyEnforceIf(lit)
+        night_before = frozen[n, first_day - 2] == NIGHT if frozen is not None \
+            else _history_code(history, emp['name'], 0) == NIGHT
+        if night_before:
+            model.Add(x[(n, first_day, DAY)] == 0).OnlyEnforceIf(
+                assume({"kind": "history", "agent": emp['name'], "day": first_day - 1}, f'history_n{n}'))
+
+    deadline = time.monotonic() + time_limit
+
+    def solve(indices):
+        model.ClearAssumptions()
+        model.AddAssumptions([assumptions[i][0] for i in indices])
+        solver = cp_model.CpSolver()
+        solver.parameters.max_time_in_seconds = max(0.1, deadline - time.monotonic())
+        if params.get("num_workers"):
+            solver.parameters.num_workers = int(params["num_workers"])
+        status = solver.Solve(model)
+        core = solver.SufficientAssumptionsForInfeasibility() if status == cp_model.INFEASIBLE else []
+        return status, core
+
+    status, core = solve(list(assumptions))
+    if status != cp_model.INFEASIBLE:
+        return {"status": "FEASIBLE" if status in (cp_model.OPTIMAL, cp_model.FEASIBLE) else "UNKNOWN", "conflict": []}
+
+    # Réduction du noyau : une hypothèse est retirée si le reste suffit à l'impossibilité
+    core = list(core)
+    i = 0
+    while i < len(core) and time.monotonic() < deadline:
+        rest = core[:i] + core[i + 1:]
+        sub_status, sub_core = solve(rest)
+        if sub_status == cp_model.INFEASIBLE:
+            core = [lit for lit in rest if lit in set(sub_core)] or rest
+        else:
+            i += 1
+    conflict = [assumptions[i][1] for i in core]
+    conflict.sort(key=lambda item: (item["day"], item["kind"], item["agent"] or ""))
+    return {"status": "INFEASIBLE", "conflict": conflict}
+
+
+def analyze_feasibility(year, month, employees, leaves, params, use_solver=True, time_limit=DEFAULT_TIME_LIMIT):
+    """
+    Vérifie qu'un mois est réalisable avant la résolution complète.
+
+    Args:
+        use_solver (bool): Si le comptage ne détecte rien, cherche un conflit avec CP-SAT.
+
+    Returns:
+        dict: feasible (True, False ou None si indéterminé), issues (cf. check_counts),
+            conflict (cf. find_conflict), wall_time.
+    """
+    start = time.monotonic()
+    analysis = {"feasible": None, "issues": check_counts(year, month, employees, leaves, params),
+                "conflict": [], "wall_time": 0.0}
+    if analysis["issues"]:
+        analysis["feasible"] = False
+    elif use_solver:
+        found = find_conflict(year, month, employees, leaves, params, time_limit)
+        analysis["conflict"] = found["conflict"]
+        analysis["feasible"] = {"FEASIBLE": True, "INFEASIBLE": False}.get(found["status"])
+    analysis["wall_time"] = time.monotonic() - start
+    return analysis
+
+
+def solve_checked(year, month, employees, leaves, params, on_solution=None, stop_event=None,
+                  time_limit=DEFAULT_TIME_LIMIT):
+    """
+    solve_schedule encadré par l'analyse de faisabilité.
+
+    Le comptage (instantané) a lieu avant : un mois impossible est expliqué sans
+    lancer la résolution complète. La recherche de conflit CP-SAT n'a lieu qu'après
+    une résolution sans planning (INFEASIBLE, ou délai atteint), si elle n'a pas été
+    arrêtée : un mois réalisable ne paie pas son coût et la première solution n'est
+    pas retardée.
+
+    Returns:
+        dict: Résultat de solve_schedule complété de "feasibility" (cf. analyze_feasibility) ;
+            mois impossible : status "INFEASIBLE", sans planning.
+    """
+    analysis = analyze_feasibility(year, month, employees, leaves, params, use_solver=False)
+    if analysis["feasible"] is False:
+        return {**empty_result(employees, "INFEASIBLE"), "wall_time": analysis["wall_time"], "feasibility": analysis}
+    result = solve_schedule(year, month, employees, leaves, params, on_solution=on_solution, stop_event=stop_event)
+    if result["matrix"] is None and not (stop_event is not None and stop_event.is_set()):
+        analysis = analyze_feasibility(year, month, employees, leaves, params, time_limit=time_limit)
+        if analysis["feasible"] is False:
+            result["status"] = "INFEASIBLE"
+    result["feasibility"] = analysis
+    return result
+
+
+def describe(analysis):
+    """Explication en français de chaque impossibilité détectée (une phrase par problème)."""
+    lines = []
+    for issue in analysis["issues"]:
+        leave_text = f" (en congé : {', '.join(issue['on_leave'])})" if issue["on_leave"] else ""
+        if issue["rule"] == "shift_capacity":
+            lines.append(f"Jour {issue['day']} : {issue['available']} agent(s) possible(s) pour le poste de "
+                         f"{SHIFT_LABELS[issue['shift']]}, {issue['required']} requis{leave_text}.")
+        elif issue["rule"] == "daily_capacity":
+            lines.append(f"Jour {issue['day']} : {issue['available']} agent(s) disponible(s) pour le matin et la nuit, "
+                         f"{issue['required']} requis{leave_text}.")
+        else:
+            lines.append(f"Jours {issue['day'] - 1}-{issue['day']} : {issue['available']} agent(s) pour la nuit du "
+                         f"{issue['day'] - 1} et le matin du {issue['day']} (pas de Nuit -> Jour), "
+                         f"{issue['required']} requis{leave_text}.")
+    if analysis["conflict"]:
+        parts = []
+        for item in analysis["conflict"]:
+            if item["kind"] == "leave":
+                parts.append(f"congé de {item['agent']} le {item['day']}")
+            elif item["kind"] == "holiday":
+                parts.append(f"jour férié du {item['day']} pour {item['agent']}")
+            elif item["kind"] == "history":
+                parts.append(f"nuit de {item['agent']} la veille du {item['day'] + 1}")
+            else:
+                parts.append(f"effectif complet le {item['day']}")
+        lines.append("Combinaison impossible : " + " ; ".join(parts) + ".")
+    return lines
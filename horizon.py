@@ -0,0 +1,141 @@
+"""
+Planification sur plusieurs mois consécutifs (jusqu'à une année) en horizon glissant.
+
+Les mois sont résolus l'un après l'autre, chacun avec le modèle mensuel habituel :
+- l'historique (3 derniers jours) de chaque mois est déduit du mois précédent ;
+- les compteurs d'équité (matins, nuits, week-ends, jours disponibles) sont
+  reportés (params["carry_over"]) pour que le ratio, l'équilibre Matin/Nuit et
+  la répartition des week-ends de la règle 6 portent sur toute la période écoulée ;
+- un budget de temps global est réparti entre les mois restants (le temps
+  non consommé par un mois profite aux suivants).
+"""
+import calendar
+import time
+
+import numpy as np
+
+from schedule_matrix import DAY, NIGHT, REST
+from scheduler import MAX_TIME_IN_SECONDS, solve_schedule
+
+HISTORY_LABELS = {DAY: "DAY", NIGHT: "NIGHT", REST: "REP"}
+
+
+def month_sequence(year, month, num_months):
+    """[(année, mois), ...] des `num_months` mois à partir de (year, month)."""
+    months = []
+    for i in range(num_months):
+        y, m = divmod(month - 1 + i, 12)
+        months.append((year + y, m + 1))
+    return months
+
+
+def history_from_matrix(matrix, names):
+    """
+    Historique (format params["history"] : [J-3, J-2, J-1]) tiré des 3 derniers jours d'un planning.
+    """
+    return {name: [HISTORY_LABELS[int(code)] for code in row[-3:]] for name, row in zip(names, matrix)}
+
+
+def accumulate_carry_over(carry_over, matrix, names, leaves, year, month):
+    """
+    Ajoute un mois résolu aux compteurs d'équité reportés.
+
+    Returns:
+        dict: {nom: {day, night, weekend, available}} (weekend : postes du samedi et du dimanche)
+    """
+    matrix = np.asarray(matrix)
+    num_days = calendar.monthrange(year, month)[1]
+    mornings = (matrix == DAY).sum(axis=1)
+    nights = (matrix == NIGHT).sum(axis=1)
+    weekend = [calendar.weekday(year, month, d) >= 5 for d in range(1, num_days + 1)]
+    weekends = (matrix[:, weekend] != REST).sum(axis=1)
+    carry_over = {name: dict(counters) for name, counters in carry_over.items()}
+    for i, name in enumerate(names):
+        prev = carry_over.setdefault(name, {"day": 0, "night": 0, "weekend": 0, "available": 0})
+        prev["day"] += int(mornings[i])
+        prev["night"] += int(nights[i])
+        prev["weekend"] = prev.get("weekend", 0) + int(weekends[i])
+        prev["available"] += num_days - len(leaves.get(name, []))
+    return carry_over
+
+
+def _for_month(by_month, year, month):
+    """Valeur d'un dict indexé par (année, mois) ou par "AAAA-MM"."""
+    if not by_month:
+        return None
+    if (year, month) in by_month:
+        return by_month[(year, month)]
+    return by_month.get(f"{year}-{month:02d}")
+
+
+def solve_horizon(year, month, num_months, employees, leaves_by_month, params, holidays_by_month=None,
+                  time_budget=None, carry_fairness=True, on_month=None, stop_event=None):
+    """
+    Planifie `num_months` mois consécutifs à partir de (year, month).
+
+    Args:
+        leaves_by_month (dict): Congés de chaque mois, indexés par (année, mois) ou "AAAA-MM".
+        params (dict): Paramètres communs à tous les mois ; params["history"] ne sert
+            qu'au premier mois.
+        holidays_by_month (dict): Jours fériés de chaque mois (même indexation).
+        time_budget (float): Délai total (s), réparti entre les mois restants.
+            Par défaut : params["stop_rules"]["max_time"] (ou 120 s) par mois.
+        carry_fairness (bool): Reporte les compteurs d'équité d'un mois sur l'autre.
+        on_month (callable): Appelée avec (année, mois, résultat) après chaque mois.
+        stop_event (threading.Event): Arrête la résolution en cours et les mois suivants.
+
+    Returns:
+        dict: months ([{year, month, **résultat de solve_schedule}]), status (le moins bon
+            des mois ; "UNKNOWN"/"INFEASIBLE" interrompt l'horizon), objective (somme),
+            wall_time, carry_over (compteurs à la fin de l'horizon), history (pour le mois suivant).
+    """
+    names = [e['name'] for e in employees]
+    stop_rules = params.get("stop_rules", {})
+    per_month = float(stop_rules.get("max_time") or MAX_TIME_IN_SECONDS)
+    start = time.monotonic()
+
+    history = params.get("history", {})
+    carry_over = params.get("carry_over", {})
+    months = month_sequence(year, month, num_months)
+    results = []
+    status = "OPTIMAL"
+    for i, (y, m) in enumerate(months):
+        if stop_event is not None and stop_event.is_set():
+            status = "UNKNOWN"
+            break
+        leaves = _for_month(leaves_by_month, y, m) or {}
+        max_time = per_month
+        if time_budget is not None:
+            remaining = time_budget - (time.monotonic() - start)
+            max_time = max(1.0, remaining / (num_months - i))
+
+        month_params = {**params, "history": history, "stop_rules": {**stop_rules, "max_time": max_time}}
+        holidays = _for_month(holidays_by_month, y, m)
+        if holidays is not None:
+            month_params["holidays"] = holidays
+        if carry_fairness:
+            month_params["carry_over"] = carry_over
+        else:
+            month_params.pop("carry_over", None)
+
+        result = solve_schedule(y, m, employees, leaves, month_params, stop_event=stop_event)
+        results.append({"year": y, "month": m, **result})
+        if on_month is not None:
+            on_month(y, m, result)
+        if result["matrix"] is None:
+            status = result["status"]
+            break
+        if result["status"] != "OPTIMAL":
+            status = "FEASIBLE"
+        history = history_from_matrix(result["matrix"], names)
+        carry_over = accumulate_carry_over(carry_over, result["matrix"], names, leaves, y, m)
+
+    solved = [r for r in results if r["objective"] is not None]
+    return {
+        "months": results,
+        "status": status,
+        "objective": sum(r["objective"] for r in solved),
+        "wall_time": time.monotonic() - start,
+        "carry_over": carry_over,
+        "history": history,
+    }
@@ -0,0 +1,227 @@
+"""
+Gabarits de modèle CP-SAT : le modèle standard est construit une fois par forme d'équipe.
+
+Pour un calendrier donné (nombre de jours, jour de la semaine du 1er), une
+composition d'équipe (sexe de chaque agent, dans l'ordre) et max_consecutive_work,
+la structure du modèle de scheduler._build_model est toujours la même : l'historique,
+les congés, les jours fériés et les compteurs reportés ne font que fixer des valeurs.
+
+Le gabarit (_build_model(template=True)) représente ces entrées par des variables.
+Son proto est sérialisé et mis en cache (mémoire + disque, partagé entre processus) ;
+chaque demande relit le proto et fixe le domaine des variables d'entrée et des
+postes impossibles (congés, fériés), sans reconstruire le modèle en Python.
+
+Utilisation : params["model"] = "template" (cf. scheduler.solve_schedule).
+"""
+import calendar
+import hashlib
+import os
+import threading
+
+from ortools.sat.python import cp_model
+
+from schedule_cache import DEFAULT_CACHE_DIR, ScheduleCache
+from schedule_matrix import DAY
+from scheduler import (
+    MODEL_VERSION, SHIFTS, TEMPLATE_MAX_CARRY, _ModelSizeTracker, _add_symmetry_breaking, _agent_classes, _add_warm_start,
+    _build_model, _carry_over, _history_code, _max_consecutive_work, _objective,
+)
+
+DEFAULT_TEMPLATE_DIR = os.environ.get("PLANNING_TEMPLATE_DIR", os.path.join(DEFAULT_CACHE_DIR, "templates"))
+DEFAULT_TEMPLATE_MAX_BYTES = 100 * 1024 * 1024
+DEFAULT_TEMPLATE_MEMORY_ITEMS = 16
+
+
+def template_key(year, month, employees, leaves, params):
+    """Empreinte de la forme d'équipe : deux demandes de même clé partagent le même gabarit."""
+    num_days = calendar.monthrange(year, month)[1]
+    shape = "|".join([
+        MODEL_VERSION,
+        str(num_days),
+        str(calendar.weekday(year, month, 1)),
+        ",".join(e['sex'] for e in employees),
+        str(_max_consecutive_work(employees, leaves)),
+        "carry" if params.get("carry_over") else "",
+    ])
+    return hashlib.sha256(shape.encode("utf-8")).hexdigest()
+
+
+def template_supported(year, month, employees, leaves, params):
+    """
+    Vrai si la demande peut être instanciée depuis un gabarit.
+
+    Exclus : mode réparation (jours figés), agent sans aucun jour disponible
+    (exclu du ratio d'équité par le modèle standard), compteurs reportés
+    au-delà de TEMPLATE_MAX_CARRY.
+    """
+    if params.get("freeze_before", 1) > 1:
+        return False
+    num_days = calendar.monthrange(year, month)[1]
+    for emp in employees:
+        prev_m, prev_n, prev_w, prev_avail = _carry_over(params, emp['name'])
+        if not all(0 <= c <= TEMPLATE_MAX_CARRY for c in (prev_m, prev_n, prev_w, prev_avail)):
+            return False
+        if num_days - len(leaves.get(emp['name'], [])) + prev_avail < 1:
+            return False
+    return True
+
+
+def build_template(year, month, employees, leaves, params):
+    """
+    Construit et sérialise le gabarit de la forme d'équipe de la demande.
+
+    Returns:
+        dict: {key, num_days, proto (octets), shifts ({(n, d, s): indice}),
+            inputs ({famille: {clé: indice}}), penalties ([(règle, agent, indices,
+            coefficients, constante)], regroupées par règle et par agent), model_size}
+    """
+    ctx = _build_model(year, month, employees, leaves, params, template=True)
+    model = ctx["model"]
+    model.Minimize(_objective(ctx))
+
+    grouped = {}
+    for rule, n, term in ctx["penalties"]:
+        coeffs, offset = grouped.setdefault((rule, n), ({}, [0]))
+        if isinstance(term, int):
+            offset[0] += term
+            continue
+        expr = model.parse_linear_expression(term)
+        for index, coeff in zip(expr.vars, expr.coeffs):
+            coeffs[index] = coeffs.get(index, 0) + coeff
+        offset[0] += expr.offset
+
+    inputs = ctx["inputs"]
+    return {
+        "key": template_key(year, month, employees, leaves, params),
+        "num_days": ctx["num_days"],
+        "proto": model.Proto().SerializeToString(),
+        "shifts": {key: var.Index() for key, var in ctx["shifts"].items()},
+        "inputs": {
+            "history": {key: var.Index() for key, var in inputs["history"].items()},
+            "weekday_off": {key: var.Index() for key, var in inputs["weekday_off"].items()},
+            "available": {n: var.Index() for n, var in inputs["available"].items()},
+            "carry": {n: tuple(var.Index() for var in carry) for n, carry in inputs["carry"].items()},
+        },
+        "penalties": [(rule, n, list(coeffs), list(coeffs.values()), offset[0])
+                      for (rule, n), (coeffs, offset) in grouped.items()],
+        "model_size": ctx["model_size"],
+    }
+
+
+class TemplateCache(ScheduleCache):
+    """
+    Cache des gabarits sérialisés (mêmes niveaux mémoire / disque que ScheduleCache).
+    """
+
+    def __init__(self, directory=DEFAULT_TEMPLATE_DIR, max_bytes=DEFAULT_TEMPLATE_MAX_BYTES,
+                 memory_items=DEFAULT_TEMPLATE_MEMORY_ITEMS):
+        super().__init__(directory, max_bytes, memory_items)
+
+    def _cacheable(self, template):
+        return True
+
+
+_default_template_cache = None
+_default_lock = threading.Lock()
+
+
+def get_template_cache():
+    """Cache de gabarits partagé du processus, stocké dans DEFAULT_TEMPLATE_DIR."""
+    global _default_template_cache
+    with _default_lock:
+        if _default_template_cache is None:
+            _default_template_cache = TemplateCache()
+        return _default_template_cache
+
+
+def get_template(year, month, employees, leaves, params, cache=None):
+    """Retourne le gabarit de la demande, construit et mis en cache au premier appel."""
+    cache = cache or get_template_cache()
+    key = template_key(year, month, employees, leaves, params)
+    template = cache.get(key)
+    if template is None:
+        template = build_template(year, month, employees, leaves, params)
+        cache.put(key, template)
+    return template
+
+
+def instantiate_template(template, year, month, employees, leaves, params):
+    """
+    Crée le modèle d'une demande à partir d'un gabarit : les entrées sont fixées par
+    domaine, puis le démarrage à chaud et le cassage de symétries sont ajoutés.
+
+    Returns:
+        dict: Contexte du modèle, au même format que scheduler._build_model.
+    """
+    model = cp_model.CpModel()
+    proto = model.Proto()
+    proto.ParseFromString(template["proto"])
+    variables = proto.variables
+    num_days = template["num_days"]
+
+    def var(index):
+        # Poignée sur une variable existante du proto (CpModel.clone() les recréerait toutes)
+        domain = variables[index].domain
+        return cp_model.IntVar(proto, index, domain[0] >= 0 and domain[-1] <= 1, None)
+
+    def fix(index, value):
+        variables[index].domain[:] = [value, value]
+
+    inputs = template["inputs"]
+    history = params.get("history", {})
+    holidays = set(params.get("holidays", []))
+    for n, emp in enumerate(employees):
+        emp_leaves = leaves.get(emp['name'], [])
+        for d in set(emp_leaves):
+            if 1 <= d <= num_days:
+                for s in SHIFTS:
+                    fix(template["shifts"][(n, d, s)], 0)
+        if emp['sex'] == 'F':
+            for d in holidays:
+                if 1 <= d <= num_days and calendar.weekday(year, month, d) < 5:
+                    fix(template["shifts"][(n, d, DAY)], 0)
+        for d in (-2, -1, 0):
+            code = _history_code(history, emp['name'], d)
+            for s in SHIFTS:
+                fix(inputs["history"][(n, d, s)], 1 if code == s else 0)
+        prev_m, prev_n, prev_w, prev_avail = _carry_over(params, emp['name'])
+        fix(inputs["available"][n], num_days - len(emp_leaves) + prev_avail)
+        for index, value in zip(inputs["carry"].get(n, ()), (prev_m, prev_n, prev_w)):
+            fix(index, value)
+    for (n, d), index in inputs["weekday_off"].items():
+        fix(index, 1 if d in holidays or d in leaves.get(employees[n]['name'], []) else 0)
+
+    shifts = {key: var(index) for key, index in template["shifts"].items()}
+    penalties = [(rule, n, cp_model.LinearExpr.WeightedSum([var(i) for i in indices], coeffs) + offset)
+                 for rule, n, indices, coeffs, offset in template["penalties"]]
+
+    size = _ModelSizeTracker(model, template["model_size"])
+    changes = []
+    _add_warm_start(model, shifts, employees, num_days, params, 1, changes)
+    size.mark("warm_start")
+    if changes: # L'objectif du gabarit ne suffit plus : il sera recalculé avec les pénalités de changement
+        penalties.extend(changes)
+        model.ClearObjective()
+    if params.get("symmetry_breaking", True) and params.get("previous_schedule") is None \
+            and _agent_classes(employees, leaves, params):
+        # Le cassage de symétries crée des variables : le modèle Python doit connaître celles du proto
+        model.rebuild_var_and_constant_map()
+    row_names = _add_symmetry_breaking(model, shifts, employees, leaves, params, num_days)
+    size.mark("symmetry")
+
+    return {
+        "model": model, "shifts": shifts, "penalties": penalties,
+        "year": year, "month": month, "num_days": num_days, "employees": employees, "leaves": leaves,
+        "row_names": row_names, "model_size": size.counts, "inputs": None,
+    }
+
+
+def build_model_from_template(year, month, employees, leaves, params, cache=None):
+    """
+    Équivalent de scheduler._build_model servi par le cache de gabarits ;
+    construit directement le modèle si la demande n'est pas instanciable.
+    """
+    if not template_supported(year, month, employees, leaves, params):
+        return _build_model(year, month, employees, leaves, params)
+    template = get_template(year, month, employees, leaves, params, cache)
+    return instantiate_template(template, year, month, employees, leaves, params)
@@ -0,0 +1,206 @@
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from scheduler import MODEL_VERSION, solve_schedule
+
+# Répertoire du cache disque (partageable entre plusieurs processus Streamlit)
+DEFAULT_CACHE_DIR = os.environ.get(
+    "PLANNING_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "emploi_planning")
+)
+DEFAULT_MAX_BYTES = 200 * 1024 * 1024
+DEFAULT_MEMORY_ITEMS = 32
+
+# Seuls les résultats définitifs sont mis en cache : un planning FEASIBLE (délai atteint) pourrait
+# être amélioré par une nouvelle résolution, UNKNOWN = délai dépassé sans solution
+CACHEABLE_STATUSES = {"OPTIMAL", "INFEASIBLE"}
+
+
+def _canonical(obj):
+    """
+    Convertit récursivement une entrée en structure JSON stable (clés triées, types natifs).
+    """
+    if isinstance(obj, dict):
+        return {str(k): _canonical(v) for k, v in sorted(obj.items(), key=lambda kv: str(kv[0]))}
+    if isinstance(obj, (set, frozenset)):
+        return sorted(_canonical(v) for v in obj)
+    if isinstance(obj, (list, tuple)):
+        return [_canonical(v) for v in obj]
+    if isinstance(obj, pd.DataFrame):
+        return _canonical(obj.to_dict(orient="split"))
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    return obj
+
+
+def schedule_key(year, month, employees, leaves, params):
+    """
+    Calcule l'empreinte SHA-256 d'une demande de planning.
+
+    Les jours de congés et les jours fériés sont normalisés (triés, dédoublonnés) :
+    deux saisies équivalentes produisent la même clé. La version du modèle fait
+    partie de la clé pour invalider le cache à chaque évolution des règles.
+
+    Sans pénalité de changement, le planning précédent n'est qu'un indice de
+    démarrage : il est exclu de la clé (une résolution à chaud retrouve le
+    résultat d'une résolution à froid identique, et inversement).
+    """
+    params = dict(params)
+    params["holidays"] = sorted(set(params.get("holidays", [])))
+    if not params.get("change_penalty"):
+        params.pop("previous_schedule", None)
+        params.pop("change_penalty", None)
+    payload = {
+        "model_version": MODEL_VERSION,
+        "year": int(year),
+        "month": int(month),
+        "employees": [{"name": e["name"], "sex": e["sex"]} for e in employees],
+        "leaves": {name: sorted(set(days)) for name, days in leaves.items() if days},
+        "params": params,
+    }
+    blob = json.dumps(_canonical(payload), sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class ScheduleCache:
+    """
+    Cache à deux niveaux des résultats de `solve_schedule`.
+
+    - Mémoire : LRU de `memory_items` entrées, propre au processus.
+    - Disque : un fichier pickle par clé dans `directory`, éviction des fichiers
+      les moins récemment utilisés au-delà de `max_bytes`.
+
+    Les écritures passent par un fichier temporaire renommé atomiquement
+    (os.replace), ce qui permet à plusieurs processus de partager le répertoire
+    sans verrou : un lecteur voit soit l'ancien fichier, soit le nouveau.
+    """
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES, memory_items=DEFAULT_MEMORY_ITEMS):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.memory_items = memory_items
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.pkl")
+
+    def get(self, key):
+        """Retourne le résultat en cache pour `key`, ou None."""
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return self._memory[key]
+        if not self.directory:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                result = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+        try:
+            os.utime(path)  # Marque l'entrée comme récemment utilisée
+        except OSError:
+            pass  # Entrée valide : seul l'ordre d'éviction est approximatif
+        self._remember(key, result)
+        return result
+
+    def _cacheable(self, result):
+        return result.get("status") in CACHEABLE_STATUSES
+
+    def put(self, key, result):
+        """Enregistre `result` sous `key` (mémoire + disque) si son statut est définitif."""
+        if not self._cacheable(result):
+            return
+        self._remember(key, result)
+        if not self.directory:
+            return
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self._path(key))
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+        self._evict()
+
+    def clear(self):
+        """Vide les deux niveaux du cache."""
+        with self._lock:
+            self._memory.clear()
+        if self.directory:
+            for name in os.listdir(self.directory):
+                if name.endswith(".pkl"):
+                    try:
+                        os.remove(os.path.join(self.directory, name))
+                    except OSError:
+                        pass
+
+    def _remember(self, key, result):
+        with self._lock:
+            self._memory[key] = result
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_items:
+                self._memory.popitem(last=False)
+
+    def _evict(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".pkl"):
+                continue
+            try:
+                st = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue  # Supprimé entre-temps par un autre processus
+            entries.append((st.st_mtime, st.st_size, name))
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                pass
+            total -= size
+
+
+_default_cache = None
+
+
+def get_default_cache():
+    """Cache partagé du processus, stocké dans DEFAULT_CACHE_DIR."""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = ScheduleCache()
+    return _default_cache
+
+
+def cached_solve_schedule(year, month, employees, leaves, params, cache=None):
+    """
+    Comme `solve_schedule`, mais réutilise un résultat déjà calculé pour les mêmes entrées.
+
+    Returns:
+        dict: Résultat de `solve_schedule`, avec la clé `cache_hit` (bool).
+    """
+    cache = cache or get_default_cache()
+    key = schedule_key(year, month, employees, leaves, params)
+    result = cache.get(key)
+    if result is not None:
+        return {**result, "cache_hit": True}
+    result = solve_schedule(year, month, employees, leaves, params)
+    cache.put(key, result)
+    return {**result, "cache_hit": False}
@@ -0,0 +1,118 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+
+# Codage compact d'un planning : une ligne par agent, une colonne par jour
+# (mêmes valeurs que history_map dans scheduler.py)
+REST = -1
+DAY = 0
+NIGHT = 1
+
+# Libellés de la vue par agent, indexés par code + 1 (REST, DAY, NIGHT)
+PIVOT_LABELS = np.array(["", "J", "N"], dtype=object)
+WEEKDAY_LABELS = ["Lun", "Mar", "Mer", "Jeu", "Ven", "Sam", "Dim"]
+
+
+def _split_names(cell):
+    if not isinstance(cell, str):
+        return []
+    return [n.strip() for n in cell.split(",") if n.strip()]
+
+
+def schedule_to_matrix(schedule, names, num_days=None):
+    """
+    Convertit un planning en matrice agent×jour int8 (REST/DAY/NIGHT).
+
+    Args:
+        schedule: DataFrame Jour/Matin/Nuit (sortie de generate_schedule),
+            matrice agent×jour (ndarray ou liste de listes, lignes dans l'ordre de `names`)
+            ou dict {nom_employé: [poste_jour_1, ...]}.
+        names (list): Noms des agents, dans l'ordre des lignes voulues.
+        num_days (int): Nombre de colonnes ; par défaut, la longueur du planning.
+
+    Returns:
+        np.ndarray: Matrice int8 de forme (len(names), num_days).
+    """
+    if isinstance(schedule, pd.DataFrame):
+        days = schedule["Jour"].astype(int).tolist()
+        width = num_days or max(days, default=0)
+        matrix = np.full((len(names), width), REST, dtype=np.int8)
+        row_of = {name: i for i, name in enumerate(names)}
+        for col, code in (("Matin", DAY), ("Nuit", NIGHT)):
+            for day, cell in zip(days, schedule[col]):
+                if not 1 <= day <= width:
+                    continue
+                for name in _split_names(cell):
+                    if name in row_of:
+                        matrix[row_of[name], day - 1] = code
+        return matrix
+
+    if isinstance(schedule, dict):
+        rows = [schedule.get(name, []) for name in names]
+    else:
+        rows = list(np.asarray(schedule))
+    width = num_days or max((len(r) for r in rows), default=0)
+    matrix = np.full((len(names), width), REST, dtype=np.int8)
+    for i, row in enumerate(rows):
+        row = np.asarray(row, dtype=np.int8)[:width]
+        matrix[i, :len(row)] = row
+    return matrix
+
+
+def schedule_frame(matrix, names, year, month):
+    """
+    Construit le DataFrame Jour/Date/Semaine/Matin/Nuit (format de generate_schedule)
+    à partir d'une matrice agent×jour.
+
+    Args:
+        matrix (np.ndarray): Matrice int8 (len(names), jours).
+        names (list): Noms des agents, dans l'ordre des lignes.
+        year (int), month (int): Mois du planning.
+
+    Returns:
+        pd.DataFrame: Une ligne par jour ; noms séparés par ", " dans l'ordre des lignes.
+    """
+    matrix = np.asarray(matrix).reshape(len(names), -1)
+    num_days = matrix.shape[1]
+    names = np.asarray(names, dtype=object)
+    dates = [datetime.date(year, month, d) for d in range(1, num_days + 1)]
+    return pd.DataFrame({
+        "Jour": np.arange(1, num_days + 1),
+        "Date": [date.strftime("%d/%m/%Y") for date in dates],
+        "Semaine": [WEEKDAY_LABELS[date.weekday()] for date in dates],
+        "Matin": [", ".join(names[col == DAY]) for col in matrix.T],
+        "Nuit": [", ".join(names[col == NIGHT]) for col in matrix.T],
+    })
+
+
+def schedule_pivot(matrix, names, labels=PIVOT_LABELS):
+    """
+    Vue par agent : une ligne par agent, une colonne par jour, "J" / "N" / "" (repos).
+
+    Args:
+        labels: Libellés indexés par code + 1 (autres postes, cf. engine.py).
+    """
+    matrix = np.asarray(matrix)
+    return pd.DataFrame(np.asarray(labels, dtype=object)[matrix.astype(np.intp) + 1], index=list(names),
+                        columns=np.arange(1, matrix.shape[1] + 1))
+
+
+def schedule_stats(matrix, names, available_days):
+    """
+    Statistiques par agent : postes du matin, de nuit, total et charge
+    (postes / jours disponibles, en %).
+
+    Args:
+        available_days (list): Jours disponibles (hors congés) de chaque agent.
+    """
+    matrix = np.asarray(matrix)
+    mornings = (matrix == DAY).sum(axis=1)
+    nights = (matrix == NIGHT).sum(axis=1)
+    total = mornings + nights
+    avail = np.asarray(available_days, dtype=float)
+    charge = np.divide(total * 100, avail, out=np.zeros(len(total)), where=avail > 0)
+    return pd.DataFrame({
+        "Agent": list(names), "Matins": mornings, "Nuits": nights, "Total": total,
+        "Charge %": charge.round(1),
+    })
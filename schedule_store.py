@@ -0,0 +1,211 @@
+"""
+Stockage persistant (SQLite) des plannings publiés.
+
+Chaque planning accepté est enregistré ligne à ligne (équipe, agent, date, poste),
+ce qui permet de retrouver en une requête indexée :
+- l'historique des derniers jours avant un mois (params["history"]) ;
+- les compteurs cumulés depuis le début de l'année (matins, nuits, week-ends,
+  jours disponibles), utilisés comme report d'équité (params["carry_over"]).
+"""
+import calendar
+import datetime
+import os
+import sqlite3
+from contextlib import closing, contextmanager
+
+import numpy as np
+
+from schedule_matrix import DAY, NIGHT, REST, schedule_to_matrix
+
+DEFAULT_STORE_PATH = os.environ.get(
+    "PLANNING_STORE_PATH", os.path.join(os.path.expanduser("~"), ".local", "share", "emploi_planning", "plannings.db")
+)
+
+HISTORY_LABELS = {DAY: "DAY", NIGHT: "NIGHT", REST: "REP"}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS assignments (
+    team TEXT NOT NULL,
+    agent TEXT NOT NULL,
+    day TEXT NOT NULL,              -- date ISO AAAA-MM-JJ
+    shift INTEGER NOT NULL,         -- REST=-1, DAY=0, NIGHT=1 (cf. schedule_matrix)
+    on_leave INTEGER NOT NULL,
+    weekend INTEGER NOT NULL,
+    PRIMARY KEY (team, day, agent)  -- Table ordonnée par équipe puis date : lectures par période contiguës
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS assignments_team_agent_day ON assignments (team, agent, day);
+CREATE TABLE IF NOT EXISTS schedules (
+    team TEXT NOT NULL,
+    year INTEGER NOT NULL,
+    month INTEGER NOT NULL,
+    agents TEXT NOT NULL,           -- noms dans l'ordre des lignes, séparés par "\\n"
+    status TEXT,
+    objective INTEGER,
+    saved_at TEXT NOT NULL,
+    PRIMARY KEY (team, year, month)
+);
+"""
+
+
+def _month_bounds(year, month):
+    """Dates ISO du 1er du mois et du 1er du mois suivant."""
+    first = datetime.date(year, month, 1)
+    nxt = datetime.date(year + month // 12, month % 12 + 1, 1)
+    return first.isoformat(), nxt.isoformat()
+
+
+class ScheduleStore:
+    """
+    Base SQLite des plannings publiés, partageable entre processus (mode WAL).
+
+    Une connexion est ouverte par opération : l'objet peut être partagé entre
+    les threads du serveur Streamlit.
+    """
+
+    def __init__(self, path=DEFAULT_STORE_PATH):
+        self.path = path
+        if path != ":memory:" and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._memory = sqlite3.connect(path, check_same_thread=False) if path == ":memory:" else None
+        with self._connect() as conn:
+            if self._memory is None:
+                conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        if self._memory is not None:
+            with self._memory:
+                yield self._memory
+            return
+        with closing(sqlite3.connect(self.path, timeout=30)) as conn:
+            with conn:  # Transaction : commit, ou rollback en cas d'erreur
+                yield conn
+
+    def save_schedule(self, team, year, month, names, schedule, leaves=None, result=None):
+        """
+        Enregistre (ou remplace) le planning d'un mois.
+
+        Args:
+            names (list): Agents, dans l'ordre des lignes de `schedule`.
+            schedule: Matrice agent×jour ou DataFrame (cf. schedule_to_matrix).
+            leaves (dict): Congés du mois {nom: [jours]} (exclus des jours disponibles).
+            result (dict): Résultat de solve_schedule (statut et objectif conservés).
+        """
+        num_days = calendar.monthrange(year, month)[1]
+        matrix = schedule_to_matrix(schedule, names, num_days)
+        leaves = leaves or {}
+        dates = [datetime.date(year, month, d) for d in range(1, num_days + 1)]
+        rows = [(team, name, date.isoformat(), int(matrix[i, d]), int(d + 1 in leaves.get(name, [])),
+                 int(date.weekday() >= 5))
+                for i, name in enumerate(names) for d, date in enumerate(dates)]
+        start, end = _month_bounds(year, month)
+        with self._connect() as conn:
+            conn.execute("DELETE FROM assignments WHERE team = ? AND day >= ? AND day < ?", (team, start, end))
+            conn.executemany("INSERT INTO assignments VALUES (?, ?, ?, ?, ?, ?)", rows)
+            conn.execute("INSERT OR REPLACE INTO schedules VALUES (?, ?, ?, ?, ?, ?, ?)",
+                         (team, year, month, "\n".join(names), (result or {}).get("status"),
+                          (result or {}).get("objective"), datetime.datetime.now().isoformat(timespec="seconds")))
+
+    def load_schedule(self, team, year, month, names=None):
+        """
+        Relit un planning enregistré.
+
+        Returns:
+            tuple or None: (names, matrice agent×jour), ou None si le mois n'est pas enregistré.
+        """
+        with self._connect() as conn:
+            saved = conn.execute("SELECT agents FROM schedules WHERE team = ? AND year = ? AND month = ?",
+                                 (team, year, month)).fetchone()
+            if saved is None:
+                return None
+            start, end = _month_bounds(year, month)
+            rows = conn.execute("SELECT agent, day, shift FROM assignments WHERE team = ? AND day >= ? AND day < ?",
+                                (team, start, end)).fetchall()
+        names = list(names) if names is not None else saved[0].split("\n")
+        row_of = {name: i for i, name in enumerate(names)}
+        matrix = np.full((len(names), calendar.monthrange(year, month)[1]), REST, dtype=np.int8)
+        for agent, day, shift in rows:
+            if agent in row_of:
+                matrix[row_of[agent], int(day[8:10]) - 1] = shift
+        return names, matrix
+
+    def history(self, team, year, month, names, days=3):
+        """
+        Postes des `days` derniers jours avant le 1er du mois (format params["history"]).
+        Les jours non enregistrés sont des repos ("REP").
+        """
+        first = datetime.date(year, month, 1)
+        start = first - datetime.timedelta(days=days)
+        with self._connect() as conn:
+            rows = conn.execute("SELECT agent, day, shift FROM assignments WHERE team = ? AND day >= ? AND day < ?",
+                                (team, start.isoformat(), first.isoformat())).fetchall()
+        history = {name: ["REP"] * days for name in names}
+        for agent, day, shift in rows:
+            if agent in history:
+                offset = (datetime.date.fromisoformat(day) - start).days
+                history[agent][offset] = HISTORY_LABELS[shift]
+        return history
+
+    def fairness_counts(self, team, year, month, names=None, since=None):
+        """
+        Compteurs cumulés par agent entre `since` (défaut : 1er janvier) et le 1er du mois.
+
+        Returns:
+            dict: {nom: {day, night, weekend, available}} (available = jours enregistrés hors congés).
+        """
+        since = since or datetime.date(year, 1, 1)
+        first = datetime.date(year, month, 1)
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT agent, SUM(shift = 0), SUM(shift = 1), SUM(shift >= 0 AND weekend), SUM(on_leave = 0) "
+                "FROM assignments WHERE team = ? AND day >= ? AND day < ? GROUP BY agent",
+                (team, since.isoformat(), first.isoformat())).fetchall()
+        counts = {agent: {"day": d, "night": n, "weekend": w, "available": a} for agent, d, n, w, a in rows}
+        if names is not None:
+            zero = {"day": 0, "night": 0, "weekend": 0, "available": 0}
+            counts = {name: counts.get(name, dict(zero)) for name in names}
+        return counts
+
+    def carry_over(self, team, year, month, names, since=None):
+        """Compteurs depuis le début de l'année au format params["carry_over"]."""
+        return {name: {k: c[k] for k in ("day", "night", "weekend", "available")}
+                for name, c in self.fairness_counts(team, year, month, names, since).items()}
+
+    def prepare_params(self, team, year, month, employees, params, carry_fairness=True):
+        """
+        Complète `params` avec l'historique enregistré et, si demandé, le report
+        d'équité depuis le début de l'année (un historique saisi n'est pas écrasé).
+        """
+        names = [e['name'] for e in employees]
+        params = dict(params)
+        if not params.get("history"):
+            params["history"] = self.history(team, year, month, names)
+        if carry_fairness and month > 1:
+            params["carry_over"] = self.carry_over(team, year, month, names)
+        return params
+
+    def load_leaves(self, team, year, month):
+        """Congés enregistrés avec le planning d'un mois {nom: [jours]}."""
+        start, end = _month_bounds(year, month)
+        with self._connect() as conn:
+            rows = conn.execute("SELECT agent, day FROM assignments WHERE team = ? AND day >= ? AND day < ? "
+                                "AND on_leave ORDER BY agent, day", (team, start, end)).fetchall()
+        leaves = {}
+        for agent, day in rows:
+            leaves.setdefault(agent, []).append(int(day[8:10]))
+        return leaves
+
+    def published(self, team=None, year=None):
+        """Mois enregistrés [(équipe, année, mois)], filtrés par équipe et / ou année."""
+        query, args = "SELECT team, year, month FROM schedules WHERE 1", []
+        if team is not None:
+            query, args = query + " AND team = ?", args + [team]
+        if year is not None:
+            query, args = query + " AND year = ?", args + [year]
+        with self._connect() as conn:
+            return conn.execute(query + " ORDER BY team, year, month", args).fetchall()
+
+    def teams(self):
+        with self._connect() as conn:
+            return [row[0] for row in conn.execute("SELECT DISTINCT team FROM schedules ORDER BY team")]
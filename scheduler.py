@@ -1,142 +1,410 @@
-import pandas as pd
 from ortools.sat.python import cp_model
 import datetime
 import calendar
+import queue
+import random
+import threading
+import time
+import numpy as np
+from schedule_matrix import DAY, NIGHT, REST, schedule_frame, schedule_to_matrix
 
-def generate_schedule(year, month, employees, leaves, params):
+# Types de postes (codage partagé avec schedule_matrix.py)
+SHIFTS = [DAY, NIGHT]
+
+# Version des règles du modèle : à incrémenter à chaque changement de contraintes/pénalités
+# (invalide les plannings mis en cache, cf. schedule_cache.py)
+MODEL_VERSION = "2026.10-5"
+
+# Poids des pénalités (règles MOLLES), par famille de règle
+PENALTY_WEIGHTS = {
+    "mandatory_weekday": 3000, # Agente absente un Lun-Jeu
+    "friday": 1,               # Agente présente le vendredi
+    "internal_balance": 10,    # Par point d'écart |Matin - Nuit| (hommes)
+    "internal_over3": 400,     # |Matin - Nuit| > 3
+    "internal_over4": 800,     # |Matin - Nuit| > 4
+    "ratio_gap": 300,          # Par point (sur 1000) d'écart de ratio max - min
+    "weekend_gap": 50,         # Par poste d'écart de postes de week-end max - min (hommes)
+    "over_consecutive": 1500,  # Plus de max_consecutive_work jours travaillés de suite
+    "over_same": 500,          # 3 postes identiques de suite (hommes)
+    "isolated_work": 200,      # Jour travaillé isolé
+    "over_rest": 1000,         # 5 jours de repos de suite
+    "isolated_rest": 500,      # Repos isolé
+    "rest4": 20,               # 4 jours de repos de suite
+    "bad_nrj": 1000,           # Nuit - Repos - Jour
+    "bad_nrn": 500,            # Nuit - Repos - Nuit
+    "bad_jrj": 500,            # Jour - Repos - Jour
+}
+
+# Limite de temps par défaut du solveur (secondes)
+MAX_TIME_IN_SECONDS = 120.0
+
+# Mode hiérarchique (params["objective_mode"] = "lexicographic") : niveaux de règles,
+# du plus critique au moins important (règle absente : dernier niveau), et part du
+# délai de chaque niveau (le temps non consommé profite aux suivants)
+OBJECTIVE_TIERS = [
+    ["mandatory_weekday", "over_consecutive", "ratio_gap", "over_rest", "bad_nrj", "internal_over4"],
+    ["over_same", "isolated_rest", "bad_nrn", "bad_jrj", "internal_over3", "isolated_work"],
+    ["internal_balance", "weekend_gap", "rest4", "friday", "change"],
+]
+TIER_TIME_SHARES = [0.5, 0.3, 0.2]
+
+# Mode gabarit (cf. model_template.py) : borne des compteurs reportés (params["carry_over"])
+TEMPLATE_MAX_CARRY = 400
+
+def _is_constant(expr):
+    """Vrai si l'expression ne dépend d'aucune variable (jours d'historique ou figés)."""
+    return isinstance(expr, int)
+
+
+class _ModelSizeTracker:
+    """Attribue à une famille de règles les variables/contraintes ajoutées depuis le point précédent."""
+
+    def __init__(self, model, counts=None):
+        self._proto = model.Proto()
+        self._last = (len(self._proto.variables), len(self._proto.constraints))
+        self.counts = {family: dict(entry) for family, entry in (counts or {}).items()}
+
+    def mark(self, family):
+        size = (len(self._proto.variables), len(self._proto.constraints))
+        entry = self.counts.setdefault(family, {"variables": 0, "constraints": 0})
+        entry["variables"] += size[0] - self._last[0]
+        entry["constraints"] += size[1] - self._last[1]
+        self._last = size
+
+
+def _objective(ctx):
+    """Somme des pénalités (règle, agent, terme) du modèle."""
+    return sum(term for _, _, term in ctx["penalties"])
+
+
+def _history_code(history, agent_name, day_idx):
+    """Poste (DAY/NIGHT/REST) d'un jour d'historique (day_idx <= 0 ; 0 = J-1)."""
+    agent_hist = history.get(agent_name, ["REP", "REP", "REP"]) # [D-3, D-2, D-1]
+    idx = 2 + day_idx
+    val = agent_hist[idx] if 0 <= idx < len(agent_hist) else "REP"
+    return {"DAY": DAY, "NIGHT": NIGHT}.get(val, REST)
+
+
+def _carry_over(params, agent_name):
     """
-    Génère un planning mensuel en respectant les contraintes métier.
-    
-    Args:
-        year (int): Année du planning.
-        month (int): Mois du planning.
-        employees (list): Liste de dictionnaires {'name': str, 'sex': 'M'/'F'}.
-        leaves (dict): Dict {nom_employé: [jours_de_congés]}.
-        params (dict): Paramètres de contraintes (activées/désactivées).
-        
+    Compteurs d'équité reportés des mois précédents (params["carry_over"], mode horizon) :
+    (postes du matin, postes de nuit, postes de week-end, jours disponibles), nuls par défaut.
+    """
+    prev = params.get("carry_over", {}).get(agent_name, {})
+    return prev.get("day", 0), prev.get("night", 0), prev.get("weekend", 0), prev.get("available", 0)
+
+
+def _max_consecutive_work(employees, leaves):
+    """Jours travaillés consécutifs tolérés : 4, ou 5 si le mois compte plus de 31 jours de congés."""
+    total_monthly_leaves = sum(len(leaves.get(e['name'], [])) for e in employees)
+    return 5 if total_monthly_leaves > 31 else 4
+
+
+def _new_shift_vars(model, employees, num_days, params):
+    """
+    Crée les variables shifts[(n, d, s)] (1 si l'employé n travaille le jour d au poste s).
+
+    Mode réparation : les jours < params["freeze_before"] sont figés en constantes 0/1
+    (comme les jours d'historique) d'après params["frozen_schedule"].
+
     Returns:
-        pd.DataFrame or None: Le planning généré ou None si aucune solution.
+        tuple: (shifts, freeze_before)
+    """
+    freeze_before = params.get("freeze_before", 1)
+    frozen = None
+    if freeze_before > 1:
+        frozen = schedule_to_matrix(params["frozen_schedule"], [e['name'] for e in employees], num_days)
+
+    shifts = {}
+    for n in range(len(employees)):
+        for d in range(1, num_days + 1):
+            for s in SHIFTS:
+                if d < freeze_before:
+                    shifts[(n, d, s)] = 1 if frozen[n, d - 1] == s else 0
+                else:
+                    shifts[(n, d, s)] = model.NewBoolVar(f'shift_n{n}_d{d}_s{s}')
+    return shifts, freeze_before
+
+
+def _add_warm_start(model, shifts, employees, num_days, params, freeze_before, penalties):
+    """
+    Démarrage à chaud : le planning précédent sert d'indice (AddHint) au solveur,
+    et optionnellement chaque journée modifiée est pénalisée ("changement minimal").
+    Les agents sans aucun jour travaillé dans le planning précédent sont ignorés
+    (nouvel agent ou absence d'information).
+
+    Les pénalités sont ajoutées à `penalties` sous forme (règle, agent, terme).
+    """
+    previous = params.get("previous_schedule")
+    if previous is None:
+        return
+    prev = schedule_to_matrix(previous, [e['name'] for e in employees], num_days)
+    change_penalty = params.get("change_penalty", 0)
+    for n in range(len(employees)):
+        if (prev[n] == REST).all():
+            continue
+        for d in range(freeze_before, num_days + 1):
+            was = int(prev[n, d - 1])
+            for s in SHIFTS:
+                model.AddHint(shifts[(n, d, s)], 1 if was == s else 0)
+            if change_penalty:
+                if was == REST:
+                    penalties.append(("change", n, sum(shifts[(n, d, s)] for s in SHIFTS) * change_penalty))
+                else:
+                    penalties.append(("change", n, (1 - shifts[(n, d, was)]) * change_penalty))
+
+
+def _agent_classes(employees, leaves, params):
+    """
+    Classes d'agents interchangeables : même sexe, mêmes congés, même historique,
+    mêmes compteurs reportés.
+
+    Returns:
+        list: Listes d'indices (au moins 2 agents par classe).
+    """
+    history = params.get("history", {})
+    classes = {}
+    for n, emp in enumerate(employees):
+        key = (emp['sex'],
+               tuple(sorted(leaves.get(emp['name'], []))),
+               tuple(_history_code(history, emp['name'], d) for d in (-2, -1, 0)),
+               _carry_over(params, emp['name']))
+        classes.setdefault(key, []).append(n)
+    return [members for members in classes.values() if len(members) >= 2]
+
+
+def _add_symmetry_breaking(model, shifts, employees, leaves, params, num_days):
+    """
+    Casse les symétries entre agents interchangeables (params["symmetry_breaking"], défaut True).
+
+    Dans chaque classe, les lignes d'affectation (0 repos, 1 jour, 2 nuit) sont
+    ordonnées lexicographiquement sur les `params["symmetry_days"]` premiers jours
+    (défaut 7 : l'ordre complet sur le mois ralentit la recherche de solutions
+    pour un gain de preuve marginal). Pour ne pas avantager toujours le même agent,
+    les noms sont ensuite répartis au hasard entre les lignes de la classe
+    (graine params["random_seed"], reproductible).
+
+    Désactivé si le planning dépend de l'identité des agents (démarrage à chaud,
+    jours figés).
+
+    Returns:
+        list: Nom de l'agent affiché pour chaque ligne du modèle.
+    """
+    row_names = [e['name'] for e in employees]
+    if not params.get("symmetry_breaking", True):
+        return row_names
+    if params.get("previous_schedule") is not None or params.get("freeze_before", 1) > 1:
+        return row_names
+
+    lex_days = min(num_days, params.get("symmetry_days", 7))
+    rng = random.Random(params.get("random_seed", 0))
+    for members in _agent_classes(employees, leaves, params):
+        for a, b in zip(members, members[1:]):
+            row_a = [shifts[(a, d, DAY)] + 2 * shifts[(a, d, NIGHT)] for d in range(1, lex_days + 1)]
+            row_b = [shifts[(b, d, DAY)] + 2 * shifts[(b, d, NIGHT)] for d in range(1, lex_days + 1)]
+            # row_a <=lex row_b : prefix_equal[k] est vrai tant que les k premiers jours sont égaux
+            prefix_equal = None
+            for k, (x, y) in enumerate(zip(row_a, row_b)):
+                if prefix_equal is None:
+                    model.Add(x <= y)
+                else:
+                    model.Add(x <= y).OnlyEnforceIf(prefix_equal)
+                if k == lex_days - 1:
+                    break
+                next_equal = model.NewBoolVar(f'lex_n{a}_n{b}_d{k + 1}')
+                if prefix_equal is None:
+                    model.Add(next_equal >= 1 - (y - x))
+                else:
+                    model.Add(next_equal >= 1 - (y - x)).OnlyEnforceIf(prefix_equal)
+                prefix_equal = next_equal
+        shuffled = [row_names[n] for n in members]
+        rng.shuffle(shuffled)
+        for n, name in zip(members, shuffled):
+            row_names[n] = name
+    return row_names
+
+
+def _build_model(year, month, employees, leaves, params, template=False):
+    """
+    Construit le modèle CP-SAT (variables, contraintes et pénalités) sans le résoudre.
+
+    Mode gabarit (template=True, cf. model_template.py) : l'historique, les congés,
+    les jours fériés et les compteurs reportés ne sont pas inscrits dans le modèle
+    mais deviennent des variables d'entrée (ctx["inputs"]), fixées ensuite par leur
+    domaine. La structure ne dépend alors que du calendrier du mois, du sexe de
+    chaque agent, de max_consecutive_work et de la présence de params["carry_over"].
+    Le démarrage à chaud et le cassage de symétries sont laissés à l'instanciation.
+
+    Returns:
+        dict: Contexte du modèle (model, shifts, penalties, num_days, ...).
     """
     model = cp_model.CpModel()
+    size = _ModelSizeTracker(model)
     
     num_days = calendar.monthrange(year, month)[1]
     num_employees = len(employees)
     
-    # Constantes pour les types de postes
-    DAY = 0
-    NIGHT = 1
-    SHIFTS = [DAY, NIGHT]
-
     holidays = params.get("holidays", [])
     history = params.get("history", {})
     
-    # Variables: shifts[(n, d, s)] == 1 si l'employé n travaille le jour d au poste s
-    shifts = {}
-    for n in range(num_employees):
-        for d in range(1, num_days + 1):
+    shifts, freeze_before = _new_shift_vars(model, employees, num_days, params)
+    size.mark("shifts")
+
+    # Historique [J-3, J-2, J-1] -> jours -2, -1, 0 : constantes, ou entrées du gabarit
+    inputs = {"history": {}, "weekday_off": {}, "available": {}, "carry": {}} if template else None
+    history_terms = {}
+    for n, emp in enumerate(employees):
+        for d in (-2, -1, 0):
             for s in SHIFTS:
-                shifts[(n, d, s)] = model.NewBoolVar(f'shift_n{n}_d{d}_s{s}')
+                if template:
+                    history_terms[(n, d, s)] = inputs["history"][(n, d, s)] = model.NewBoolVar(f'history_n{n}_d{d}_s{s}')
+                else:
+                    history_terms[(n, d, s)] = 1 if _history_code(history, emp['name'], d) == s else 0
+    if template:
+        size.mark("history")
+
+    def is_frozen(d):
+        return d < freeze_before
 
     # --- OBJECTIF & PENALITES ---
     penalties = []
 
+    if not template:
+        _add_warm_start(model, shifts, employees, num_days, params, freeze_before, penalties)
+        size.mark("warm_start")
+
     # 1. Capacité (DURE) : Dynamique selon la taille de l'équipe
     # < 6 agents -> 1 personne par poste, >= 6 agents -> 2 personnes par poste
     capacity = 1 if num_employees < 6 else 2
-    for d in range(1, num_days + 1):
+    for d in range(freeze_before, num_days + 1):
         for s in SHIFTS:
             model.Add(sum(shifts[(n, d, s)] for n in range(num_employees)) == capacity)
+    size.mark("capacity")
 
     # 2. Un employé ne peut faire qu'un seul poste par jour (DURE)
     for n in range(num_employees):
-        for d in range(1, num_days + 1):
+        for d in range(freeze_before, num_days + 1):
             model.Add(sum(shifts[(n, d, s)] for s in SHIFTS) <= 1)
 
+    size.mark("one_shift_per_day")
+
     # --- HISTORY & TRANSITIONS ---
-    history = params.get('history', {}) # {name: [shift_d-3, shift_d-2, shift_d-1]}
-    # Conversion : DAY=0, NIGHT=1, REST=-1
-    history_map = {"DAY": 0, "NIGHT": 1, "REP": -1}
-    
     # helper functions for history-aware constraints
     def get_shift_var(n_idx, day_idx, shift_type):
         if day_idx <= 0:
-            agent_name = employees[n_idx]['name']
-            agent_hist = history.get(agent_name, ["REP", "REP", "REP"]) # [D-3, D-2, D-1]
-            idx = 2 + day_idx
-            val = agent_hist[idx] if 0 <= idx < len(agent_hist) else "REP"
-            return 1 if history_map.get(val, -1) == shift_type else 0
+            return history_terms.get((n_idx, day_idx, shift_type), 0) # Repos avant J-3
         if day_idx > num_days:
             return 0 # On suppose repos après la fin du mois
         return shifts[(n_idx, day_idx, shift_type)]
 
     def is_working_var(n_idx, day_idx):
         if day_idx <= 0:
-            agent_name = employees[n_idx]['name']
-            agent_hist = history.get(agent_name, ["REP", "REP", "REP"])
-            idx = 2 + day_idx
-            val = agent_hist[idx] if 0 <= idx < len(agent_hist) else "REP"
-            return 1 if history_map.get(val, -1) in [0, 1] else 0
+            return sum(get_shift_var(n_idx, day_idx, s) for s in SHIFTS)
         if day_idx > num_days:
             return 0 # Repos après la fin du mois
         return sum(shifts[(n_idx, day_idx, s)] for s in SHIFTS)
 
+    def add_soft_indicator(rule, n, expr, name):
+        # Pénalité PENALTY_WEIGHTS[rule] si expr >= 1 : l'indicateur n'a besoin que d'une
+        # borne inférieure (expr <= ind), la minimisation le ramène à 0 sinon.
+        if _is_constant(expr): # Fenêtre entièrement figée (historique / jours passés)
+            if expr >= 1: penalties.append((rule, n, PENALTY_WEIGHTS[rule]))
+            return
+        indicator = model.NewBoolVar(name)
+        model.Add(expr <= indicator)
+        penalties.append((rule, n, indicator * PENALTY_WEIGHTS[rule]))
+
     # 3. Nuit suivie de Jour (DURE) - inclut l'historique
     for n in range(num_employees):
-        for d in range(0, num_days): # d=0 check transition from D-1 (history) to D=1
+        for d in range(max(0, freeze_before - 1), num_days): # d=0 check transition from D-1 (history) to D=1
             model.Add(get_shift_var(n, d, NIGHT) + get_shift_var(n, d+1, DAY) <= 1)
 
+    size.mark("night_to_day")
+
     # --- ADAPTIVE CONSTRAINTS LOGIC ---
-    total_monthly_leaves = sum(len(leaves.get(e['name'], [])) for e in employees)
-    
     # a) Hard work days consecutive (Default 4, Adaptive 5)
-    max_consecutive_work = 5 if total_monthly_leaves > 31 else 4
+    max_consecutive_work = _max_consecutive_work(employees, leaves)
     # b) Identical shifts consecutive (Penalty for 3+, Adaptive relaxation for 4)
     # If total_monthly_leaves > 40, we penalize 4-sequences less.
 
-    # 4. Congés (DURE)
+    # 4. Congés (DURE) - en mode gabarit : domaines fixés à l'instanciation
     for n, emp in enumerate(employees):
-        emp_leaves = leaves.get(emp['name'], [])
+        emp_leaves = leaves.get(emp['name'], []) if not template else []
         for d in emp_leaves:
-            if 1 <= d <= num_days:
+            if freeze_before <= d <= num_days:
                 for s in SHIFTS:
                     model.Add(shifts[(n, d, s)] == 0)
 
+    size.mark("leaves")
+
     # 5. Cas spécial : Mme Mliyani (DURE)
     holidays = params.get('holidays', [])
     for n, emp in enumerate(employees):
         if emp['sex'] == 'F':
             emp_leaves = leaves.get(emp['name'], [])
             for d in range(1, num_days + 1):
-                model.Add(shifts[(n, d, NIGHT)] == 0)
+                if not is_frozen(d):
+                    model.Add(shifts[(n, d, NIGHT)] == 0)
                 date_obj = datetime.date(year, month, d)
                 wd = date_obj.weekday()
-                if wd >= 5 or d in holidays:
-                    model.Add(shifts[(n, d, DAY)] == 0)
+                if wd >= 5 or (d in holidays and not template):
+                    if not is_frozen(d):
+                        model.Add(shifts[(n, d, DAY)] == 0)
+                elif template:
+                    # weekday_off = 1 les jours fériés / de congé (le poste du jour est alors fixé à 0)
+                    if wd <= 3:
+                        off = inputs["weekday_off"][(n, d)] = model.NewBoolVar(f'weekday_off_n{n}_d{d}')
+                        penalties.append(("mandatory_weekday", n, (1 - off - shifts[(n, d, DAY)]) * PENALTY_WEIGHTS["mandatory_weekday"]))
+                    elif wd == 4:
+                        penalties.append(("friday", n, shifts[(n, d, DAY)] * PENALTY_WEIGHTS["friday"]))
                 elif d not in emp_leaves:
-                    if wd <= 3: # Lun-Jeu mandatory
+                    if wd <= 3 and is_frozen(d):
+                        if not shifts[(n, d, DAY)]:
+                            penalties.append(("mandatory_weekday", n, PENALTY_WEIGHTS["mandatory_weekday"]))
+                    elif wd <= 3: # Lun-Jeu mandatory
                         # SAFETY VALVE: Mandatory Mon-Thu is now SOFT (Penalty 2000)
                         is_working = model.NewBoolVar(f'mandatory_mliyani_d{d}')
                         model.Add(shifts[(n, d, DAY)] == 1).OnlyEnforceIf(is_working)
                         model.Add(shifts[(n, d, DAY)] == 0).OnlyEnforceIf(is_working.Not())
-                        penalties.append(is_working.Not() * 3000)
+                        penalties.append(("mandatory_weekday", n, is_working.Not() * PENALTY_WEIGHTS["mandatory_weekday"]))
                     elif wd == 4: # Vendredi SOFT preference (prefer off, allow for balance)
                         # Penalize working on Friday (SOFT 1)
-                        penalties.append(shifts[(n, d, DAY)] * 1)
+                        penalties.append(("friday", n, shifts[(n, d, DAY)] * PENALTY_WEIGHTS["friday"]))
+
+    size.mark("female_rules")
 
     # 6. Équité & Balance (OBJECTIF PRINCIPAL)
     # Règle 1: Équité globale (M/F) basée sur le RATIO (Total Shifts / Available Days)
+    # Mode horizon : les compteurs des mois précédents (params["carry_over"]) s'ajoutent au mois courant
     SCALE = 1000
     ratio_vars = []
+    weekend_days = [d for d in range(1, num_days + 1) if datetime.date(year, month, d).weekday() >= 5]
+    weekend_vars = []
     for n, emp in enumerate(employees):
-        avail_i = num_days - len(leaves.get(emp['name'], []))
-        if avail_i == 0: continue
-        
-        m_shifts_i = sum(shifts[(n, d, DAY)] for d in range(1, num_days + 1))
-        n_shifts_i = sum(shifts[(n, d, NIGHT)] for d in range(1, num_days + 1))
+        if template: # Jours disponibles (>= 1) et compteurs reportés : entrées du gabarit
+            prev_m = prev_n = prev_w = 0
+            max_carry = TEMPLATE_MAX_CARRY if params.get("carry_over") else 0
+            if max_carry:
+                prev_m = model.NewIntVar(0, max_carry, f'carry_day_n{n}')
+                prev_n = model.NewIntVar(0, max_carry, f'carry_night_n{n}')
+                prev_w = model.NewIntVar(0, max_carry, f'carry_weekend_n{n}')
+                inputs["carry"][n] = (prev_m, prev_n, prev_w)
+            avail_i = inputs["available"][n] = model.NewIntVar(1, num_days + max_carry, f'available_n{n}')
+            max_shifts_i = num_days + 2 * max_carry
+            max_weekend_i = len(weekend_days) + max_carry
+        else:
+            prev_m, prev_n, prev_w, prev_avail = _carry_over(params, emp['name'])
+            avail_i = num_days - len(leaves.get(emp['name'], [])) + prev_avail
+            if avail_i == 0: continue
+            max_shifts_i = num_days + prev_m + prev_n
+            max_weekend_i = len(weekend_days) + prev_w
+
+        m_shifts_i = sum(shifts[(n, d, DAY)] for d in range(1, num_days + 1)) + prev_m
+        n_shifts_i = sum(shifts[(n, d, NIGHT)] for d in range(1, num_days + 1)) + prev_n
         total_shifts_i = m_shifts_i + n_shifts_i
         
         # Robust Division: interim variable for numerator
-        num_scaled = model.NewIntVar(0, num_days * SCALE, f'num_scaled_n{n}')
+        num_scaled = model.NewIntVar(0, max_shifts_i * SCALE, f'num_scaled_n{n}')
         model.Add(num_scaled == total_shifts_i * SCALE)
         
         ratio_i = model.NewIntVar(0, SCALE, f'ratio_n{n}')
@@ -145,25 +413,30 @@ def generate_schedule(year, month, employees, leaves, params):
 
         # Règle 2: Équilibre INTERNE (Hommes seulement) : abs(Matin - Nuit) <= 3
         if emp['sex'] == 'M':
-            diff_internal = model.NewIntVar(-num_days, num_days, f'diff_internal_n{n}')
+            diff_internal = model.NewIntVar(-max_shifts_i, max_shifts_i, f'diff_internal_n{n}')
             model.Add(diff_internal == m_shifts_i - n_shifts_i)
-            abs_diff_internal = model.NewIntVar(0, num_days, f'abs_diff_internal_n{n}')
+            abs_diff_internal = model.NewIntVar(0, max_shifts_i, f'abs_diff_internal_n{n}')
             model.AddAbsEquality(abs_diff_internal, diff_internal)
             
             # Pénalité légère par point d'écart
-            penalties.append(abs_diff_internal * 10)
+            penalties.append(("internal_balance", n, abs_diff_internal * PENALTY_WEIGHTS["internal_balance"]))
             
             # Pénalité moyenne si > 3
             over3_internal = model.NewBoolVar(f'over3_internal_n{n}')
             model.Add(abs_diff_internal > 3).OnlyEnforceIf(over3_internal)
             model.Add(abs_diff_internal <= 3).OnlyEnforceIf(over3_internal.Not())
-            penalties.append(over3_internal * 400)
+            penalties.append(("internal_over3", n, over3_internal * PENALTY_WEIGHTS["internal_over3"]))
 
             # Très forte pénalité si > 4
             over4_internal = model.NewBoolVar(f'over4_internal_n{n}')
             model.Add(abs_diff_internal > 4).OnlyEnforceIf(over4_internal)
             model.Add(abs_diff_internal <= 4).OnlyEnforceIf(over4_internal.Not())
-            penalties.append(over4_internal * 800)
+            penalties.append(("internal_over4", n, over4_internal * PENALTY_WEIGHTS["internal_over4"]))
+
+            # Règle 3: Postes de week-end (samedi, dimanche) répartis entre les hommes, report compris
+            weekend_i = model.NewIntVar(0, max_weekend_i, f'weekend_n{n}')
+            model.Add(weekend_i == sum(shifts[(n, d, s)] for d in weekend_days for s in SHIFTS) + prev_w)
+            weekend_vars.append((weekend_i, max_weekend_i))
 
     # Minimisation de l'écart de ratio (Fairness Globale)
     if len(ratio_vars) >= 2:
@@ -176,64 +449,85 @@ def generate_schedule(year, month, employees, leaves, params):
         model.Add(ratio_gap == max_ratio - min_ratio)
         
         # Objectif : minimiser cet écart
-        penalties.append(ratio_gap * 300) 
+        penalties.append(("ratio_gap", None, ratio_gap * PENALTY_WEIGHTS["ratio_gap"]))
+
+    if len(weekend_vars) >= 2:
+        bound = max(upper for _, upper in weekend_vars)
+        max_weekend = model.NewIntVar(0, bound, 'max_weekend')
+        min_weekend = model.NewIntVar(0, bound, 'min_weekend')
+        model.AddMaxEquality(max_weekend, [weekend_i for weekend_i, _ in weekend_vars])
+        model.AddMinEquality(min_weekend, [weekend_i for weekend_i, _ in weekend_vars])
+        penalties.append(("weekend_gap", None, (max_weekend - min_weekend) * PENALTY_WEIGHTS["weekend_gap"]))
 
 
+    size.mark("fairness")
+
     # 8. Séquences de travail (inclut l'historique)
     for n, emp in enumerate(employees):
         # a) Max jours consécutifs TOTAL (PASSAGE EN MOLL POUR ROBUSTESSE)
         for d in range(-3, num_days - max_consecutive_work + 1):
-            is_over_consecutive = model.NewBoolVar(f'over_consecutive_n{n}_d{d}')
             seq_sum = sum(is_working_var(n, d+i) for i in range(max_consecutive_work + 1))
+            if _is_constant(seq_sum): # Fenêtre entièrement figée
+                if seq_sum > max_consecutive_work: penalties.append(("over_consecutive", n, PENALTY_WEIGHTS["over_consecutive"]))
+                continue
+            is_over_consecutive = model.NewBoolVar(f'over_consecutive_n{n}_d{d}')
             # Si seq_sum > limit, on active la pénalité
             model.Add(seq_sum > max_consecutive_work).OnlyEnforceIf(is_over_consecutive)
             model.Add(seq_sum <= max_consecutive_work).OnlyEnforceIf(is_over_consecutive.Not())
-            penalties.append(is_over_consecutive * 1500) # Très forte pénalité
+            penalties.append(("over_consecutive", n, is_over_consecutive * PENALTY_WEIGHTS["over_consecutive"])) # Très forte pénalité
+        size.mark("over_consecutive")
             
         # b) Éviter jours consécutifs IDENTIQUES (MOLLE Adaptatif)
         if emp['sex'] == 'M':
             # NEW: Avoid more than 2 identical shifts (3+ penalized)
             limit_same = 2
-            penalty_same = 500 # Strong penalty as requested
             for d in range(-1, num_days - limit_same + 1):
                 for s in SHIFTS:
-                    is_over = model.NewBoolVar(f'over_same_n{n}_d{d}_s{s}')
-                    model.Add(sum(get_shift_var(n, d+i, s) for i in range(limit_same + 1)) - limit_same <= is_over)
-                    penalties.append(is_over * penalty_same)
+                    add_soft_indicator("over_same", n, sum(get_shift_var(n, d+i, s) for i in range(limit_same + 1)) - limit_same,
+                                       f'over_same_n{n}_d{d}_s{s}')
+        size.mark("over_same")
 
         # c) Min 2 jours consécutifs (MOLLE)
         # Avoid isolated work days (1 day work between rests)
         for d in range(0, num_days + 1):
-            is_iso = model.NewBoolVar(f'iso_n{n}_d{d}')
             # iso == 1 if working(d) and not working(d-1) and not working(d+1)
-            model.Add(is_working_var(n, d) - is_working_var(n, d-1) - is_working_var(n, d+1) <= is_iso)
-            penalties.append(is_iso * 200)
+            add_soft_indicator("isolated_work", n, is_working_var(n, d) - is_working_var(n, d-1) - is_working_var(n, d+1),
+                               f'iso_n{n}_d{d}')
+        size.mark("isolated_work")
 
     # 9. Repos (MOLLE pour laisser de la souplesse avec les congés)
     for n in range(num_employees):
         # les repos doivent idéalement être entre 1 et 4 jours
         # On pénalise si on dépasse 4 jours de repos de suite
         for d in range(-2, num_days - 3 + 1):
-            is_over_rest = model.NewBoolVar(f'over_rest_n{n}_d{d}')
             # over_rest == 1 <=> all 5 days are rest
             seq_work_5 = [is_working_var(n, d+i) for i in range(5)]
+            if _is_constant(sum(seq_work_5)):
+                if sum(seq_work_5) == 0: penalties.append(("over_rest", n, PENALTY_WEIGHTS["over_rest"]))
+                continue
+            is_over_rest = model.NewBoolVar(f'over_rest_n{n}_d{d}')
             model.Add(sum(seq_work_5) == 0).OnlyEnforceIf(is_over_rest)
             model.Add(sum(seq_work_5) >= 1).OnlyEnforceIf(is_over_rest.Not())
-            penalties.append(is_over_rest * 1000) # Max Rest Penalty
+            penalties.append(("over_rest", n, is_over_rest * PENALTY_WEIGHTS["over_rest"])) # Max Rest Penalty
+        size.mark("over_rest")
 
         # a) Pas de repos isolé (MOLLE)
         for d in range(0, num_days):
-            is_iso_r = model.NewBoolVar(f'iso_r_n{n}_d{d}')
-            model.Add(is_working_var(n, d-1) + is_working_var(n, d+1 if d<num_days else -100) - is_working_var(n, d) - 1 <= is_iso_r)
-            penalties.append(is_iso_r * 500) # Isolated Rest Penalty
+            add_soft_indicator("isolated_rest", n, is_working_var(n, d-1) + is_working_var(n, d+1 if d<num_days else -100) - is_working_var(n, d) - 1,
+                               f'iso_r_n{n}_d{d}') # Isolated Rest Penalty
+        size.mark("isolated_rest")
         
         # b) Favoriser 2-3 jours de repos (MOLLE : pénalise 4)
         for d in range(-2, num_days - 3 + 1):
-            is_4r = model.NewBoolVar(f'rest4_n{n}_d{d}')
             # rest4 == 1 <=> all 4 days are rest
+            if _is_constant(sum(is_working_var(n, d+i) for i in range(4))):
+                if sum(is_working_var(n, d+i) for i in range(4)) == 0: penalties.append(("rest4", n, PENALTY_WEIGHTS["rest4"]))
+                continue
+            is_4r = model.NewBoolVar(f'rest4_n{n}_d{d}')
             model.Add(sum(is_working_var(n, d+i) for i in range(4)) == 0).OnlyEnforceIf(is_4r)
             model.Add(sum(is_working_var(n, d+i) for i in range(4)) >= 1).OnlyEnforceIf(is_4r.Not())
-            penalties.append(is_4r * 20)
+            penalties.append(("rest4", n, is_4r * PENALTY_WEIGHTS["rest4"]))
+        size.mark("rest4")
 
         # # c) Nuit -> Repos -> Jour (inclut historique)
         # for d in range(0, num_days - 1):
@@ -243,37 +537,700 @@ def generate_schedule(year, month, employees, leaves, params):
 
         for d in range(0, num_days - 2):
             # CAS 1 : N - R - J (1000)
-            bad_nrj = model.NewBoolVar(f'bad_nrj_n{n}_d{d}')
-            model.Add(get_shift_var(n, d, NIGHT)+ (1 - is_working_var(n, d+1))+ get_shift_var(n, d+2, DAY)- 2 <= bad_nrj)
-            penalties.append(bad_nrj * 1000)
+            add_soft_indicator("bad_nrj", n, get_shift_var(n, d, NIGHT)+ (1 - is_working_var(n, d+1))+ get_shift_var(n, d+2, DAY)- 2,
+                               f'bad_nrj_n{n}_d{d}')
             # CAS 2 : N - R - N (500)
-            bad_nrn = model.NewBoolVar(f'bad_nrn_n{n}_d{d}')
-            model.Add(get_shift_var(n, d, NIGHT)+ (1 - is_working_var(n, d+1))+ get_shift_var(n, d+2, NIGHT)- 2 <= bad_nrn)
-            penalties.append(bad_nrn * 500)
+            add_soft_indicator("bad_nrn", n, get_shift_var(n, d, NIGHT)+ (1 - is_working_var(n, d+1))+ get_shift_var(n, d+2, NIGHT)- 2,
+                               f'bad_nrn_n{n}_d{d}')
             # CAS 3 : J - R - J (500)
-            bad_jrj = model.NewBoolVar(f'bad_jrj_n{n}_d{d}')
-            model.Add(get_shift_var(n, d, DAY)+ (1 - is_working_var(n, d+1))+ get_shift_var(n, d+2, DAY)- 2 <= bad_jrj)
-            penalties.append(bad_jrj * 500)
+            add_soft_indicator("bad_jrj", n, get_shift_var(n, d, DAY)+ (1 - is_working_var(n, d+1))+ get_shift_var(n, d+2, DAY)- 2,
+                               f'bad_jrj_n{n}_d{d}')
+        size.mark("rest_transitions")
 
+    row_names = [e['name'] for e in employees]
+    if not template:
+        row_names = _add_symmetry_breaking(model, shifts, employees, leaves, params, num_days)
+        size.mark("symmetry")
+
+    return {
+        "model": model, "shifts": shifts, "penalties": penalties,
+        "year": year, "month": month, "num_days": num_days, "employees": employees, "leaves": leaves,
+        "row_names": row_names, "model_size": size.counts, "inputs": inputs,
+    }
+
+
+def _build_compact_model(year, month, employees, leaves, params):
+    """
+    Variante compacte de _build_model (params["model"] == "compact"), de même objectif :
 
+    - une BoolVar "travaille" par agent-jour (remplace la règle 2 et les sommes
+      recalculées pour chaque fenêtre) ;
+    - chaque pénalité de fenêtre est une seule clause sur un indicateur minoré
+      (la minimisation le ramène à 0) au lieu d'une paire OnlyEnforceIf ;
+    - équité sans AddDivisionEquality : le ratio est encadré linéairement
+      (avail * ratio <= total * SCALE < avail * (ratio + 1)), max/min par bornes.
 
+    Gain mesuré (suite de benchmark.py, 6 à 20 agents) : environ 23 % de contraintes
+    en moins, 3 à 4 % de variables en plus. Sur les 25 instances (20 s, 8 threads sur
+    1 cœur), seules size03 et size04 sont prouvées optimales, dans les deux modèles et
+    en des temps voisins (0,8 / 0,9 s et 5,2 / 4,5 s) ; à délai égal, la pénalité
+    atteinte est plus basse sur 21 instances (médiane -21 %), plus haute sur 2. Les règles de séquence et de repos restent
+    une clause et un indicateur par fenêtre : toutes sont MOLLES, un automate
+    (AddAutomaton) les rendrait DURES et changerait l'objectif.
 
+    Returns:
+        dict: Contexte du modèle, même format que _build_model.
+    """
+    model = cp_model.CpModel()
+    size = _ModelSizeTracker(model)
+
+    num_days = calendar.monthrange(year, month)[1]
+    num_employees = len(employees)
+    holidays = params.get("holidays", [])
+    history = params.get("history", {})
+
+    shifts, freeze_before = _new_shift_vars(model, employees, num_days, params)
+    size.mark("shifts")
+    penalties = []
+    _add_warm_start(model, shifts, employees, num_days, params, freeze_before, penalties)
+    size.mark("warm_start")
+
+    # Une variable "travaille" par agent-jour (constante si le jour est figé)
+    work = {}
+    for n in range(num_employees):
+        for d in range(1, num_days + 1):
+            total = sum(shifts[(n, d, s)] for s in SHIFTS)
+            if _is_constant(total):
+                work[(n, d)] = total
+            else:
+                work[(n, d)] = model.NewBoolVar(f'work_n{n}_d{d}')
+                model.Add(total == work[(n, d)])
+    size.mark("one_shift_per_day")
+
+    def shift_lit(n, d, s):
+        if d <= 0:
+            return 1 if _history_code(history, employees[n]['name'], d) == s else 0
+        if d > num_days:
+            return 0 # Repos après la fin du mois
+        return shifts[(n, d, s)]
+
+    def working(n, d):
+        if d <= 0:
+            return 1 if _history_code(history, employees[n]['name'], d) != REST else 0
+        if d > num_days:
+            return 0
+        return work[(n, d)]
+
+    def add_soft_clause(rule, n, true_lits, false_lits, name):
+        # Pénalité PENALTY_WEIGHTS[rule] si tous les true_lits sont vrais et tous les false_lits faux
+        clause = []
+        for lit in true_lits:
+            if _is_constant(lit):
+                if not lit: return
+            else:
+                clause.append(lit.Not())
+        for lit in false_lits:
+            if _is_constant(lit):
+                if lit: return
+            else:
+                clause.append(lit)
+        if not clause:
+            penalties.append((rule, n, PENALTY_WEIGHTS[rule]))
+            return
+        indicator = model.NewBoolVar(name)
+        model.AddBoolOr(clause + [indicator])
+        penalties.append((rule, n, indicator * PENALTY_WEIGHTS[rule]))
+
+    # 1. Capacité (DURE)
+    capacity = 1 if num_employees < 6 else 2
+    for d in range(freeze_before, num_days + 1):
+        for s in SHIFTS:
+            model.Add(sum(shifts[(n, d, s)] for n in range(num_employees)) == capacity)
+    size.mark("capacity")
+
+    # 3. Nuit suivie de Jour (DURE) - inclut l'historique
+    for n in range(num_employees):
+        for d in range(max(0, freeze_before - 1), num_days):
+            night, day_next = shift_lit(n, d, NIGHT), shift_lit(n, d + 1, DAY)
+            if _is_constant(night):
+                if night: model.Add(day_next == 0)
+            else:
+                model.AddBoolOr([night.Not(), day_next.Not()])
+    size.mark("night_to_day")
+
+    max_consecutive_work = _max_consecutive_work(employees, leaves)
+
+    # 4. Congés (DURE)
+    for n, emp in enumerate(employees):
+        for d in leaves.get(emp['name'], []):
+            if freeze_before <= d <= num_days:
+                model.Add(work[(n, d)] == 0)
+    size.mark("leaves")
+
+    # 5. Agentes : jamais de nuit, ni week-end / férié (DURE) ; Lun-Jeu 3000, Vendredi 1 (MOLLE)
+    for n, emp in enumerate(employees):
+        if emp['sex'] != 'F':
+            continue
+        emp_leaves = leaves.get(emp['name'], [])
+        for d in range(1, num_days + 1):
+            wd = datetime.date(year, month, d).weekday()
+            if d >= freeze_before:
+                model.Add(shifts[(n, d, NIGHT)] == 0)
+                if wd >= 5 or d in holidays:
+                    model.Add(shifts[(n, d, DAY)] == 0)
+            if wd >= 5 or d in holidays or d in emp_leaves:
+                continue
+            if wd <= 3:
+                penalties.append(("mandatory_weekday", n, (1 - shifts[(n, d, DAY)]) * PENALTY_WEIGHTS["mandatory_weekday"]))
+            elif wd == 4:
+                penalties.append(("friday", n, shifts[(n, d, DAY)] * PENALTY_WEIGHTS["friday"]))
 
-    # --- RÉSOLUTION ---
-    model.Minimize(sum(penalties))
+    size.mark("female_rules")
+
+    # 6. Équité : ratio (Total / Disponibles) sans division, écart max-min pénalisé
+    SCALE = 1000
+    ratio_vars = []
+    weekend_days = [d for d in range(1, num_days + 1) if datetime.date(year, month, d).weekday() >= 5]
+    weekend_exprs = []
+    for n, emp in enumerate(employees):
+        prev_m, prev_n, prev_w, prev_avail = _carry_over(params, emp['name'])
+        avail_i = num_days - len(leaves.get(emp['name'], [])) + prev_avail
+        if avail_i == 0: continue
+        m_shifts_i = sum(shifts[(n, d, DAY)] for d in range(1, num_days + 1)) + prev_m
+        n_shifts_i = sum(shifts[(n, d, NIGHT)] for d in range(1, num_days + 1)) + prev_n
+        max_shifts_i = num_days + prev_m + prev_n
+
+        ratio_i = model.NewIntVar(0, SCALE, f'ratio_n{n}')
+        model.Add(avail_i * ratio_i <= (m_shifts_i + n_shifts_i) * SCALE)
+        model.Add((m_shifts_i + n_shifts_i) * SCALE <= avail_i * ratio_i + avail_i - 1)
+        ratio_vars.append(ratio_i)
+
+        if emp['sex'] == 'M':
+            abs_diff_internal = model.NewIntVar(0, max_shifts_i, f'abs_diff_internal_n{n}')
+            model.Add(abs_diff_internal >= m_shifts_i - n_shifts_i)
+            model.Add(abs_diff_internal >= n_shifts_i - m_shifts_i)
+            penalties.append(("internal_balance", n, abs_diff_internal * PENALTY_WEIGHTS["internal_balance"]))
+            over3_internal = model.NewBoolVar(f'over3_internal_n{n}')
+            model.Add(abs_diff_internal <= 3 + max_shifts_i * over3_internal)
+            penalties.append(("internal_over3", n, over3_internal * PENALTY_WEIGHTS["internal_over3"]))
+            over4_internal = model.NewBoolVar(f'over4_internal_n{n}')
+            model.Add(abs_diff_internal <= 4 + max_shifts_i * over4_internal)
+            penalties.append(("internal_over4", n, over4_internal * PENALTY_WEIGHTS["internal_over4"]))
+            weekend_exprs.append((sum(work[(n, d)] for d in weekend_days) + prev_w, len(weekend_days) + prev_w))
+
+    if len(ratio_vars) >= 2:
+        max_ratio = model.NewIntVar(0, SCALE, 'max_ratio')
+        min_ratio = model.NewIntVar(0, SCALE, 'min_ratio')
+        for ratio_i in ratio_vars:
+            model.Add(max_ratio >= ratio_i)
+            model.Add(min_ratio <= ratio_i)
+        penalties.append(("ratio_gap", None, (max_ratio - min_ratio) * PENALTY_WEIGHTS["ratio_gap"]))
+    if len(weekend_exprs) >= 2:
+        bound = max(upper for _, upper in weekend_exprs)
+        max_weekend = model.NewIntVar(0, bound, 'max_weekend')
+        min_weekend = model.NewIntVar(0, bound, 'min_weekend')
+        for weekend_i, _ in weekend_exprs:
+            model.Add(max_weekend >= weekend_i)
+            model.Add(min_weekend <= weekend_i)
+        penalties.append(("weekend_gap", None, (max_weekend - min_weekend) * PENALTY_WEIGHTS["weekend_gap"]))
+
+    size.mark("fairness")
+
+    # 8. Séquences de travail et 9. Repos (MOLLES, inclut l'historique)
+    for n, emp in enumerate(employees):
+        for d in range(-3, num_days - max_consecutive_work + 1):
+            add_soft_clause("over_consecutive", n, [working(n, d + i) for i in range(max_consecutive_work + 1)], [],
+                            f'over_consecutive_n{n}_d{d}')
+        size.mark("over_consecutive")
+        if emp['sex'] == 'M':
+            for d in range(-1, num_days - 1):
+                for s in SHIFTS:
+                    add_soft_clause("over_same", n, [shift_lit(n, d + i, s) for i in range(3)], [], f'over_same_n{n}_d{d}_s{s}')
+        size.mark("over_same")
+        for d in range(0, num_days + 1):
+            add_soft_clause("isolated_work", n, [working(n, d)], [working(n, d - 1), working(n, d + 1)], f'iso_n{n}_d{d}')
+        size.mark("isolated_work")
+
+        for d in range(-2, num_days - 3 + 1):
+            add_soft_clause("over_rest", n, [], [working(n, d + i) for i in range(5)], f'over_rest_n{n}_d{d}')
+        size.mark("over_rest")
+        for d in range(0, num_days):
+            add_soft_clause("isolated_rest", n, [working(n, d - 1), working(n, d + 1)], [working(n, d)], f'iso_r_n{n}_d{d}')
+        size.mark("isolated_rest")
+        for d in range(-2, num_days - 3 + 1):
+            add_soft_clause("rest4", n, [], [working(n, d + i) for i in range(4)], f'rest4_n{n}_d{d}')
+        size.mark("rest4")
+        for d in range(0, num_days - 2):
+            add_soft_clause("bad_nrj", n, [shift_lit(n, d, NIGHT), shift_lit(n, d + 2, DAY)], [working(n, d + 1)], f'bad_nrj_n{n}_d{d}')
+            add_soft_clause("bad_nrn", n, [shift_lit(n, d, NIGHT), shift_lit(n, d + 2, NIGHT)], [working(n, d + 1)], f'bad_nrn_n{n}_d{d}')
+            add_soft_clause("bad_jrj", n, [shift_lit(n, d, DAY), shift_lit(n, d + 2, DAY)], [working(n, d + 1)], f'bad_jrj_n{n}_d{d}')
+        size.mark("rest_transitions")
+
+    row_names = _add_symmetry_breaking(model, shifts, employees, leaves, params, num_days)
+    size.mark("symmetry")
+
+    return {
+        "model": model, "shifts": shifts, "penalties": penalties,
+        "year": year, "month": month, "num_days": num_days, "employees": employees, "leaves": leaves,
+        "row_names": row_names, "model_size": size.counts,
+    }
+
+
+def _build_template_model(year, month, employees, leaves, params):
+    """Modèle standard instancié depuis un gabarit mis en cache (cf. model_template.py)."""
+    from model_template import build_model_from_template # Import différé : model_template importe ce module
+    return build_model_from_template(year, month, employees, leaves, params)
+
+
+# Constructeurs de modèle disponibles (params["model"])
+MODEL_BUILDERS = {"standard": _build_model, "compact": _build_compact_model, "template": _build_template_model}
+
+
+def _matrix_from_values(ctx, value):
+    """
+    Convertit une affectation (fonction `value(var)`) en matrice agent×jour int8
+    (REST/DAY/NIGHT), lignes dans l'ordre de `employees`.
+    """
+    names = [e['name'] for e in ctx["employees"]]
+    row_of = {name: i for i, name in enumerate(names)}
+    rows = [row_of[name] for name in ctx["row_names"]] # Lignes du modèle -> ordre des employés
+    matrix = np.full((len(names), ctx["num_days"]), REST, dtype=np.int8)
+    for (n, d, s), var in ctx["shifts"].items():
+        if value(var):
+            matrix[rows[n], d - 1] = s
+    return matrix
+
+
+def _schedule_from_values(ctx, value):
+    """
+    Convertit une affectation en (matrice agent×jour, DataFrame Jour/Date/Semaine/Matin/Nuit).
+    """
+    matrix = _matrix_from_values(ctx, value)
+    names = [e['name'] for e in ctx["employees"]]
+    return matrix, schedule_frame(matrix, names, ctx["year"], ctx["month"])
+
+
+def _penalty_breakdown(ctx, params, matrix):
+    """
+    Pénalité réalisée par règle et par agent d'un planning (matrice agent×jour).
+
+    Les indicateurs du modèle n'ont souvent qu'une borne inférieure (cf. add_soft_indicator) :
+    dans une solution non optimale, un indicateur peut valoir 1 sans que sa fenêtre soit
+    violée. La pénalité est donc recalculée sur le planning par validator.ScheduleValidator.
+
+    Returns:
+        dict: {penalties_by_rule, penalties_by_agent, penalty_breakdown}
+    """
+    from validator import ScheduleValidator # Import différé : validator importe ce module
+    report = ScheduleValidator(ctx["year"], ctx["month"], ctx["employees"], ctx["leaves"], params).validate(matrix)
+    return {key: report[key] for key in ("penalties_by_rule", "penalties_by_agent", "penalty_breakdown")}
+
+
+def _relative_gap(objective, bound):
+    return abs(objective - bound) / max(1.0, abs(objective))
+
+
+class ScheduleSolutionCallback(cp_model.CpSolverSolutionCallback):
+    """
+    Callback CP-SAT appelé à chaque solution améliorante.
+
+    Transmet à `on_solution` un dict {schedule, matrix, objective, best_bound, gap,
+    wall_time, solution_index}. Si `on_solution` retourne True, la recherche est arrêtée.
+    """
+
+    def __init__(self, ctx, on_solution=None):
+        super().__init__()
+        self._ctx = ctx
+        self._on_solution = on_solution
+        self.solution_count = 0
+        self.last_improvement = None
+        self.first_solution_time = None
+        self.best_solution_time = None
+        self.start_time = time.monotonic()
+
+    def on_solution_callback(self):
+        self.solution_count += 1
+        self.last_improvement = time.monotonic()
+        self.best_solution_time = self.WallTime()
+        if self.first_solution_time is None:
+            self.first_solution_time = self.best_solution_time
+        if self._on_solution is None:
+            return
+        if "total_objective" in self._ctx: # Mode hiérarchique : pénalité totale, et non celle du niveau
+            objective = round(self.Value(self._ctx["total_objective"]))
+        else:
+            objective = round(self.ObjectiveValue()) # Pénalités entières
+        bound = self.BestObjectiveBound()
+        matrix, schedule = _schedule_from_values(self._ctx, self.Value)
+        info = {
+            "schedule": schedule,
+            "matrix": matrix,
+            "objective": objective,
+            "best_bound": bound,
+            "gap": _relative_gap(objective, bound),
+            "wall_time": self.WallTime(),
+            "solution_index": self.solution_count,
+        }
+        if self._on_solution(info):
+            self.StopSearch()
+
+
+def _watch_stop_rules(solver, callback, done, stop_event, no_improvement):
+    """
+    Surveille les critères d'arrêt qui ne dépendent pas d'une nouvelle solution
+    (annulation externe, absence d'amélioration depuis N secondes).
+    """
+    while not done.wait(0.1):
+        if stop_event is not None and stop_event.is_set():
+            solver.StopSearch()
+            return
+        if no_improvement and callback.last_improvement is not None:
+            if time.monotonic() - callback.last_improvement >= no_improvement:
+                solver.StopSearch()
+                return
+
+
+def solve_schedule(year, month, employees, leaves, params, on_solution=None, stop_event=None):
+    """
+    Résout le planning en mode "anytime" et retourne la meilleure solution trouvée.
+
+    Démarrage à chaud (optionnel) :
+        params["previous_schedule"]: Planning précédent (DataFrame de generate_schedule
+            ou matrice agent×jour, cf. schedule_matrix.schedule_to_matrix) utilisé comme indice.
+        params["change_penalty"] (int): Pénalité par journée d'agent modifiée par rapport
+            au planning précédent (0 = désactivé).
+
+    Objectif : params["objective_mode"] = "weighted" (défaut, somme pondérée de toutes
+    les pénalités) ou "lexicographic" (niveaux résolus l'un après l'autre, cf.
+    _solve_lexicographic ; params["objective_tiers"] et params["tier_time_shares"]
+    remplacent OBJECTIVE_TIERS et TIER_TIME_SHARES).
+
+    Formulation du modèle : params["model"] = "standard" (défaut), "compact"
+    (même objectif, moins de contraintes, cf. _build_compact_model) ou "template"
+    (modèle standard instancié depuis un gabarit en cache, cf. model_template.py).
+
+    Reproductibilité : params["random_seed"] (graine du solveur, cf. aussi
+    _add_symmetry_breaking) et params["num_workers"] (threads de recherche,
+    défaut : tous les cœurs).
+
+    Les critères d'arrêt se règlent via `params["stop_rules"]` :
+        max_time (float): Délai maximal en secondes (défaut 120).
+        relative_gap (float): Écart relatif objectif/borne à atteindre (ex. 0.05).
+        no_improvement (float): Arrêt après N secondes sans solution améliorante.
+
+    Args:
+        on_solution (callable): Appelée à chaque solution améliorante (voir ScheduleSolutionCallback).
+        stop_event (threading.Event): Arrête la recherche dès qu'il est activé.
+
+    Returns:
+        dict: Résultat et télémétrie :
+            schedule (DataFrame ou None), matrix (agent×jour int8 REST/DAY/NIGHT, lignes dans
+            l'ordre de `agents`, cf. schedule_matrix pour les vues dérivées), agents, status,
+            objective (pénalité réalisée du planning), best_bound, gap,
+            wall_time / user_time (résolution), build_time (construction du modèle),
+            first_solution_time / best_solution_time (secondes de résolution),
+            num_branches, num_conflicts, num_solutions,
+            num_variables, num_constraints, model_size ({famille: {variables, constraints}}),
+            penalties_by_rule, penalties_by_agent, penalty_breakdown (pénalité réalisée),
+            tiers (mode hiérarchique : [{rules, status, objective, best_bound, wall_time}]).
+    """
+    build_start = time.monotonic()
+    ctx = MODEL_BUILDERS[params.get("model", "standard")](year, month, employees, leaves, params)
+    model = ctx["model"]
+    if not model.HasObjective(): # Les gabarits portent déjà leur objectif
+        model.Minimize(_objective(ctx))
+    build_time = time.monotonic() - build_start
+    if params.get("objective_mode", "weighted") == "lexicographic":
+        return _solve_lexicographic(ctx, params, build_time, on_solution, stop_event)
+    return _solve_model(ctx, params, build_time, on_solution, stop_event)
+
+
+def _objective_tiers(ctx, params):
+    """Pénalités du modèle réparties par niveau [(règles, [termes])] (niveaux vides ignorés)."""
+    tiers = [list(rules) for rules in params.get("objective_tiers", OBJECTIVE_TIERS)]
+    level = {rule: i for i, rules in enumerate(tiers) for rule in rules}
+    terms = [[] for _ in tiers]
+    for rule, _, term in ctx["penalties"]:
+        if rule not in level:
+            tiers[-1].append(rule)
+            level[rule] = len(tiers) - 1
+        terms[level[rule]].append(term)
+    return [(rules, tier_terms) for rules, tier_terms in zip(tiers, terms)
+            if any(not _is_constant(term) for term in tier_terms)]
+
+
+def _solve_lexicographic(ctx, params, build_time, on_solution=None, stop_event=None):
+    """
+    Optimisation hiérarchique : chaque niveau de règles est minimisé à son tour, avec
+    sa part du délai total. La valeur atteinte devient une borne (contrainte) pour les
+    niveaux suivants, et la solution sert d'indice au niveau suivant.
+
+    Les règles critiques ne sont plus mises en balance avec les petites préférences :
+    chaque niveau a son propre statut (OPTIMAL = optimum prouvé à niveaux précédents fixés).
+
+    Un niveau qui s'achève sans solution (arrêt demandé, délai trop court) est conservé
+    dans `tiers` sans valeur (objective None) ; le planning du niveau précédent est gardé.
+
+    Returns:
+        dict: Même format que solve_schedule ; objective = pénalité totale pondérée,
+            best_bound = somme des niveaux résolus et de la borne du dernier d'entre eux,
+            status = OPTIMAL si tous les niveaux sont résolus et prouvés optimaux.
+    """
+    model = ctx["model"]
+    stop_rules = params.get("stop_rules", {})
+    budget = float(stop_rules.get("max_time") or MAX_TIME_IN_SECONDS)
+    tiers = _objective_tiers(ctx, params)
+    shares = list(params.get("tier_time_shares", TIER_TIME_SHARES))
+    shares += [shares[-1]] * (len(tiers) - len(shares))
+    ctx["total_objective"] = _objective(ctx)
+    row_of = {e['name']: i for i, e in enumerate(ctx["employees"])}
+    rows = [row_of[name] for name in ctx["row_names"]]
+    start = time.monotonic()
+
+    result, stages, offset = None, [], 0
+    for i, (rules, terms) in enumerate(tiers):
+        if result is not None and stop_event is not None and stop_event.is_set():
+            break
+        remaining = budget - (time.monotonic() - start)
+        if result is not None and remaining <= 0:
+            break
+        stage_time = max(1.0, remaining * shares[i] / sum(shares[i:len(tiers)]))
+        tier_objective = sum(terms)
+        model.ClearObjective()
+        model.Minimize(tier_objective)
+
+        def on_stage_solution(info, stage=i, offset=offset, elapsed=time.monotonic() - start):
+            # Borne : niveaux précédents fixés + borne du niveau en cours ; temps depuis le début
+            bound = offset + info["best_bound"]
+            return on_solution({**info, "stage": stage, "best_bound": bound, "gap": _relative_gap(info["objective"], bound),
+                                "wall_time": elapsed + info["wall_time"]})
+
+        stage = _solve_model(ctx, {**params, "stop_rules": {**stop_rules, "max_time": stage_time}}, build_time,
+                             on_stage_solution if on_solution is not None else None, stop_event)
+        build_time = stage["build_time"]
+        # Valeur réalisée du niveau (stage["objective"] : pénalité totale du planning)
+        tier_value = sum(stage["penalties_by_rule"].get(rule, 0) for rule in rules) \
+            if stage["matrix"] is not None else None
+        stages.append({"rules": rules, "status": stage["status"], "objective": tier_value,
+                       "best_bound": stage["best_bound"], "wall_time": stage["wall_time"]})
+        if result is not None:
+            totals = {key: result[key] + stage[key]
+                      for key in ("wall_time", "user_time", "num_branches", "num_conflicts", "num_solutions")}
+            if stage["matrix"] is None: # Planning du niveau précédent conservé
+                result.update(totals)
+                break
+            stage.update(totals, first_solution_time=result["first_solution_time"])
+        result = stage
+        if stage["matrix"] is None:
+            break
+        # Niveau réglé : sa valeur est imposée aux niveaux suivants, la solution sert d'indice
+        model.Add(tier_objective <= tier_value)
+        offset += tier_value
+        model.ClearHints()
+        for (n, d, s), var in ctx["shifts"].items():
+            if not _is_constant(var):
+                model.AddHint(var, int(stage["matrix"][rows[n], d - 1] == s))
+
+    result["tiers"] = stages
+    solved = [t for t in stages if t["objective"] is not None]
+    if solved:
+        result["objective"] = sum(result["penalties_by_rule"].values())
+        result["best_bound"] = offset - solved[-1]["objective"] + solved[-1]["best_bound"]
+        result["gap"] = _relative_gap(result["objective"], result["best_bound"])
+        result["status"] = "OPTIMAL" if len(solved) == len(tiers) and all(t["status"] == "OPTIMAL" for t in solved) \
+            else "FEASIBLE"
+    return result
+
+
+def empty_result(employees, status):
+    """Résultat au format solve_schedule sans planning ni résolution (ex. mois impossible détecté avant)."""
+    return {
+        "schedule": None,
+        "matrix": None,
+        "agents": [e['name'] for e in employees],
+        "status": status,
+        "objective": None,
+        "best_bound": None,
+        "gap": None,
+        "wall_time": 0.0,
+        "user_time": 0.0,
+        "build_time": 0.0,
+        "first_solution_time": None,
+        "best_solution_time": None,
+        "num_branches": 0,
+        "num_conflicts": 0,
+        "num_solutions": 0,
+        "num_variables": 0,
+        "num_constraints": 0,
+        "model_size": {},
+        "penalties_by_rule": {},
+        "penalties_by_agent": {},
+        "penalty_breakdown": [],
+    }
+
+
+def _solve_model(ctx, params, build_time=0.0, on_solution=None, stop_event=None):
+    """
+    Résout un modèle déjà construit (contexte de MODEL_BUILDERS, objectif posé) ;
+    le modèle peut être complété puis résolu de nouveau (cf. solution_pool.py).
+
+    Returns:
+        dict: Même format que solve_schedule.
+    """
+    model = ctx["model"]
+    stop_rules = params.get("stop_rules", {})
     solver = cp_model.CpSolver()
-    solver.parameters.max_time_in_seconds = 120.0
-    status = solver.Solve(model)
+    solver.parameters.max_time_in_seconds = float(stop_rules.get("max_time") or MAX_TIME_IN_SECONDS)
+    if stop_rules.get("relative_gap"):
+        solver.parameters.relative_gap_limit = float(stop_rules["relative_gap"])
+    if "random_seed" in params:
+        solver.parameters.random_seed = int(params["random_seed"])
+    if params.get("num_workers"):
+        solver.parameters.num_workers = int(params["num_workers"])
 
+    callback = ScheduleSolutionCallback(ctx, on_solution)
+    done = threading.Event()
+    watcher = threading.Thread(
+        target=_watch_stop_rules,
+        args=(solver, callback, done, stop_event, stop_rules.get("no_improvement")),
+        daemon=True,
+    )
+    watcher.start()
+    try:
+        status = solver.Solve(model, callback)
+    finally:
+        done.set()
+        watcher.join()
+
+    proto = model.Proto()
+    result = empty_result(ctx["employees"], solver.StatusName(status))
+    result.update({
+        "wall_time": solver.WallTime(),
+        "user_time": solver.UserTime(),
+        "build_time": build_time,
+        "first_solution_time": callback.first_solution_time,
+        "best_solution_time": callback.best_solution_time,
+        "num_branches": solver.NumBranches(),
+        "num_conflicts": solver.NumConflicts(),
+        "num_solutions": callback.solution_count,
+        "num_variables": len(proto.variables),
+        "num_constraints": len(proto.constraints),
+        "model_size": ctx["model_size"],
+    })
     if status in [cp_model.OPTIMAL, cp_model.FEASIBLE]:
-        data = []
-        for d in range(1, num_days + 1):
-            m, n_lst = [], []
-            for ni, emp in enumerate(employees):
-                if solver.Value(shifts[(ni, d, DAY)]): m.append(emp['name'])
-                if solver.Value(shifts[(ni, d, NIGHT)]): n_lst.append(emp['name'])
-            data.append({"Jour": d, "Date": datetime.date(year, month, d).strftime("%d/%m/%Y"),
-                         "Semaine": ["Lun","Mar","Mer","Jeu","Ven","Sam","Dim"][datetime.date(year, month, d).weekday()],
-                         "Matin": ", ".join(m), "Nuit": ", ".join(n_lst)})
-        return pd.DataFrame(data)
-    return None
+        result["matrix"], result["schedule"] = _schedule_from_values(ctx, solver.Value)
+        result.update(_penalty_breakdown(ctx, params, result["matrix"]))
+        # Pénalité réalisée (<= valeur de l'objectif du solveur, dont les indicateurs peuvent être en excès)
+        result["objective"] = sum(result["penalties_by_rule"].values())
+        result["best_bound"] = solver.BestObjectiveBound()
+        result["gap"] = _relative_gap(result["objective"], result["best_bound"])
+    return result
+
+
+def iter_schedules(year, month, employees, leaves, params):
+    """
+    Générateur "anytime" : produit chaque solution améliorante dès qu'elle est trouvée.
+
+    La résolution tourne dans un thread ; fermer le générateur (break, close())
+    arrête la recherche. Le résultat final de `solve_schedule` est la valeur de
+    retour du générateur (StopIteration.value).
+    """
+    solutions = queue.Queue()
+    stop_event = threading.Event()
+    outcome = {}
+
+    def run():
+        try:
+            outcome["result"] = solve_schedule(year, month, employees, leaves, params,
+                                               on_solution=solutions.put, stop_event=stop_event)
+        except Exception as e:
+            outcome["error"] = e
+        finally:
+            solutions.put(None)
+
+    worker = threading.Thread(target=run, daemon=True)
+    worker.start()
+    try:
+        while True:
+            info = solutions.get()
+            if info is None:
+                break
+            yield info
+    finally:
+        stop_event.set()
+        worker.join()
+    if "error" in outcome:
+        raise outcome["error"]
+    return outcome["result"]
+
+
+def score_schedule(year, month, employees, leaves, params, schedule):
+    """
+    Évalue la pénalité totale d'un planning donné avec le modèle CP-SAT.
+
+    Toutes les variables de poste sont fixées au planning fourni ; seuls les
+    indicateurs de pénalité restent libres, au plus juste par minimisation.
+
+    Returns:
+        float or None: Objectif du planning, ou None s'il viole une règle DURE.
+    """
+    params = {**params, "symmetry_breaking": False} # Le planning fixé n'a pas à être l'ordre canonique
+    ctx = MODEL_BUILDERS[params.get("model", "standard")](year, month, employees, leaves, params)
+    model, shifts = ctx["model"], ctx["shifts"]
+    matrix = schedule_to_matrix(schedule, [e['name'] for e in employees], ctx["num_days"])
+    for (n, d, s), var in shifts.items():
+        if not _is_constant(var):
+            model.Add(var == (1 if matrix[n, d - 1] == s else 0))
+    model.Minimize(_objective(ctx))
+    solver = cp_model.CpSolver()
+    solver.parameters.max_time_in_seconds = MAX_TIME_IN_SECONDS
+    status = solver.Solve(model)
+    if status != cp_model.OPTIMAL:
+        return None
+    return round(solver.ObjectiveValue())
+
+
+def repair_schedule(year, month, employees, leaves, params, published, from_day, new_absences=None,
+                    on_solution=None, stop_event=None):
+    """
+    Répare un planning publié en cours de mois (arrêt maladie, absence imprévue...).
+
+    Les affectations des jours 1 .. from_day-1 sont figées (constantes) ; seuls les
+    jours restants sont ré-optimisés. Les règles d'équité et de séquence comptent
+    toujours la partie figée. Le planning publié sert d'indice pour les jours restants.
+
+    Args:
+        published: Planning publié (DataFrame de generate_schedule ou matrice agent×jour).
+        from_day (int): Premier jour modifiable.
+        new_absences (dict): {nom_employé: [jours]} ajoutés aux congés existants.
+
+    Returns:
+        dict: Même format que solve_schedule.
+    """
+    merged_leaves = {name: list(days) for name, days in leaves.items()}
+    for name, days in (new_absences or {}).items():
+        merged_leaves[name] = sorted(set(merged_leaves.get(name, [])) | set(days))
+
+    repair_params = dict(params)
+    repair_params["frozen_schedule"] = published
+    repair_params["freeze_before"] = from_day
+    repair_params.setdefault("previous_schedule", published)
+    return solve_schedule(year, month, employees, merged_leaves, repair_params,
+                          on_solution=on_solution, stop_event=stop_event)
+
+
+def generate_schedule(year, month, employees, leaves, params):
+    """
+    Génère un planning mensuel en respectant les contraintes métier.
+    
+    Args:
+        year (int): Année du planning.
+        month (int): Mois du planning.
+        employees (list): Liste de dictionnaires {'name': str, 'sex': 'M'/'F'}.
+        leaves (dict): Dict {nom_employé: [jours_de_congés]}.
+        params (dict): Paramètres de contraintes (activées/désactivées).
+        
+    Returns:
+        pd.DataFrame or None: Le planning généré ou None si aucune solution.
+    """
+    return solve_schedule(year, month, employees, leaves, params)["schedule"]
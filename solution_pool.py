@@ -0,0 +1,131 @@
+"""
+Plannings alternatifs : plusieurs bons plannings, différents entre eux, en une seule session.
+
+Le modèle est construit une fois. Après chaque solution, une contrainte de
+diversité (distance de Hamming sur les journées d'agent) l'exclut avec tout son
+voisinage : la résolution suivante cherche le meilleur planning différant d'au
+moins `min_changes` journées de CHACUNE des solutions déjà retenues. Chaque
+résolution change de graine pour varier l'exploration.
+
+Les alternatives dépendent des solutions précédentes : elles sont résolues
+l'une après l'autre, chacune avec tous les cœurs (num_workers).
+
+Pour chaque alternative : pénalité, écart avec le planning de référence (le
+premier du lot), journées et agents qui changent par rapport à lui.
+"""
+import time
+
+import numpy as np
+
+from scheduler import MODEL_BUILDERS, SHIFTS, _objective, _solve_model
+from schedule_matrix import DAY, NIGHT, REST, schedule_to_matrix
+
+DEFAULT_COUNT = 3
+# Part minimale de journées d'agent qui diffèrent entre deux plannings du lot
+DEFAULT_MIN_CHANGE_RATIO = 0.05
+
+CODE_NAMES = {REST: "REP", DAY: "DAY", NIGHT: "NIGHT"}
+
+
+def default_min_changes(employees, num_days, params):
+    """Distance minimale par défaut : DEFAULT_MIN_CHANGE_RATIO des journées modifiables (au moins 1)."""
+    free_days = num_days - params.get("freeze_before", 1) + 1
+    return max(1, round(DEFAULT_MIN_CHANGE_RATIO * len(employees) * free_days))
+
+
+def _add_diversity(ctx, matrix, min_changes):
+    """Impose au modèle au moins `min_changes` journées d'agent différentes de `matrix`."""
+    row_of = {e['name']: i for i, e in enumerate(ctx["employees"])}
+    shifts = ctx["shifts"]
+    changes = []
+    for n, name in enumerate(ctx["row_names"]):
+        row = matrix[row_of[name]]
+        for d in range(1, ctx["num_days"] + 1):
+            was = int(row[d - 1])
+            if was == REST:
+                changes.extend(shifts[(n, d, s)] for s in SHIFTS)
+            else:
+                changes.append(1 - shifts[(n, d, was)])
+    ctx["model"].Add(sum(changes) >= min_changes)
+
+
+def _rule_objective(result):
+    """Pénalité hors « changement minimal » (propre au planning précédent de la résolution)."""
+    return result["objective"] - result["penalties_by_rule"].get("change", 0)
+
+
+def _differences(names, best, matrix):
+    changed = matrix != best
+    return [{"agent": names[n], "day": int(d) + 1, "best": CODE_NAMES[int(best[n, d])],
+             "alternative": CODE_NAMES[int(matrix[n, d])]}
+            for n, d in zip(*np.nonzero(changed))]
+
+
+def solve_alternatives(year, month, employees, leaves, params, count=DEFAULT_COUNT, min_changes=None,
+                       best=None, time_limit=None, stop_event=None, on_result=None):
+    """
+    Retourne jusqu'à `count` plannings de bonne qualité, deux à deux différents.
+
+    Args:
+        params (dict): Paramètres de solve_schedule ; la pénalité de changement est
+            ignorée (les alternatives doivent justement s'écarter de la référence).
+        count (int): Nombre de plannings voulus, meilleur compris.
+        min_changes (int): Journées d'agent (repos / matin / nuit) qui doivent différer
+            entre deux plannings du lot (défaut : default_min_changes).
+        best (dict): Résultat de solve_schedule déjà obtenu pour ces paramètres (référence) ;
+            sinon la meilleure solution est d'abord recherchée dans la session.
+        time_limit (float): Délai maximal par alternative (défaut : params["stop_rules"]).
+        stop_event (threading.Event): Interrompt la session (les plannings déjà trouvés sont conservés).
+        on_result (callable): Appelée avec chaque alternative trouvée.
+
+    Returns:
+        dict: solutions (résultats au format solve_schedule, la référence `best` en premier,
+            complétés de delta, changed_days, affected et differences [{agent, day, best,
+            alternative}] par rapport à elle), min_changes, status (statut de la dernière
+            résolution), wall_time.
+    """
+    start = time.monotonic()
+    pool_params = {**params, "change_penalty": 0}
+    if best is not None and best["matrix"] is not None:
+        pool_params["previous_schedule"] = best["matrix"]
+    build_start = time.monotonic()
+    ctx = MODEL_BUILDERS[pool_params.get("model", "standard")](year, month, employees, leaves, pool_params)
+    if not ctx["model"].HasObjective():
+        ctx["model"].Minimize(_objective(ctx))
+    build_time = time.monotonic() - build_start
+    if min_changes is None:
+        min_changes = default_min_changes(employees, ctx["num_days"], pool_params)
+
+    if best is None:
+        best = _solve_model(ctx, pool_params, build_time, stop_event=stop_event)
+        build_time = 0.0
+    status = best["status"]
+    solutions = []
+    if best["matrix"] is not None:
+        names = [e['name'] for e in employees]
+        best_matrix = schedule_to_matrix(best["matrix"], names, ctx["num_days"])
+        solutions.append({**best, "matrix": best_matrix, "delta": 0, "changed_days": 0, "affected": [],
+                          "differences": []})
+
+    stop_rules = dict(pool_params.get("stop_rules", {}))
+    if time_limit:
+        stop_rules["max_time"] = time_limit
+    seed = int(pool_params.get("random_seed", 0))
+    while solutions and len(solutions) < count and not (stop_event is not None and stop_event.is_set()):
+        _add_diversity(ctx, solutions[-1]["matrix"], min_changes)
+        result = _solve_model(ctx, {**pool_params, "stop_rules": stop_rules, "random_seed": seed + len(solutions)},
+                              build_time, stop_event=stop_event)
+        build_time = 0.0
+        status = result["status"]
+        if result["matrix"] is None: # Plus de planning assez différent (ou délai trop court)
+            break
+        changed = result["matrix"] != best_matrix
+        result.update(delta=_rule_objective(result) - _rule_objective(best),
+                      changed_days=int(np.count_nonzero(changed)),
+                      affected=[name for name, row in zip(names, changed) if row.any()],
+                      differences=_differences(names, best_matrix, result["matrix"]))
+        solutions.append(result)
+        if on_result is not None:
+            on_result(result)
+    return {"solutions": solutions, "min_changes": min_changes, "status": status,
+            "wall_time": time.monotonic() - start}
@@ -0,0 +1,183 @@
+"""
+Résolutions en arrière-plan : les plannings sont calculés par un pool de threads,
+indépendamment des ré-exécutions du script Streamlit.
+
+Chaque demande devient un `SolveJob` identifié par un id (à conserver dans
+st.session_state). La page interroge le job (statut, meilleure solution,
+progression de l'objectif) et peut l'annuler : l'annulation arrête réellement
+la recherche CP-SAT (stop_event de solve_schedule).
+
+Les autres calculs longs de la page (réparation, plannings alternatifs,
+simulation de congés) passent par le même pool : toute fonction acceptant
+`stop_event` et un rappel de résultats intermédiaires peut être soumise.
+"""
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from scheduler import solve_schedule
+
+QUEUED = "QUEUED"
+RUNNING = "RUNNING"
+DONE = "DONE"
+CANCELLED = "CANCELLED"
+ERROR = "ERROR"
+
+DEFAULT_MAX_JOBS = 2
+# Durée de conservation d'un job terminé dont le résultat n'a pas été récupéré
+FINISHED_JOB_TTL = 3600.0
+
+
+class SolveJob:
+    """
+    Une résolution soumise au pool.
+
+    Attributs lus par la page : status, latest (dernière solution améliorante,
+    cf. ScheduleSolutionCallback), progress ([(secondes, objectif)]), partial
+    (tous les résultats intermédiaires), result (dict de solve_schedule une fois
+    terminé), error, elapsed.
+
+    Args:
+        solve (callable): Fonction de résolution, appelée avec (year, month, employees,
+            leaves, params, stop_event=..., **options) ; défaut : solve_schedule.
+        callback (str): Nom de son argument de rappel des résultats intermédiaires
+            (ex. "on_result" pour solution_pool.solve_alternatives).
+    """
+
+    def __init__(self, year, month, employees, leaves, params, solve=solve_schedule, callback="on_solution",
+                 **options):
+        self.id = uuid.uuid4().hex
+        self.args = (year, month, employees, leaves, params)
+        self.solve = solve
+        self.options = {**options, callback: self._on_solution}
+        self.status = QUEUED
+        self.latest = None
+        self.progress = []
+        self.partial = []
+        self.result = None
+        self.error = None
+        self.keep_best = False
+        self.stop_event = threading.Event()
+        self.submitted_at = time.monotonic()
+        self.started_at = None
+        self.finished_at = None
+
+    @property
+    def done(self):
+        return self.status in (DONE, CANCELLED, ERROR)
+
+    @property
+    def elapsed(self):
+        """Secondes de résolution (0 tant que le job attend un thread libre)."""
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.monotonic()) - self.started_at
+
+    def cancel(self, keep_best=False):
+        """
+        Arrête la recherche. Avec keep_best=True, la meilleure solution trouvée
+        jusque-là devient le résultat du job ; sinon le job est abandonné.
+        """
+        self.keep_best = keep_best
+        self.stop_event.set()
+
+    def _on_solution(self, info):
+        self.latest = info
+        self.partial.append(info)
+        if info.get("objective") is not None:
+            self.progress.append((info["wall_time"], info["objective"]))
+
+    def run(self, on_done=None):
+        if self.stop_event.is_set() and not self.keep_best: # Annulé avant de démarrer
+            self.status = CANCELLED
+            self.finished_at = time.monotonic()
+            return
+        self.status = RUNNING
+        self.started_at = time.monotonic()
+        try:
+            self.result = self.solve(*self.args, stop_event=self.stop_event, **self.options)
+            self.status = CANCELLED if self.stop_event.is_set() and not self.keep_best else DONE
+        except Exception as e:
+            self.error = e
+            self.status = ERROR
+        finally:
+            self.finished_at = time.monotonic()
+        if on_done is not None and self.status == DONE:
+            on_done(self)
+
+
+class SolveJobManager:
+    """
+    Pool de résolutions partagé par toutes les sessions du serveur.
+
+    Args:
+        max_jobs (int): Résolutions simultanées ; les suivantes attendent (statut QUEUED).
+        cache (ScheduleCache): Si fourni, les résultats complets (non interrompus)
+            soumis avec une clé sont enregistrés dans ce cache.
+    """
+
+    def __init__(self, max_jobs=DEFAULT_MAX_JOBS, cache=None):
+        self.max_jobs = max_jobs
+        self.cache = cache
+        self._executor = ThreadPoolExecutor(max_workers=max_jobs, thread_name_prefix="solve-job")
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, year, month, employees, leaves, params, cache_key=None, solve=solve_schedule,
+               callback="on_solution", **options):
+        """
+        Soumet une résolution (solve_schedule, ou autre calcul : cf. SolveJob).
+
+        Sauf indication contraire (params["num_workers"]), les cœurs sont répartis
+        entre les résolutions simultanées.
+
+        Returns:
+            str: Identifiant du job.
+        """
+        if not params.get("num_workers"):
+            params = {**params, "num_workers": max(1, (os.cpu_count() or 1) // self.max_jobs)}
+        job = SolveJob(year, month, employees, leaves, params, solve, callback, **options)
+
+        def store(finished):
+            if self.cache is not None and cache_key is not None and not finished.stop_event.is_set():
+                self.cache.put(cache_key, finished.result)
+
+        with self._lock:
+            self._prune()
+            self._jobs[job.id] = job
+        self._executor.submit(job.run, store)
+        return job.id
+
+    def get(self, job_id):
+        """Retourne le job `job_id`, ou None s'il est inconnu (expiré, serveur redémarré)."""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id, keep_best=False):
+        job = self.get(job_id)
+        if job is not None:
+            job.cancel(keep_best)
+        return job
+
+    def forget(self, job_id):
+        """Oublie un job terminé dont le résultat a été récupéré."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None and job.done:
+                del self._jobs[job_id]
+
+    def active_jobs(self):
+        with self._lock:
+            return [job for job in self._jobs.values() if not job.done]
+
+    def shutdown(self):
+        for job in self.active_jobs():
+            job.cancel()
+        self._executor.shutdown(wait=True)
+
+    def _prune(self):
+        now = time.monotonic()
+        for job_id in [j.id for j in self._jobs.values() if j.done and now - j.finished_at > FINISHED_JOB_TTL]:
+            del self._jobs[job_id]
@@ -0,0 +1,62 @@
+import threading
+import time
+
+from scheduler import iter_schedules
+
+EMPLOYEES = [
+    {"name": "Agent A", "sex": "M"},
+    {"name": "Agent B", "sex": "M"},
+    {"name": "Agent C", "sex": "M"},
+    {"name": "Agent D", "sex": "M"},
+    {"name": "Mme E", "sex": "F"},
+]
+LEAVES = {"Agent B": [9, 10, 11]}
+
+
+def _drain(schedules):
+    """Solutions produites par le générateur et résultat final (StopIteration.value)."""
+    infos = []
+    while True:
+        try:
+            infos.append(next(schedules))
+        except StopIteration as stop:
+            return infos, stop.value
+
+
+def test_yielded_objectives_do_not_increase():
+    infos, result = _drain(iter_schedules(2026, 2, EMPLOYEES, LEAVES, {"stop_rules": {"max_time": 5}}))
+    assert infos and result["matrix"] is not None
+    objectives = [info["objective"] for info in infos]
+    assert all(b <= a for a, b in zip(objectives, objectives[1:])), objectives
+    assert [info["solution_index"] for info in infos] == list(range(1, len(infos) + 1))
+    assert result["num_solutions"] == len(infos)
+    # Pénalité réalisée : au plus celle de la dernière solution produite
+    assert result["objective"] <= objectives[-1]
+
+
+def test_relative_gap_stops_search_early():
+    # La borne de ce mois reste faible (écart d'environ 0,85 dès la première solution) :
+    # un seuil de 0,9 est atteint aussitôt, bien avant max_time
+    params = {"stop_rules": {"max_time": 60, "relative_gap": 0.9}}
+    infos, result = _drain(iter_schedules(2026, 2, EMPLOYEES, LEAVES, params))
+    assert infos and result["matrix"] is not None
+    assert result["wall_time"] < 20  # CP-SAT rend alors OPTIMAL (écart demandé atteint)
+    assert infos[-1]["gap"] <= 0.9 and result["gap"] <= 0.9
+
+
+def test_close_stops_worker_thread():
+    before = set(threading.enumerate())
+    schedules = iter_schedules(2026, 2, EMPLOYEES, LEAVES, {"stop_rules": {"max_time": 60}})
+    assert next(schedules)["matrix"] is not None
+    start = time.monotonic()
+    schedules.close()
+    # La recherche est arrêtée (pas de délai de 60 s) et le thread de résolution terminé
+    assert time.monotonic() - start < 10
+    assert set(threading.enumerate()) <= before
+
+
+if __name__ == "__main__":
+    test_yielded_objectives_do_not_increase()
+    test_relative_gap_stops_search_early()
+    test_close_stops_worker_thread()
+    print("OK: anytime")
@@ -0,0 +1,39 @@
+import json
+import os
+import tempfile
+
+from openpyxl import load_workbook
+
+from batch import load_teams, run_batch
+
+def test_batch_from_json_and_csv():
+    with tempfile.TemporaryDirectory() as tmp:
+        teams_dir = os.path.join(tmp, "equipes")
+        os.makedirs(teams_dir)
+        with open(os.path.join(teams_dir, "nord.json"), "w", encoding="utf-8") as f:
+            json.dump({"name": "Équipe Nord", "month": 2,
+                       "employees": [{"name": f"Agent {c}", "sex": "M"} for c in "ABCD"],
+                       "leaves": {"Agent A": [3, 4]}, "history": {"Agent B": ["DAY", "DAY", "NIGHT"]}}, f)
+        with open(os.path.join(teams_dir, "sud.csv"), "w", encoding="utf-8") as f:
+            f.write("name,sex,leaves,history\n"
+                    "Agent E,M,10-12,\nAgent F,M,,REP;NIGHT;NIGHT\nAgent G,M,,\nAgent H,M,20,\n")
+
+        teams = load_teams([teams_dir], year=2026, month=3)
+        assert [t["name"] for t in teams] == ["Équipe Nord", "sud"]
+        assert teams[0]["month"] == 2 and teams[1]["month"] == 3
+        assert teams[1]["leaves"] == {"Agent E": [10, 11, 12], "Agent H": [20]}
+        assert teams[1]["params"]["history"]["Agent F"] == ["REP", "NIGHT", "NIGHT"]
+
+        out = os.path.join(tmp, "out")
+        rows = run_batch(teams, out, jobs=2, time_limit=3, bundle=os.path.join(tmp, "tous.xlsx"))
+        assert [r["team"] for r in rows] == ["Équipe Nord", "sud"]
+        for row in rows:
+            assert row["status"] in ("OPTIMAL", "FEASIBLE"), row
+            assert load_workbook(row["output"]).active.max_row == (28 if row["month"] == 2 else 31) + 1
+        assert os.path.exists(os.path.join(out, "summary.csv"))
+        bundle = load_workbook(os.path.join(tmp, "tous.xlsx"), read_only=True)
+        assert bundle.sheetnames[0] == "Sommaire" and len(bundle.sheetnames) == 1 + 2 * 4
+
+if __name__ == "__main__":
+    test_batch_from_json_and_csv()
+    print("OK: batch")
@@ -0,0 +1,31 @@
+from benchmark import compare_to_baseline, default_suite, make_instance, run_instance
+
+def test_instances_are_reproducible():
+    suite = default_suite()
+    assert [i["name"] for i in suite] == [i["name"] for i in default_suite()]
+    assert suite == default_suite()
+    # Tous les seuils de congés (31 / 40) et toutes les longueurs de mois sont couverts
+    totals = {sum(len(days) for days in i["leaves"].values()) for i in suite}
+    assert {31, 32, 41} <= totals
+    assert {(2026, 2), (2028, 2), (2026, 4), (2026, 1)} <= {(i["year"], i["month"]) for i in suite}
+
+    instance = make_instance("t", 9, num_females=2, leave_days=40, num_days=31)
+    assert sum(len(days) for days in instance["leaves"].values()) == 40
+
+def test_baseline_comparison():
+    result = run_instance(make_instance("size03", 3, num_days=28), time_limit=5, num_workers=1)
+    assert result["status"] in ("OPTIMAL", "FEASIBLE")
+    assert result["first_solution_time"] <= result["best_solution_time"]
+
+    baseline = {"results": [result]}
+    assert compare_to_baseline({"results": [result]}, baseline) == []
+    worse = {**result, "objective": result["objective"] * 2 + 100, "status": "FEASIBLE"}
+    metrics = {r["metric"] for r in compare_to_baseline({"results": [worse]}, baseline)}
+    assert "objective" in metrics
+    lost = {**result, "status": "UNKNOWN", "objective": None}
+    assert compare_to_baseline({"results": [lost]}, baseline)[0]["metric"] == "status"
+
+if __name__ == "__main__":
+    test_instances_are_reproducible()
+    test_baseline_comparison()
+    print("OK: benchmark")
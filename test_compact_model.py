@@ -0,0 +1,57 @@
+from benchmark import default_suite
+from scheduler import solve_schedule, score_schedule
+
+# Corpus d'instances : petite équipe (capacité 1), équipe mixte avec congés
+# (> 31 jours -> 5 jours consécutifs autorisés), historique et jours fériés.
+INSTANCES = [
+    (2026, 2, [{"name": f"Agent {c}", "sex": "M"} for c in "ABCD"],
+     {"Agent A": [10, 11]},
+     {"history": {"Agent A": ["REP", "REP", "NIGHT"], "Agent B": ["DAY", "DAY", "DAY"]}}),
+    (2026, 3, [{"name": f"Agent {c}", "sex": "M"} for c in "ABCDEF"] + [{"name": "Mme Mliyani", "sex": "F"}],
+     {"Agent A": list(range(1, 11)), "Agent B": list(range(10, 22)), "Agent C": list(range(20, 31)),
+      "Mme Mliyani": [2, 3]},
+     {"holidays": [5, 20], "history": {"Agent D": ["NIGHT", "NIGHT", "REP"]}}),
+    (2026, 4, [{"name": f"Agent {c}", "sex": "M"} for c in "ABCDE"] + [{"name": "Mme Mliyani", "sex": "F"}],
+     {}, {"holidays": [1]}),
+]
+
+def test_compact_model_objective_equivalence():
+    for year, month, employees, leaves, params in INSTANCES:
+        schedules = []
+        solve_schedule(year, month, employees, leaves, {**params, "stop_rules": {"max_time": 3}},
+                       on_solution=lambda info: schedules.append(info["schedule"]))
+        assert schedules, f"aucune solution pour {year}-{month}"
+        for schedule in schedules[::2] + schedules[-1:]:
+            standard = score_schedule(year, month, employees, leaves, params, schedule)
+            compact = score_schedule(year, month, employees, leaves, {**params, "model": "compact"}, schedule)
+            assert standard == compact, f"{year}-{month}: standard={standard} compact={compact}"
+
+def test_compact_model_equivalence_on_benchmark_suite():
+    # Seuils de congés (31, 40), fériés, historique, mois de 29 jours ; reports d'équité
+    # et démarrage à chaud sur la dernière instance
+    names = ["size03", "mix7_f3", "leaves09_41", "holidays7", "full8", "month29"]
+    instances = [inst for inst in default_suite() if inst["name"] in names]
+    assert len(instances) == len(names)
+    for instance in instances:
+        args = (instance["year"], instance["month"], instance["employees"], instance["leaves"])
+        params = instance["params"]
+        result = solve_schedule(*args, {**params, "stop_rules": {"max_time": 3}})
+        assert result["matrix"] is not None, instance["name"]
+        if instance is instances[-1]:
+            params = {**params, "previous_schedule": result["matrix"][::-1], "change_penalty": 30,
+                      "carry_over": {e["name"]: {"day": 10 + i, "night": 12 - i, "weekend": i, "available": 28}
+                                     for i, e in enumerate(instance["employees"])}}
+        standard = score_schedule(*args, params, result["matrix"])
+        compact = score_schedule(*args, {**params, "model": "compact"}, result["matrix"])
+        assert standard == compact, f"{instance['name']}: standard={standard} compact={compact}"
+
+def test_compact_model_solves():
+    year, month, employees, leaves, params = INSTANCES[0]
+    result = solve_schedule(year, month, employees, leaves, {**params, "model": "compact", "stop_rules": {"max_time": 3}})
+    assert result["schedule"] is not None
+
+if __name__ == "__main__":
+    test_compact_model_objective_equivalence()
+    test_compact_model_equivalence_on_benchmark_suite()
+    test_compact_model_solves()
+    print("OK: compact model")
@@ -0,0 +1,100 @@
+import threading
+
+import numpy as np
+
+import engine
+from engine import daily_demand, decompose, from_scheduler_config, solve_engine
+from validator import validate_schedule
+
+SHIFT_TYPES = [{"code": "M", "label": "Matin"}, {"code": "A", "label": "Après-midi"}, {"code": "N", "label": "Nuit"}]
+
+def test_daily_demand_precedence():
+    spec = {"default": {"M": 3, "N": 2}, "weekdays": {6: {"M": 1}}, "holidays": {"M": 2, "N": 1}, "days": {2: {"N": 4}}}
+    demand = daily_demand(2026, 3, spec, [16], ["M", "N"])  # 1er mars 2026 : dimanche
+    assert (demand[(1, "M")], demand[(1, "N")]) == (1, 0)
+    assert (demand[(2, "M")], demand[(2, "N")]) == (0, 4)
+    assert (demand[(16, "M")], demand[(16, "N")]) == (2, 1)
+    assert (demand[(3, "M")], demand[(3, "N")]) == (3, 2)
+    assert daily_demand(2026, 3, {"M": 2}, [], ["M", "N"])[(10, "M")] == 2
+
+def test_decompose_groups_and_shifts():
+    employees = [{"name": "a", "group": "urgences"}, {"name": "b", "group": "urgences"},
+                 {"name": "c", "group": "bloc", "shifts": ["M"]}, {"name": "d", "group": "bloc", "shifts": ["N"]}]
+    components = decompose(employees, {}, ["M", "N"])
+    assert {(c["group"], tuple(c["agents"]), tuple(c["shifts"])) for c in components} == {
+        ("urgences", (0, 1), ("M", "N")), ("bloc", (2,), ("M",)), ("bloc", (3,), ("N",))}
+
+def test_scheduler_team_through_engine():
+    employees = [{"name": f"Agent {i}", "sex": "M"} for i in range(6)] + [{"name": "Mme Mliyani", "sex": "F"}]
+    leaves = {"Agent 1": [3, 4]}
+    params = {"holidays": [16], "history": {"Agent 0": ["REP", "DAY", "NIGHT"]}, "stop_rules": {"max_time": 5}}
+    engine_employees, engine_params = from_scheduler_config(2026, 3, employees, leaves, params)
+    result = solve_engine(2026, 3, engine_employees, leaves, engine_params)
+    assert result["status"] in ("OPTIMAL", "FEASIBLE")
+    assert validate_schedule(2026, 3, employees, leaves, params, result["matrix"])["valid"]
+    assert list(result["schedule"].columns) == ["Jour", "Date", "Semaine", "Matin", "Nuit"]
+
+def test_large_group_with_lns():
+    employees = [{"name": f"A{i}"} for i in range(20)] + [{"name": f"B{i}", "group": "B", "shifts": ["M"]} for i in range(3)]
+    leaves = {"A0": [5, 6, 7], "A3": [20]}
+    params = {"shift_types": SHIFT_TYPES, "demand": {"M": 3, "A": 3, "N": 2}, "group_demand": {"B": {"M": 1}},
+              "forbidden_sequences": [["N", "M"], ["N", "A"], ["A", "M"]], "stop_rules": {"max_time": 4}}
+    result = solve_engine(2026, 3, employees, leaves, params)
+    assert result["status"] == "FEASIBLE"
+    main = [c for c in result["components"] if c["group"] is None][0]
+    assert main["lns_iterations"] > 0
+    matrix = result["matrix"]
+    for i, (code, count) in enumerate([("M", 3), ("A", 3), ("N", 2)]):
+        assert ((matrix[:20] == i).sum(axis=0) == count).all()
+    assert ((matrix[20:] == 0).sum(axis=0) == 1).all() and (matrix[20:] <= 0).all()
+    assert (matrix[0, 4:7] == -1).all() and matrix[3, 19] == -1
+    night, morning, afternoon = matrix[:, :-1] == 2, matrix[:, 1:] == 0, matrix[:, 1:] == 1
+    assert not np.any(night & (morning | afternoon))
+    assert not np.any((matrix[:, :-1] == 1) & morning)
+    # Pénalités recalculées sur le planning (sans historique), pas lues sur les indicateurs
+    worked = np.pad(matrix >= 0, ((0, 0), (1, 1)))
+    isolated = worked[:, 1:-1] & ~worked[:, :-2] & ~worked[:, 2:]
+    over = sum(worked[:, 1 + d:7 + d].all(axis=1).sum() for d in range(matrix.shape[1] - 5))
+    assert result["penalties_by_rule"].get("isolated_work", 0) == 200 * isolated.sum()
+    assert result["penalties_by_rule"].get("over_consecutive", 0) == 1500 * over
+
+def test_penalties_of_first_lns_solution():
+    # Arrêt juste après la première solution du LNS (résolue sans objectif) : les écarts ne sont
+    # bornés que par en dessous, les pénalités sont recalculées sur le planning
+    stop_event = threading.Event()
+    run = engine._run
+
+    def first_solve_only(solver, model, stop):
+        status = run(solver, model, stop)
+        stop_event.set()
+        return status
+
+    employees = [{"name": f"A{i}"} for i in range(16)]
+    params = {"shift_types": SHIFT_TYPES, "demand": {"M": 3, "A": 3, "N": 2}, "stop_rules": {"max_time": 4}}
+    engine._run = first_solve_only
+    try:
+        result = solve_engine(2026, 3, employees, {}, params, stop_event=stop_event)
+    finally:
+        engine._run = run
+    assert result["components"][0]["lns_iterations"] == 0
+    matrix = result["matrix"]
+    # 31 jours, aucun congé : part de chacun = 248 / 16, 93 / 16 (M, A) et 62 / 16 (N), arrondies
+    workload = 100 * np.abs((matrix >= 0).sum(axis=1) - 16).sum()
+    balance = 20 * sum(np.abs((matrix == i).sum(axis=1) - target).sum() for i, target in enumerate([6, 6, 4]))
+    assert result["penalties_by_rule"].get("workload", 0) == workload
+    assert result["penalties_by_rule"].get("shift_balance", 0) == balance
+    assert result["objective"] == sum(result["penalties_by_rule"].values())
+
+def test_shift_without_agent_is_infeasible():
+    result = solve_engine(2026, 3, [{"name": "a", "shifts": ["M"]}], {},
+                          {"shift_types": SHIFT_TYPES[:1] + SHIFT_TYPES[2:], "demand": {"M": 1, "N": 1}})
+    assert result["status"] == "INFEASIBLE" and result["matrix"] is None
+
+if __name__ == "__main__":
+    test_daily_demand_precedence()
+    test_decompose_groups_and_shifts()
+    test_scheduler_team_through_engine()
+    test_large_group_with_lns()
+    test_penalties_of_first_lns_solution()
+    test_shift_without_agent_is_infeasible()
+    print("OK: engine")
@@ -0,0 +1,68 @@
+import io
+import os
+import tempfile
+import zipfile
+
+import numpy as np
+from openpyxl import load_workbook
+
+from export_utils import export_bundle, generate_excel, generate_workbook, schedule_sheets, store_entries, workbook_entries
+from schedule_matrix import schedule_frame
+from schedule_store import ScheduleStore
+
+NAMES = ["Agent A", "Agent B", "Agent C"]
+MATRIX = np.tile(np.array([[0, 1, -1], [1, -1, 0], [-1, 0, 1]], dtype=np.int8), (1, 11))[:, :31]
+SCHEDULE = schedule_frame(MATRIX, NAMES, 2026, 3)
+RESULT = {"status": "OPTIMAL", "objective": 120, "wall_time": 1.5, "penalties_by_rule": {"isolated_rest": 100}}
+
+def test_single_workbook_with_all_views():
+    wb = load_workbook(io.BytesIO(generate_workbook(SCHEDULE, MATRIX, NAMES, [31, 31, 30], RESULT)))
+    assert wb.sheetnames == ["Planning", "Par agent", "Statistiques", "Diagnostics"]
+    pivot = wb["Par agent"]
+    assert pivot.max_column == 32 and pivot["AF1"].value == 31  # Au-delà de la colonne Z
+    assert pivot.column_dimensions["AF"].width > 0
+    assert [c.value for c in pivot[2]][:4] == ["Agent A", "J", "N", None]
+    assert ("Pénalité : isolated_rest", 100) in [tuple(c.value for c in row) for row in wb["Diagnostics"].iter_rows()]
+    assert load_workbook(io.BytesIO(generate_excel(SCHEDULE))).sheetnames == ["Planning"]
+
+def test_bundles_are_streamed_one_schedule_at_a_time():
+    def entries():
+        for month in (1, 2, 3):
+            yield f"Équipe Nord 2026-{month:02d}", schedule_sheets(SCHEDULE, MATRIX, NAMES, result=RESULT)
+
+    archive = io.BytesIO()
+    assert export_bundle(archive, entries(), "zip") == 3
+    with zipfile.ZipFile(archive) as z:
+        assert z.namelist() == [f"Équipe_Nord_2026-0{m}.xlsx" for m in (1, 2, 3)]
+        assert load_workbook(io.BytesIO(z.read(z.namelist()[0]))).sheetnames == ["Planning", "Par agent", "Diagnostics"]
+
+    single = io.BytesIO()
+    assert export_bundle(single, entries(), "xlsx") == 3
+    wb = load_workbook(single)
+    assert len(wb.sheetnames) == 1 + 3 * 3 and all(len(title) <= 31 for title in wb.sheetnames)
+    assert len(set(wb.sheetnames)) == len(wb.sheetnames)
+    index = [tuple(c.value for c in row) for row in wb["Sommaire"].iter_rows(min_row=2)]
+    assert index[0][0] == "Équipe Nord 2026-01" and index[0][1] in wb.sheetnames
+
+    single.seek(0)
+    (label, sheets), = list(workbook_entries([single], labels=["tous"]))
+    assert label == "tous" and sheets[1][0] == wb.sheetnames[1] and len(sheets[1][1]) == 31
+
+def test_year_of_published_schedules():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ScheduleStore(os.path.join(tmp, "plannings.db"))
+        for team in ("Nord", "Sud"):
+            store.save_schedule(team, 2026, 3, NAMES, MATRIX, {"Agent B": [4]})
+        store.save_schedule("Nord", 2025, 12, NAMES, MATRIX)
+        path = os.path.join(tmp, "annee.zip")
+        assert export_bundle(path, store_entries(store, year=2026), "zip") == 2
+        with zipfile.ZipFile(path) as z:
+            assert z.namelist() == ["Nord_2026-03.xlsx", "Sud_2026-03.xlsx"]
+            stats = load_workbook(io.BytesIO(z.read("Nord_2026-03.xlsx")))["Statistiques"]
+            assert [c.value for c in stats["E"]][1:] == [round(100 * 21 / 31, 1), 70.0, round(100 * 20 / 31, 1)]
+
+if __name__ == "__main__":
+    test_single_workbook_with_all_views()
+    test_bundles_are_streamed_one_schedule_at_a_time()
+    test_year_of_published_schedules()
+    print("OK: export")
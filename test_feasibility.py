@@ -0,0 +1,57 @@
+from feasibility import analyze_feasibility, check_counts, describe, find_conflict, solve_checked
+
+MALES = [{"name": f"Agent {i}", "sex": "M"} for i in range(6)]
+EMPLOYEES = MALES + [{"name": "Mme Mliyani", "sex": "F"}]
+
+def test_feasible_month():
+    analysis = analyze_feasibility(2026, 3, EMPLOYEES, {"Agent 1": [3, 4]}, {"holidays": [16]})
+    assert analysis["feasible"] is True
+    assert analysis["issues"] == [] and analysis["conflict"] == []
+    assert describe(analysis) == []
+
+def test_counting_detects_missing_agents():
+    leaves = {f"Agent {i}": [20] for i in range(5)}  # 1 agent + l'agente le 20 : 4 requis
+    issues = check_counts(2026, 3, EMPLOYEES, leaves, {})
+    assert {(i["rule"], i["day"]) for i in issues} >= {("shift_capacity", 20), ("daily_capacity", 20)}
+    analysis = analyze_feasibility(2026, 3, EMPLOYEES, leaves, {})
+    assert analysis["feasible"] is False
+    assert any("Jour 20" in line and "Agent 0" in line for line in describe(analysis))
+
+def test_history_night_blocks_first_morning():
+    params = {"history": {f"Agent {i}": ["REP", "REP", "NIGHT"] for i in range(3)}}
+    issues = check_counts(2026, 3, MALES[:4], {}, params)
+    assert ("shift_capacity", 1) not in {(i["rule"], i["day"]) for i in issues}
+    params = {"history": {f"Agent {i}": ["REP", "REP", "NIGHT"] for i in range(4)}}
+    issues = check_counts(2026, 3, MALES[:4], {}, params)
+    assert any(i["rule"] == "shift_capacity" and i["day"] == 1 and i["shift"] == 0 for i in issues)
+
+def test_minimal_conflict():
+    # 6 agents (2 par poste) : 3 congés le 10 suffisent à rendre le mois impossible
+    leaves = {f"Agent {i}": [10] for i in range(5)}
+    found = find_conflict(2026, 3, MALES, leaves, {}, time_limit=10)
+    assert found["status"] == "INFEASIBLE"
+    kinds = sorted(item["kind"] for item in found["conflict"])
+    assert kinds == ["leave", "leave", "leave", "staffing"]
+    assert all(item["day"] == 10 for item in found["conflict"])
+    assert "Combinaison impossible" in describe({"issues": [], "conflict": found["conflict"]})[0]
+
+def test_solve_checked():
+    # Mois impossible : expliqué, sans résolution complète
+    leaves = {f"Agent {i}": [10] for i in range(3)}
+    params = {"num_workers": 1, "stop_rules": {"max_time": 5}}
+    result = solve_checked(2026, 3, MALES, leaves, params)
+    assert result["status"] == "INFEASIBLE" and result["schedule"] is None
+    assert result["feasibility"]["feasible"] is False and describe(result["feasibility"])
+    # Mois réalisable : comptage seul, sans recherche de conflit CP-SAT ; résultats de même format
+    solved = solve_checked(2026, 3, EMPLOYEES, {"Agent 1": [3, 4]}, params)
+    assert solved["schedule"] is not None
+    assert solved["feasibility"]["feasible"] is None and solved["feasibility"]["issues"] == []
+    assert set(result) == set(solved)
+
+if __name__ == "__main__":
+    test_feasible_month()
+    test_counting_detects_missing_agents()
+    test_history_night_blocks_first_morning()
+    test_minimal_conflict()
+    test_solve_checked()
+    print("OK: feasibility")
@@ -1,4 +1,5 @@
 from scheduler import generate_schedule
+from schedule_matrix import schedule_to_matrix, DAY, NIGHT, REST
 import sys
 import pandas as pd
 
@@ -29,20 +30,19 @@ def test_history_and_night_balance():
         df = generate_schedule(year, month, employees, {}, {"history": history})
         if df is not None:
             print("SUCCESS: Schedule generated.", flush=True)
+            # Matrice agent×jour : pas de test de sous-chaîne sur les noms ("Agent A" in "Agent AB")
+            names = [e["name"] for e in employees]
+            matrix = schedule_to_matrix(df, names)
             
             # 1. Vérif Agent A (Transition Nuit -> Matin au 1er jour)
-            first_day_matin = df.iloc[0]["Matin"]
-            if "Agent A" in first_day_matin:
+            if matrix[names.index("Agent A"), 0] == DAY:
                 print("ERROR: Agent A assigned to Matin on Day 1 after NIGHT on D-1")
             else:
                 print("OK: Agent A transition respected.")
 
             # 2. Vérif Agent B (Sequence max 4)
             # Puisque Agent B a fait 3 jours (D-3, D-2, D-1), il ne peut travailler que le jour 1 max.
-            b_work_days = []
-            for i, row in df.iterrows():
-                if "Agent B" in row["Matin"] or "Agent B" in row["Nuit"]:
-                    b_work_days.append(row["Jour"])
+            b_work_days = [d + 1 for d in range(matrix.shape[1]) if matrix[names.index("Agent B"), d] != REST]
             
             # Si travaille jour 1 et 2 -> Erreur (3+2=5)
             if 1 in b_work_days and 2 in b_work_days:
@@ -52,8 +52,9 @@ def test_history_and_night_balance():
 
             # 3. Vérif Écart Nuits
             nights = {}
-            for name in [e["name"] for e in employees if e["sex"]=="M"]:
-                nights[name] = sum(1 for row in df["Nuit"] if name in row)
+            for n, emp in enumerate(employees):
+                if emp["sex"] == "M":
+                    nights[emp["name"]] = int((matrix[n] == NIGHT).sum())
             
             max_n = max(nights.values())
             min_n = min(nights.values())
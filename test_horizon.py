@@ -0,0 +1,47 @@
+import calendar
+
+from horizon import history_from_matrix, month_sequence, solve_horizon
+from scheduler import score_schedule
+from schedule_matrix import DAY, NIGHT
+from validator import validate_schedule
+
+EMPLOYEES = [{"name": f"Agent {c}", "sex": "M"} for c in "ABCD"]
+NAMES = [e["name"] for e in EMPLOYEES]
+
+def test_horizon_chains_history_and_fairness():
+    assert month_sequence(2026, 11, 3) == [(2026, 11), (2026, 12), (2027, 1)]
+    leaves = {"2026-02": {"Agent A": [10, 11, 12]}, (2026, 3): {"Agent B": [1, 2]}}
+    result = solve_horizon(2026, 1, 3, EMPLOYEES, leaves, {"stop_rules": {"max_time": 5}}, time_budget=15)
+    assert [(r["year"], r["month"]) for r in result["months"]] == [(2026, 1), (2026, 2), (2026, 3)]
+    assert result["status"] in ("OPTIMAL", "FEASIBLE")
+
+    for prev, cur in zip(result["months"], result["months"][1:]):
+        # Pas de Matin le 1er du mois après une Nuit le dernier jour du mois précédent
+        assert not ((prev["matrix"][:, -1] == NIGHT) & (cur["matrix"][:, 0] == DAY)).any()
+    assert result["history"] == history_from_matrix(result["months"][-1]["matrix"], NAMES)
+
+    # Les compteurs reportés couvrent tout l'horizon
+    carry = result["carry_over"]
+    assert sum(c["day"] + c["night"] for c in carry.values()) == 2 * (31 + 28 + 31)
+    assert carry["Agent A"]["available"] == 31 + 28 + 31 - 3
+    # Week-ends de janvier à mars 2026 : 9 + 8 + 9 jours, 2 postes par jour (moins de 6 agents)
+    assert sum(c["weekend"] for c in carry.values()) == 2 * (9 + 8 + 9)
+
+    # Le mois de mars est noté avec son historique et les compteurs de janvier-février
+    march = result["months"][2]
+    weekends = {m: [calendar.weekday(2026, m, d) >= 5 for d in range(1, calendar.monthrange(2026, m)[1] + 1)]
+                for m in (1, 2)}
+    params = {"history": history_from_matrix(result["months"][1]["matrix"], NAMES),
+              "carry_over": {n: {"day": int((sum((r["matrix"][i] == DAY).sum() for r in result["months"][:2]))),
+                                 "night": int((sum((r["matrix"][i] == NIGHT).sum() for r in result["months"][:2]))),
+                                 "weekend": int(sum((r["matrix"][i, weekends[r["month"]]] >= 0).sum()
+                                                    for r in result["months"][:2])),
+                                 "available": 31 + 28 - (3 if n == "Agent A" else 0)}
+                             for i, n in enumerate(NAMES)}}
+    score = score_schedule(2026, 3, EMPLOYEES, leaves[(2026, 3)], params, march["matrix"])
+    assert score is not None and score <= march["objective"]
+    assert validate_schedule(2026, 3, EMPLOYEES, leaves[(2026, 3)], params, march["matrix"])["objective"] == score
+
+if __name__ == "__main__":
+    test_horizon_chains_history_and_fairness()
+    print("OK: horizon")
@@ -0,0 +1,86 @@
+import threading
+
+import scheduler
+from scheduler import OBJECTIVE_TIERS, solve_schedule
+from validator import ScheduleValidator
+
+EMPLOYEES = [
+    {"name": "Agent A", "sex": "M"},
+    {"name": "Agent B", "sex": "M"},
+    {"name": "Agent C", "sex": "F"},
+    {"name": "Agent D", "sex": "M"},
+    {"name": "Agent E", "sex": "M"},
+]
+LEAVES = {"Agent B": [10, 11], "Agent C": [20]}
+
+
+def _tier_penalty(result, rules):
+    return sum(amount for rule, amount in result["penalties_by_rule"].items() if rule in rules)
+
+
+def test_lexicographic_tiers():
+    params = {"objective_mode": "lexicographic", "stop_rules": {"max_time": 9}}
+    result = solve_schedule(2026, 2, EMPLOYEES, LEAVES, params)
+    assert result["schedule"] is not None
+    report = ScheduleValidator(2026, 2, EMPLOYEES, LEAVES, params).validate(result["schedule"])
+    assert report["valid"] and report["objective"] == result["objective"]
+    # Un résultat par niveau, dans l'ordre ; la pénalité finale respecte chaque niveau atteint
+    assert [t["rules"][:len(rules)] for t, rules in zip(result["tiers"], OBJECTIVE_TIERS)] == \
+        OBJECTIVE_TIERS[:len(result["tiers"])]
+    for tier in result["tiers"]:
+        assert _tier_penalty(result, tier["rules"]) <= tier["objective"]
+        assert tier["best_bound"] <= tier["objective"]
+    assert result["objective"] == sum(result["penalties_by_rule"].values())
+    assert result["best_bound"] <= result["objective"] + 1e-6
+    assert abs(sum(t["wall_time"] for t in result["tiers"]) - result["wall_time"]) < 1e-6
+
+
+def test_lexicographic_prioritizes_first_tier():
+    # Règles critiques d'abord, toutes les autres ensuite : elles ne peuvent plus les dégrader
+    tiers = [["mandatory_weekday", "over_consecutive", "over_rest", "bad_nrj"], []]
+    infos = []
+    result = solve_schedule(2026, 2, EMPLOYEES, LEAVES,
+                            {"objective_mode": "lexicographic", "objective_tiers": tiers,
+                             "stop_rules": {"max_time": 6}}, on_solution=infos.append)
+    weighted = solve_schedule(2026, 2, EMPLOYEES, LEAVES, {"stop_rules": {"max_time": 6}})
+    assert result["tiers"][0]["rules"] == tiers[0]
+    assert _tier_penalty(result, tiers[0]) <= _tier_penalty(weighted, tiers[0])
+    # Progression : pénalité totale et niveau en cours
+    assert infos and all("stage" in info for info in infos)
+    assert infos[-1]["stage"] == len(result["tiers"]) - 1
+
+
+def test_lexicographic_stopped_during_later_tier():
+    # Arrêt (« Garder cette solution ») au début du 2e niveau, avant sa première solution :
+    # le planning du 1er niveau est conservé
+    stop_event = threading.Event()
+    solve_model, stages = scheduler._solve_model, []
+
+    def stopped_at_second_stage(ctx, params, *args):
+        if stages:
+            stop_event.set()
+        result = solve_model(ctx, params, *args)
+        if stages: # Ce que rend CP-SAT arrêté avant toute solution
+            result.update(schedule=None, matrix=None, status="UNKNOWN", objective=None, best_bound=None, gap=None)
+        stages.append(result)
+        return result
+
+    scheduler._solve_model = stopped_at_second_stage
+    try:
+        result = solve_schedule(2026, 2, EMPLOYEES, LEAVES, {"objective_mode": "lexicographic",
+                                                              "stop_rules": {"max_time": 6}}, stop_event=stop_event)
+    finally:
+        scheduler._solve_model = solve_model
+    assert len(stages) == 2
+    assert result["matrix"] is not None and (result["matrix"] == stages[0]["matrix"]).all()
+    assert [t["objective"] is not None for t in result["tiers"]] == [True, False]
+    assert result["status"] == "FEASIBLE"
+    assert result["best_bound"] == result["tiers"][0]["best_bound"]
+    assert result["objective"] == sum(result["penalties_by_rule"].values())
+
+
+if __name__ == "__main__":
+    test_lexicographic_tiers()
+    test_lexicographic_prioritizes_first_tier()
+    test_lexicographic_stopped_during_later_tier()
+    print("OK: lexicographic")
@@ -0,0 +1,51 @@
+import os
+import tempfile
+from scheduler import _build_model, score_schedule, solve_schedule
+from model_template import TemplateCache, build_model_from_template, get_template, template_key, template_supported
+
+EMPLOYEES = [{"name": f"Agent {i}", "sex": "M"} for i in range(5)] + [{"name": "Mme Mliyani", "sex": "F"}]
+
+def test_key_depends_on_shape_only():
+    k1 = template_key(2026, 3, EMPLOYEES, {"Agent 1": [3, 4]}, {"holidays": [5]})
+    k2 = template_key(2026, 3, EMPLOYEES, {"Agent 2": [10]}, {"history": {"Agent 0": ["DAY", "DAY", "NIGHT"]}})
+    assert k1 == k2
+    assert k1 != template_key(2026, 4, EMPLOYEES, {}, {})  # Autre calendrier
+    assert k1 != template_key(2026, 3, EMPLOYEES[::-1], {}, {})  # Autre composition
+    assert k1 != template_key(2026, 3, EMPLOYEES, {"Agent 1": list(range(1, 32)), "Agent 2": [1]}, {})  # max_consecutive_work = 5
+
+def test_same_objective_as_standard_model():
+    leaves = {"Agent 1": [3, 4, 5], "Mme Mliyani": [9]}
+    params = {"holidays": [2, 16], "history": {"Agent 0": ["DAY", "NIGHT", "NIGHT"], "Mme Mliyani": ["REP", "DAY", "DAY"]},
+              "carry_over": {"Agent 0": {"day": 12, "night": 10, "weekend": 6, "available": 59}},
+              "stop_rules": {"max_time": 5}, "num_workers": 4}
+    result = solve_schedule(2026, 3, EMPLOYEES, leaves, {**params, "model": "template"})
+    assert result["matrix"] is not None
+    standard = score_schedule(2026, 3, EMPLOYEES, leaves, params, result["matrix"])
+    template = score_schedule(2026, 3, EMPLOYEES, leaves, {**params, "model": "template"}, result["matrix"])
+    assert standard == template
+    assert standard <= result["objective"]
+
+def test_template_shared_through_disk():
+    with tempfile.TemporaryDirectory() as tmp:
+        template = get_template(2026, 3, EMPLOYEES, {}, {}, TemplateCache(tmp))
+        assert len(os.listdir(tmp)) == 1
+        # Un autre processus (nouvelle instance) relit le gabarit depuis le disque
+        assert TemplateCache(tmp).get(template["key"])["proto"] == template["proto"]
+        ctx = build_model_from_template(2026, 3, EMPLOYEES, {"Agent 1": [7]}, {"holidays": [2]}, TemplateCache(tmp))
+        assert len(ctx["shifts"]) == len(EMPLOYEES) * 31 * 2
+        assert len(os.listdir(tmp)) == 1
+
+def test_repair_falls_back_to_standard_model():
+    params = {"freeze_before": 10, "frozen_schedule": None}
+    assert not template_supported(2026, 3, EMPLOYEES, {}, params)
+    assert not template_supported(2026, 3, EMPLOYEES, {"Agent 1": list(range(1, 32))}, {})  # Aucun jour disponible
+    ctx = build_model_from_template(2026, 3, EMPLOYEES, {"Agent 1": list(range(1, 32))}, {})
+    assert ctx["inputs"] is None
+    assert len(ctx["model"].Proto().variables) == len(_build_model(2026, 3, EMPLOYEES, {"Agent 1": list(range(1, 32))}, {})["model"].Proto().variables)
+
+if __name__ == "__main__":
+    test_key_depends_on_shape_only()
+    test_same_objective_as_standard_model()
+    test_template_shared_through_disk()
+    test_repair_falls_back_to_standard_model()
+    print("OK: model template")
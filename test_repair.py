@@ -0,0 +1,37 @@
+from scheduler import solve_schedule, repair_schedule
+from schedule_matrix import schedule_to_matrix, REST
+
+EMPLOYEES = [
+    {"name": "Agent A", "sex": "M"},
+    {"name": "Agent B", "sex": "M"},
+    {"name": "Agent C", "sex": "M"},
+    {"name": "Agent D", "sex": "M"},
+]
+NAMES = [e["name"] for e in EMPLOYEES]
+
+def test_repair_freezes_past_days():
+    base = solve_schedule(2026, 2, EMPLOYEES, {}, {"stop_rules": {"max_time": 5}})
+    assert base["schedule"] is not None
+
+    # Agent A tombe malade les jours 20 et 21 : on répare à partir du 20
+    repaired = repair_schedule(2026, 2, EMPLOYEES, {}, {"stop_rules": {"max_time": 5}},
+                               base["schedule"], 20, {"Agent A": [20, 21]})
+    assert repaired["schedule"] is not None
+
+    before = schedule_to_matrix(base["schedule"], NAMES)
+    after = schedule_to_matrix(repaired["schedule"], NAMES)
+    assert (before[:, :19] == after[:, :19]).all()
+    assert (after[0, 19:21] == REST).all()
+
+def test_full_freeze_scores_published_schedule():
+    base = solve_schedule(2026, 2, EMPLOYEES, {}, {"stop_rules": {"max_time": 5}})
+    # Tout figer revient à évaluer le planning publié : plus aucune variable de poste,
+    # l'objectif ne peut pas dépasser celui de la solution d'origine
+    scored = repair_schedule(2026, 2, EMPLOYEES, {}, {}, base["schedule"], 29)
+    assert scored["status"] == "OPTIMAL"
+    assert scored["objective"] <= base["objective"]
+
+if __name__ == "__main__":
+    test_repair_freezes_past_days()
+    test_full_freeze_scores_published_schedule()
+    print("OK: repair mode")
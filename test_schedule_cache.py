@@ -0,0 +1,50 @@
+import os
+import tempfile
+import pandas as pd
+from schedule_cache import ScheduleCache, schedule_key
+
+EMPLOYEES = [{"name": "Agent A", "sex": "M"}, {"name": "Mme Mliyani", "sex": "F"}]
+
+def test_key_is_canonical():
+    k1 = schedule_key(2026, 2, EMPLOYEES, {"Agent A": [3, 1]}, {"holidays": [5, 2]})
+    k2 = schedule_key(2026, 2, EMPLOYEES, {"Agent A": [1, 3, 3], "Mme Mliyani": []}, {"holidays": [2, 5]})
+    k3 = schedule_key(2026, 2, EMPLOYEES, {"Agent A": [1, 4]}, {"holidays": [2, 5]})
+    assert k1 == k2
+    assert k1 != k3
+    # Planning précédent : simple indice sans pénalité de changement
+    previous = {"Agent A": [0, 1, -1], "Mme Mliyani": [-1, 0, 0]}
+    k4 = schedule_key(2026, 2, EMPLOYEES, {"Agent A": [3, 1]}, {"holidays": [5, 2], "previous_schedule": previous,
+                                                                "change_penalty": 0})
+    k5 = schedule_key(2026, 2, EMPLOYEES, {"Agent A": [3, 1]}, {"holidays": [5, 2], "previous_schedule": previous,
+                                                                "change_penalty": 50})
+    assert k4 == k1
+    assert k5 != k1
+
+def test_memory_and_disk_tiers():
+    with tempfile.TemporaryDirectory() as tmp:
+        result = {"schedule": pd.DataFrame({"Jour": [1], "Matin": ["Agent A"]}), "status": "OPTIMAL", "objective": 12.0}
+        ScheduleCache(tmp).put("abc", result)
+        # Un autre processus (nouvelle instance) relit l'entrée depuis le disque
+        hit = ScheduleCache(tmp).get("abc")
+        assert hit["objective"] == 12.0
+        assert hit["schedule"].equals(result["schedule"])
+        # Les résultats non définitifs ne sont pas conservés (une nouvelle résolution peut les améliorer)
+        ScheduleCache(tmp).put("timeout", {"schedule": None, "status": "UNKNOWN"})
+        assert ScheduleCache(tmp).get("timeout") is None
+        ScheduleCache(tmp).put("feasible", {**result, "status": "FEASIBLE"})
+        assert ScheduleCache(tmp).get("feasible") is None
+
+def test_size_based_eviction():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = ScheduleCache(tmp, max_bytes=3000, memory_items=1)
+        for i in range(10):
+            cache.put(f"k{i}", {"status": "OPTIMAL", "payload": "x" * 1000})
+        total = sum(os.path.getsize(os.path.join(tmp, f)) for f in os.listdir(tmp))
+        assert total <= 3000
+        assert cache.get("k9") is not None
+
+if __name__ == "__main__":
+    test_key_is_canonical()
+    test_memory_and_disk_tiers()
+    test_size_based_eviction()
+    print("OK: schedule cache")
@@ -0,0 +1,37 @@
+import numpy as np
+
+from scheduler import solve_schedule
+from schedule_matrix import schedule_frame, schedule_pivot, schedule_stats, schedule_to_matrix, DAY, NIGHT, REST
+
+EMPLOYEES = [
+    {"name": "Agent A", "sex": "M"},
+    {"name": "Agent AB", "sex": "M"},  # Préfixe d'un autre nom
+    {"name": "Agent B", "sex": "M"},
+    {"name": "Agent BC", "sex": "M"},
+]
+NAMES = [e["name"] for e in EMPLOYEES]
+
+def test_result_matrix_and_views():
+    result = solve_schedule(2026, 2, EMPLOYEES, {"Agent AB": [3, 4]}, {"stop_rules": {"max_time": 5}})
+    matrix = result["matrix"]
+    assert result["agents"] == NAMES
+    assert matrix.dtype == np.int8 and matrix.shape == (4, 28)
+    assert (matrix[1, 2:4] == REST).all()
+
+    # Le DataFrame est dérivé de la matrice, et la matrice se relit à l'identique
+    frame = schedule_frame(matrix, NAMES, 2026, 2)
+    assert frame.equals(result["schedule"])
+    assert (schedule_to_matrix(result["schedule"], NAMES) == matrix).all()
+
+    pivot = schedule_pivot(matrix, NAMES)
+    assert list(pivot.index) == NAMES and list(pivot.columns) == list(range(1, 29))
+    assert ((pivot.values == "J") == (matrix == DAY)).all()
+    assert ((pivot.values == "N") == (matrix == NIGHT)).all()
+
+    stats = schedule_stats(matrix, NAMES, [28, 26, 28, 28])
+    assert stats["Total"].tolist() == (matrix != REST).sum(axis=1).tolist()
+    assert stats["Total"].sum() == 2 * 28  # Un agent par poste et par jour (< 6 agents)
+
+if __name__ == "__main__":
+    test_result_matrix_and_views()
+    print("OK: schedule matrix")
@@ -0,0 +1,51 @@
+import datetime
+import os
+import tempfile
+
+import numpy as np
+
+from horizon import accumulate_carry_over, history_from_matrix
+from schedule_matrix import DAY, NIGHT
+from schedule_store import ScheduleStore
+
+NAMES = ["Agent A", "Agent AB", "Agent B"]
+
+def test_store_history_and_fairness():
+    rng = np.random.default_rng(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ScheduleStore(os.path.join(tmp, "plannings.db"))
+        jan = rng.integers(-1, 2, (3, 31)).astype(np.int8)
+        feb = rng.integers(-1, 2, (3, 28)).astype(np.int8)
+        store.save_schedule("Nord", 2026, 1, NAMES, jan, {"Agent B": [5, 6]}, {"status": "OPTIMAL", "objective": 12})
+        store.save_schedule("Nord", 2026, 2, NAMES, feb)
+        store.save_schedule("Sud", 2026, 2, NAMES, np.zeros((3, 28), dtype=np.int8))
+        # Republier un mois remplace ses lignes
+        store.save_schedule("Nord", 2026, 2, NAMES, feb)
+
+        names, matrix = store.load_schedule("Nord", 2026, 1)
+        assert names == NAMES and (matrix == jan).all()
+        assert store.load_schedule("Nord", 2026, 3) is None
+        assert store.teams() == ["Nord", "Sud"]
+
+        assert store.history("Nord", 2026, 3, NAMES) == history_from_matrix(feb, NAMES)
+        assert store.history("Nord", 2026, 1, NAMES) == {name: ["REP"] * 3 for name in NAMES}
+
+        counts = store.fairness_counts("Nord", 2026, 3, NAMES)
+        both = np.concatenate([jan, feb], axis=1)
+        assert [c["day"] for c in counts.values()] == (both == DAY).sum(axis=1).tolist()
+        assert [c["night"] for c in counts.values()] == (both == NIGHT).sum(axis=1).tolist()
+        assert counts["Agent B"]["available"] == 31 + 28 - 2
+        weekend = [(datetime.date(2026, 1, 1) + datetime.timedelta(days=k)).weekday() >= 5 for k in range(31 + 28)]
+        assert [c["weekend"] for c in counts.values()] == (both[:, weekend] >= 0).sum(axis=1).tolist()
+
+        # Même report d'équité que le mode horizon
+        expected = accumulate_carry_over({}, jan, NAMES, {"Agent B": [5, 6]}, 2026, 1)
+        expected = accumulate_carry_over(expected, feb, NAMES, {}, 2026, 2)
+        assert store.carry_over("Nord", 2026, 3, NAMES) == expected
+
+        params = store.prepare_params("Nord", 2026, 3, [{"name": n, "sex": "M"} for n in NAMES], {"history": {}})
+        assert params["history"] == history_from_matrix(feb, NAMES) and params["carry_over"] == expected
+
+if __name__ == "__main__":
+    test_store_history_and_fairness()
+    print("OK: schedule store")
@@ -0,0 +1,37 @@
+import numpy as np
+
+from scheduler import solve_schedule
+from solution_pool import solve_alternatives
+from validator import validate_schedule
+
+EMPLOYEES = [{"name": f"Agent {i}", "sex": "M"} for i in range(6)] + [{"name": "Mme Mliyani", "sex": "F"}]
+LEAVES = {"Agent 1": [3, 4]}
+PARAMS = {"holidays": [16], "stop_rules": {"max_time": 4}}
+
+def test_alternatives_are_valid_and_diverse():
+    out = solve_alternatives(2026, 3, EMPLOYEES, LEAVES, PARAMS, count=3, min_changes=12)
+    solutions = out["solutions"]
+    assert len(solutions) == 3
+    for sol in solutions:
+        assert validate_schedule(2026, 3, EMPLOYEES, LEAVES, PARAMS, sol["matrix"])["valid"]
+    for i in range(3):
+        for j in range(i):
+            assert np.count_nonzero(solutions[i]["matrix"] != solutions[j]["matrix"]) >= 12
+    ref, alt = solutions[0], solutions[1]
+    assert ref["delta"] == 0 and ref["differences"] == []
+    assert alt["delta"] == alt["objective"] - ref["objective"]
+    assert alt["changed_days"] == len(alt["differences"]) >= 12
+    assert sorted({diff["agent"] for diff in alt["differences"]}) == sorted(alt["affected"])
+
+def test_reference_from_previous_solve():
+    best = solve_schedule(2026, 3, EMPLOYEES, LEAVES, PARAMS)
+    # Aucun planning ne peut différer de toutes les journées + 1 : la session s'arrête à la référence
+    out = solve_alternatives(2026, 3, EMPLOYEES, LEAVES, PARAMS, count=2, min_changes=7 * 31 + 1, best=best)
+    assert out["status"] == "INFEASIBLE"
+    assert len(out["solutions"]) == 1
+    assert (out["solutions"][0]["matrix"] == best["matrix"]).all()
+
+if __name__ == "__main__":
+    test_alternatives_are_valid_and_diverse()
+    test_reference_from_previous_solve()
+    print("OK: solution pool")
@@ -0,0 +1,64 @@
+import time
+
+from schedule_matrix import REST
+from scheduler import repair_schedule, solve_schedule
+from solution_pool import solve_alternatives
+from solve_jobs import CANCELLED, DONE, SolveJobManager
+
+EMPLOYEES = [{"name": f"Agent {c}", "sex": "M"} for c in "ABCDEF"] + [{"name": "Mme G", "sex": "F"}]
+
+def wait(job, timeout):
+    start = time.monotonic()
+    while not job.done and time.monotonic() - start < timeout:
+        time.sleep(0.1)
+    return job
+
+def test_background_jobs_progress_and_cancel():
+    manager = SolveJobManager(max_jobs=2)
+    params = {"stop_rules": {"max_time": 60}, "num_workers": 2}
+    keep = manager.get(manager.submit(2026, 2, EMPLOYEES, {}, params))
+    drop = manager.get(manager.submit(2026, 3, EMPLOYEES, {}, params))
+
+    while keep.latest is None or drop.latest is None:
+        time.sleep(0.1)
+    assert not keep.done and keep.progress
+
+    # L'annulation arrête réellement la recherche, bien avant le délai de 60 s
+    keep.cancel(keep_best=True)
+    drop.cancel()
+    assert wait(keep, 10).status == DONE and keep.elapsed < 30
+    assert keep.result["schedule"] is not None
+    assert keep.result["objective"] <= keep.progress[0][1]
+    assert wait(drop, 10).status == CANCELLED
+
+    manager.forget(keep.id)
+    assert manager.get(keep.id) is None
+    manager.shutdown()
+
+def test_background_repair():
+    manager = SolveJobManager(max_jobs=1)
+    params = {"stop_rules": {"max_time": 3}, "num_workers": 1}
+    published = solve_schedule(2026, 2, EMPLOYEES, {}, params)["matrix"]
+    # Autre calcul soumis au pool : réparation à partir du 15 avec un arrêt maladie
+    job = manager.get(manager.submit(2026, 2, EMPLOYEES, {"Agent A": [15, 16]}, params, solve=repair_schedule,
+                                     published=published, from_day=15))
+    assert wait(job, 30).status == DONE and job.partial
+    assert (job.result["matrix"][:, :14] == published[:, :14]).all()
+    assert (job.result["matrix"][0, 14:16] == REST).all()
+    manager.shutdown()
+
+def test_background_alternatives():
+    manager = SolveJobManager(max_jobs=1)
+    params = {"stop_rules": {"max_time": 2}, "num_workers": 1}
+    # Rappel propre à la fonction soumise : chaque alternative trouvée est un résultat intermédiaire
+    job = manager.get(manager.submit(2026, 2, EMPLOYEES, {}, params, solve=solve_alternatives,
+                                     callback="on_result", count=3, min_changes=5))
+    assert wait(job, 60).status == DONE
+    assert len(job.result["solutions"]) == 3 and len(job.partial) == 2
+    manager.shutdown()
+
+if __name__ == "__main__":
+    test_background_jobs_progress_and_cancel()
+    test_background_repair()
+    test_background_alternatives()
+    print("OK: solve jobs")
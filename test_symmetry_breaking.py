@@ -0,0 +1,32 @@
+from scheduler import _agent_classes, solve_schedule
+from schedule_matrix import schedule_to_matrix, REST
+
+EMPLOYEES = [
+    {"name": "Agent A", "sex": "M"},
+    {"name": "Agent B", "sex": "M"},
+    {"name": "Agent C", "sex": "M"},
+    {"name": "Agent D", "sex": "M"},
+    {"name": "Mme Mliyani", "sex": "F"},
+]
+
+def test_agent_classes():
+    leaves = {"Agent C": [4, 5]}
+    history = {"Agent D": ["REP", "REP", "NIGHT"]}
+    classes = _agent_classes(EMPLOYEES, leaves, {"history": history})
+    # Seuls A et B sont interchangeables (C a des congés, D un historique, Mliyani est F)
+    assert classes == [[0, 1]]
+
+def test_symmetry_breaking_keeps_agent_rules():
+    names = [e["name"] for e in EMPLOYEES]
+    leaves = {"Agent A": [1, 2, 3], "Agent B": [1, 2, 3]}
+    result = solve_schedule(2026, 2, EMPLOYEES, leaves, {"stop_rules": {"max_time": 3}, "random_seed": 7})
+    assert result["schedule"] is not None
+    matrix = schedule_to_matrix(result["schedule"], names)
+    # Après redistribution des noms, les congés de chaque agent restent respectés
+    assert (matrix[:2, :3] == REST).all()
+    assert (matrix != REST).any(axis=1).all()
+
+if __name__ == "__main__":
+    test_agent_classes()
+    test_symmetry_breaking_keeps_agent_rules()
+    print("OK: symmetry breaking")
@@ -0,0 +1,38 @@
+from benchmark import make_instance
+from scheduler import score_schedule, solve_schedule
+
+EMPLOYEES = [
+    {"name": "Agent A", "sex": "M"},
+    {"name": "Agent B", "sex": "M"},
+    {"name": "Agent C", "sex": "F"},
+    {"name": "Agent D", "sex": "M"},
+]
+
+def test_penalty_breakdown_sums_to_objective():
+    for model in ("standard", "compact"):
+        result = solve_schedule(2026, 2, EMPLOYEES, {"Agent B": [10, 11]},
+                                {"model": model, "stop_rules": {"max_time": 5}})
+        assert result["schedule"] is not None
+        # La ventilation par règle et par agent reconstitue exactement l'objectif
+        assert sum(result["penalties_by_rule"].values()) == result["objective"]
+        assert sum(result["penalties_by_agent"].values()) == result["objective"]
+        assert sum(row["penalty"] for row in result["penalty_breakdown"]) == result["objective"]
+        # Les familles de règles couvrent toutes les variables et contraintes du modèle
+        assert sum(s["variables"] for s in result["model_size"].values()) == result["num_variables"]
+        assert sum(s["constraints"] for s in result["model_size"].values()) == result["num_constraints"]
+        assert result["build_time"] >= 0 and result["num_branches"] >= 0
+
+def test_penalty_breakdown_of_interrupted_search():
+    # Solution non optimale : des indicateurs peuvent valoir 1 sans violation de leur fenêtre ;
+    # la pénalité rapportée reste celle du planning, évaluée au plus juste par score_schedule
+    instance = make_instance("size05", 5, num_females=1, num_days=30)
+    args = (instance["year"], instance["month"], instance["employees"], instance["leaves"])
+    result = solve_schedule(*args, {**instance["params"], "stop_rules": {"max_time": 5}})
+    assert result["matrix"] is not None
+    assert result["objective"] == score_schedule(*args, instance["params"], result["matrix"])
+    assert sum(row["penalty"] for row in result["penalty_breakdown"]) == result["objective"]
+
+if __name__ == "__main__":
+    test_penalty_breakdown_sums_to_objective()
+    test_penalty_breakdown_of_interrupted_search()
+    print("OK: telemetry")
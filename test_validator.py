@@ -0,0 +1,59 @@
+import numpy as np
+
+from scheduler import solve_schedule, score_schedule
+from schedule_matrix import schedule_to_matrix, NIGHT
+from validator import ScheduleValidator, validate_schedule
+
+EMPLOYEES = [
+    {"name": "Agent A", "sex": "M"},
+    {"name": "Agent B", "sex": "M"},
+    {"name": "Agent C", "sex": "M"},
+    {"name": "Agent D", "sex": "M"},
+    {"name": "Mme E", "sex": "F"},
+]
+NAMES = [e["name"] for e in EMPLOYEES]
+LEAVES = {"Agent B": [9, 10, 11], "Mme E": [2]}
+PARAMS = {"holidays": [5], "history": {"Agent A": ["DAY", "DAY", "NIGHT"], "Agent C": ["REP", "NIGHT", "NIGHT"]},
+          "carry_over": {"Agent A": {"day": 9, "night": 8, "weekend": 7, "available": 31},
+                         "Agent D": {"day": 7, "night": 9, "weekend": 3, "available": 31}},
+          "stop_rules": {"max_time": 5}}
+
+def test_validator_matches_solver_score():
+    result = solve_schedule(2026, 2, EMPLOYEES, LEAVES, PARAMS)
+    report = validate_schedule(2026, 2, EMPLOYEES, LEAVES, PARAMS, result["schedule"])
+    assert report["valid"], report["violations"]
+    assert report["objective"] == score_schedule(2026, 2, EMPLOYEES, LEAVES, PARAMS, result["schedule"])
+    assert sum(report["penalties_by_rule"].values()) == report["objective"]
+
+    # Démarrage à chaud : la pénalité de changement est comptée comme dans le modèle
+    params = {**PARAMS, "previous_schedule": result["schedule"], "change_penalty": 50}
+    other = solve_schedule(2026, 2, EMPLOYEES, LEAVES, {**PARAMS, "random_seed": 7})
+    report = validate_schedule(2026, 2, EMPLOYEES, LEAVES, params, other["schedule"])
+    assert report["objective"] == score_schedule(2026, 2, EMPLOYEES, LEAVES, params, other["schedule"])
+
+def test_validator_reports_hard_violations():
+    result = solve_schedule(2026, 2, EMPLOYEES, LEAVES, PARAMS)
+    validator = ScheduleValidator(2026, 2, EMPLOYEES, LEAVES, PARAMS)
+    matrix = schedule_to_matrix(result["schedule"], NAMES, validator.num_days)
+
+    broken = matrix.copy()
+    broken[4, 1] = NIGHT  # Agente de nuit, un jour de congé
+    rules = {v["rule"] for v in validator.validate(broken)["violations"]}
+    assert {"female_night", "leaves", "capacity"} <= rules
+    assert score_schedule(2026, 2, EMPLOYEES, LEAVES, PARAMS, broken) is None
+
+    # Notation par lot
+    scores = validator.score(np.stack([matrix, broken]))
+    assert scores["num_violations"][0] == 0 and scores["num_violations"][1] > 0
+    assert scores["objective"][0] == validator.validate(matrix)["objective"]
+
+    # Saisie manuelle : un agent sur deux postes le même jour
+    edited = result["schedule"].copy()
+    edited.loc[0, "Matin"] = edited.loc[0, "Matin"] + ", " + edited.loc[0, "Nuit"].split(",")[0]
+    rules = {v["rule"] for v in validator.validate(edited)["violations"]}
+    assert "one_shift_per_day" in rules
+
+if __name__ == "__main__":
+    test_validator_matches_solver_score()
+    test_validator_reports_hard_violations()
+    print("OK: validator")
@@ -0,0 +1,70 @@
+from scheduler import score_schedule, solve_schedule
+from schedule_matrix import DAY, NIGHT, REST
+from validator import validate_schedule
+
+EMPLOYEES = [
+    {"name": "Agent A", "sex": "M"},
+    {"name": "Agent B", "sex": "M"},
+    {"name": "Agent C", "sex": "M"},
+    {"name": "Agent D", "sex": "M"},
+]
+# Pénalité de changement bien supérieure à toutes les autres : le nouveau planning
+# ne modifie que les journées qui doivent l'être
+CHANGE_PENALTY = 100000
+
+
+def _replaceable_day(matrix):
+    """(agent, jour) travaillé par un agent qu'un collègue au repos peut remplacer sans autre changement."""
+    num_days = matrix.shape[1]
+    for d in range(1, num_days - 1):
+        for n in range(len(matrix)):
+            s = matrix[n, d]
+            if s == REST:
+                continue
+            for other in range(len(matrix)):
+                if matrix[other, d] != REST:
+                    continue
+                if s == DAY and matrix[other, d - 1] == NIGHT or s == NIGHT and matrix[other, d + 1] == DAY:
+                    continue
+                return n, d + 1
+    raise AssertionError("aucun jour remplaçable")
+
+
+def test_new_leave_moves_only_required_days():
+    base = solve_schedule(2026, 2, EMPLOYEES, {}, {"stop_rules": {"max_time": 5}})
+    assert base["matrix"] is not None
+    n, day = _replaceable_day(base["matrix"])
+    leaves = {EMPLOYEES[n]["name"]: [day]}
+    params = {"previous_schedule": base["matrix"], "change_penalty": CHANGE_PENALTY, "stop_rules": {"max_time": 5}}
+    result = solve_schedule(2026, 2, EMPLOYEES, leaves, params)
+    assert result["matrix"] is not None and result["matrix"][n, day - 1] == REST
+
+    # L'agent en congé et son remplaçant, le jour du congé seulement
+    changed = result["matrix"] != base["matrix"]
+    assert changed.sum() == 2 and changed[:, day - 1].sum() == 2
+    # Chaque journée modifiée compte une fois
+    assert result["penalties_by_rule"]["change"] == 2 * CHANGE_PENALTY
+    assert result["objective"] == score_schedule(2026, 2, EMPLOYEES, leaves, params, result["matrix"])
+
+
+def test_swapped_shifts_count_once_per_day():
+    base = solve_schedule(2026, 2, EMPLOYEES, {}, {"stop_rules": {"max_time": 5}})
+    params = {"previous_schedule": base["matrix"], "change_penalty": CHANGE_PENALTY}
+    # Matin et Nuit échangés entre deux agents un même jour : deux journées modifiées
+    for d in range(base["matrix"].shape[1]):
+        swapped = base["matrix"].copy()
+        column = swapped[:, d]
+        column[column >= 0] = 1 - column[column >= 0]
+        report = validate_schedule(2026, 2, EMPLOYEES, {}, params, swapped)
+        if report["valid"]:
+            break
+    else:
+        raise AssertionError("aucun échange valide")
+    assert report["penalties_by_rule"]["change"] == 2 * CHANGE_PENALTY
+    assert report["objective"] == score_schedule(2026, 2, EMPLOYEES, {}, params, swapped)
+
+
+if __name__ == "__main__":
+    test_new_leave_moves_only_required_days()
+    test_swapped_shifts_count_once_per_day()
+    print("OK: warm start")
@@ -0,0 +1,46 @@
+from scheduler import solve_schedule
+from validator import validate_schedule
+from what_if import evaluate_leave_requests, merge_leaves
+
+EMPLOYEES = [{"name": f"Agent {i}", "sex": "M"} for i in range(6)] + [{"name": "Mme Mliyani", "sex": "F"}]
+LEAVES = {"Agent 1": [3, 4]}
+PARAMS = {"holidays": [16], "stop_rules": {"max_time": 10}}
+
+def test_merge_leaves():
+    assert merge_leaves(LEAVES, {"Agent 1": [4, 5], "Agent 2": [9]}) == {"Agent 1": [3, 4, 5], "Agent 2": [9]}
+    assert LEAVES == {"Agent 1": [3, 4]}
+
+def test_scenarios_against_base_schedule():
+    base = solve_schedule(2026, 3, EMPLOYEES, LEAVES, PARAMS)
+    requests = [
+        {"id": "ok", "agent": "Agent 2", "days": [10, 11, 12]},
+        {"id": "everyone", "leaves": {e["name"]: [20] for e in EMPLOYEES}},  # Plus personne le 20 : irréalisable
+    ]
+    seen = []
+    out = evaluate_leave_requests(2026, 3, EMPLOYEES, LEAVES, PARAMS, requests, base_schedule=base["matrix"],
+                                  on_result=seen.append)
+    ok, everyone = out["scenarios"]
+    assert [sc["id"] for sc in out["scenarios"]] == ["ok", "everyone"] and len(seen) == 2
+    assert out["base"]["objective"] == validate_schedule(2026, 3, EMPLOYEES, LEAVES, PARAMS, base["matrix"])["objective"]
+
+    assert ok["feasible"] is True
+    report = validate_schedule(2026, 3, EMPLOYEES, {"Agent 1": [3, 4], "Agent 2": [10, 11, 12]}, PARAMS, ok["matrix"])
+    assert report["valid"]
+    assert ok["delta"] == report["objective"] - out["base"]["objective"]
+    assert (ok["matrix"][2, 9:12] == -1).all()  # Jours de congé d'Agent 2 en repos
+    changed = [name for name, a, b in zip(base["agents"], base["matrix"], ok["matrix"]) if (a != b).any()]
+    assert ok["affected"] == changed
+
+    assert everyone["feasible"] is False
+    assert everyone["delta"] is None and everyone["matrix"] is None
+
+    # Démarrage à chaud de l'application : le changement par rapport au planning précédent n'est pas noté
+    warm = {**PARAMS, "previous_schedule": ok["matrix"], "change_penalty": 50}
+    out = evaluate_leave_requests(2026, 3, EMPLOYEES, LEAVES, warm, [], base_schedule=base["matrix"])
+    assert "change" not in out["base"]["penalties_by_rule"]
+    assert out["base"]["objective"] == validate_schedule(2026, 3, EMPLOYEES, LEAVES, PARAMS, base["matrix"])["objective"]
+
+if __name__ == "__main__":
+    test_merge_leaves()
+    test_scenarios_against_base_schedule()
+    print("OK: what-if")
@@ -0,0 +1,265 @@
+"""
+Validation et notation d'un planning sans solveur (NumPy).
+
+Reproduit exactement les règles de scheduler._build_model : mêmes fenêtres
+(historique inclus, repos supposé après la fin du mois), mêmes seuils adaptatifs
+et mêmes poids (PENALTY_WEIGHTS). Pour un planning sans violation de règle DURE,
+l'objectif calculé est celui du solveur (cf. scheduler.score_schedule).
+
+Les plannings sont traités par lots : une pile de matrices agent×jour de forme
+(lot, agents, jours) est évaluée en une seule passe de fenêtres glissantes.
+"""
+import calendar
+import datetime
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from schedule_matrix import DAY, NIGHT, REST, _split_names, schedule_to_matrix
+from scheduler import PENALTY_WEIGHTS, _carry_over, _history_code
+
+# Matrice étendue : 4 colonnes avant le 1er du mois (jours -3 .. 0, le jour 0 étant la veille)
+# et 4 jours de repos après la fin du mois. Comme dans le modèle, le jour -3 est toujours un repos.
+_BEFORE = 4
+_AFTER = 4
+
+# Agent des violations/pénalités qui concernent toute l'équipe
+TEAM = "Équipe"
+
+
+class ScheduleValidator:
+    """
+    Règles compilées pour un mois, une équipe, des congés et des paramètres donnés.
+
+    Construire le validateur une fois, puis appeler `score` sur autant de lots de
+    plannings que nécessaire (quelques microsecondes par planning).
+    """
+
+    def __init__(self, year, month, employees, leaves, params):
+        self.year, self.month = year, month
+        self.employees = employees
+        self.names = [e['name'] for e in employees]
+        self.num_days = num_days = calendar.monthrange(year, month)[1]
+        num_employees = len(employees)
+        history = params.get("history", {})
+        holidays = set(params.get("holidays", []))
+
+        self.capacity = 1 if num_employees < 6 else 2
+        total_monthly_leaves = sum(len(leaves.get(name, [])) for name in self.names)
+        self.max_consecutive_work = 5 if total_monthly_leaves > 31 else 4
+        self.freeze_before = params.get("freeze_before", 1)
+
+        # Historique des jours -2 .. 0 (colonnes 1 .. 3 de la matrice étendue)
+        self.history = np.array([[_history_code(history, name, d) for d in (-2, -1, 0)] for name in self.names],
+                                dtype=np.int8).reshape(num_employees, 3)
+
+        self.female = np.array([e['sex'] == 'F' for e in employees], dtype=bool)
+        self.male = np.array([e['sex'] == 'M' for e in employees], dtype=bool)
+
+        self.leave = np.zeros((num_employees, num_days), dtype=bool)
+        for n, name in enumerate(self.names):
+            for d in leaves.get(name, []):
+                if 1 <= d <= num_days:
+                    self.leave[n, d - 1] = True
+        # Compteurs reportés des mois précédents (mode horizon) : matin, nuit, week-end, jours disponibles
+        carry = np.array([_carry_over(params, name) for name in self.names], dtype=np.int64).reshape(num_employees, 4)
+        self.carry_day, self.carry_night, self.carry_weekend = carry[:, 0], carry[:, 1], carry[:, 2]
+        self.avail = np.array([num_days - len(leaves.get(name, [])) for name in self.names], dtype=np.int64) + carry[:, 3]
+
+        weekday = np.array([datetime.date(year, month, d).weekday() for d in range(1, num_days + 1)])
+        off = (weekday >= 5) | np.isin(np.arange(1, num_days + 1), list(holidays))
+        self.day_off = off
+        self.weekend = weekday >= 5
+        self.mandatory = (weekday <= 3) & ~off & ~self.leave  # (agents, jours)
+        self.friday = (weekday == 4) & ~off & ~self.leave
+
+        self.previous = None
+        self.change_penalty = params.get("change_penalty", 0)
+        if params.get("previous_schedule") is not None and self.change_penalty:
+            prev = schedule_to_matrix(params["previous_schedule"], self.names, num_days)
+            self.previous = prev
+            self.previous_known = ~(prev == REST).all(axis=1)
+
+    def _extend(self, matrices):
+        """Matrice étendue (lot, agents, _BEFORE + jours + _AFTER) : index k = jour + 3."""
+        batch, num_employees, _ = matrices.shape
+        ext = np.full((batch, num_employees, _BEFORE + self.num_days + _AFTER), REST, dtype=np.int8)
+        ext[:, :, 1:_BEFORE] = self.history
+        ext[:, :, _BEFORE:_BEFORE + self.num_days] = matrices
+        return ext
+
+    @staticmethod
+    def _windows(flags, first_day, last_day, length):
+        """Nombre de fenêtres de `length` jours entièrement vraies, débutant entre first_day et last_day."""
+        if last_day < first_day:
+            return np.zeros(flags.shape[:2], dtype=np.int64)
+        windows = sliding_window_view(flags, length, axis=-1)[:, :, first_day + 3:last_day + 4]
+        return windows.all(axis=-1).sum(axis=-1)
+
+    @staticmethod
+    def _days(flags, first_day, last_day, shift=0):
+        """Vue des jours first_day+shift .. last_day+shift (indices de la matrice étendue)."""
+        return flags[:, :, first_day + 3 + shift:last_day + 4 + shift]
+
+    def counts(self, matrices):
+        """
+        Compte, pour chaque planning du lot, les occurrences de chaque règle.
+
+        Args:
+            matrices (np.ndarray): Plannings de forme (lot, agents, jours) ou (agents, jours).
+
+        Returns:
+            tuple: (violations, penalties), deux dicts {règle: tableau}.
+                Violations DURES : (lot, agents, jours) booléens, ou (lot, jours, postes)
+                pour la capacité. Pénalités : unités par agent (lot, agents), ou (lot,)
+                pour ratio_gap et weekend_gap ; la pénalité est l'unité × PENALTY_WEIGHTS[règle].
+        """
+        matrices = np.asarray(matrices, dtype=np.int8)
+        if matrices.ndim == 2:
+            matrices = matrices[None]
+        T = self.num_days
+        fb = self.freeze_before
+        ext = self._extend(matrices)
+        work, day, night = ext >= 0, ext == DAY, ext == NIGHT
+        month_day, month_night = matrices == DAY, matrices == NIGHT
+        active = np.arange(1, T + 1) >= fb  # Jours non figés (règles DURES)
+
+        violations = {}
+        counts = np.stack([month_day.sum(axis=1), month_night.sum(axis=1)], axis=-1)  # (lot, jours, postes)
+        violations["capacity"] = (counts != self.capacity) & active[None, :, None]
+        n2d = self._days(night, 0, T - 1) & self._days(day, 1, T)  # Nuit la veille (historique inclus) puis Jour
+        violations["night_to_day"] = n2d & (np.arange(1, T + 1) >= max(1, fb))
+        violations["leaves"] = (matrices >= 0) & self.leave & active
+        violations["female_night"] = month_night & self.female[:, None] & active
+        violations["female_day_off"] = month_day & self.female[:, None] & self.day_off & active
+
+        penalties = {}
+        female, male = self.female[:, None], self.male
+        penalties["mandatory_weekday"] = (~month_day & self.mandatory & female).sum(axis=-1)
+        penalties["friday"] = (month_day & self.friday & female).sum(axis=-1)
+
+        # Équité : ratio (postes / jours disponibles) sur 1000, écart interne Matin/Nuit et
+        # postes de week-end (hommes)
+        rated = self.avail != 0
+        mornings = month_day.sum(axis=-1) + self.carry_day
+        nights = month_night.sum(axis=-1) + self.carry_night
+        total = mornings + nights
+        internal = np.abs(mornings - nights) * (male & rated)
+        penalties["internal_balance"] = internal
+        penalties["internal_over3"] = (internal > 3).astype(np.int64)
+        penalties["internal_over4"] = (internal > 4).astype(np.int64)
+        if rated.sum() >= 2:
+            ratio = (total[:, rated] * 1000) // self.avail[rated]
+            penalties["ratio_gap"] = ratio.max(axis=-1) - ratio.min(axis=-1)
+        else:
+            penalties["ratio_gap"] = np.zeros(len(matrices), dtype=np.int64)
+        weekend_men = male & rated
+        if weekend_men.sum() >= 2:
+            weekends = (matrices >= 0)[:, weekend_men][:, :, self.weekend].sum(axis=-1) + self.carry_weekend[weekend_men]
+            penalties["weekend_gap"] = weekends.max(axis=-1) - weekends.min(axis=-1)
+        else:
+            penalties["weekend_gap"] = np.zeros(len(matrices), dtype=np.int64)
+
+        # Séquences (historique inclus, repos après la fin du mois)
+        mcw = self.max_consecutive_work
+        rest = ~work
+        penalties["over_consecutive"] = self._windows(work, -3, T - mcw, mcw + 1)
+        penalties["over_same"] = (self._windows(day, -1, T - 2, 3) + self._windows(night, -1, T - 2, 3)) * male
+        penalties["isolated_work"] = (self._days(work, 0, T) & self._days(rest, 0, T, -1)
+                                      & self._days(rest, 0, T, 1)).sum(axis=-1)
+        penalties["over_rest"] = self._windows(rest, -2, T - 3, 5)
+        penalties["isolated_rest"] = (self._days(rest, 0, T - 1) & self._days(work, 0, T - 1, -1)
+                                      & self._days(work, 0, T - 1, 1)).sum(axis=-1)
+        penalties["rest4"] = self._windows(rest, -2, T - 3, 4)
+        gap_rest = self._days(rest, 0, T - 3, 1)
+        penalties["bad_nrj"] = (self._days(night, 0, T - 3) & gap_rest & self._days(day, 0, T - 3, 2)).sum(axis=-1)
+        penalties["bad_nrn"] = (self._days(night, 0, T - 3) & gap_rest & self._days(night, 0, T - 3, 2)).sum(axis=-1)
+        penalties["bad_jrj"] = (self._days(day, 0, T - 3) & gap_rest & self._days(day, 0, T - 3, 2)).sum(axis=-1)
+
+        if self.previous is not None:
+            changed = (matrices != self.previous) & active & self.previous_known[:, None]
+            penalties["change"] = changed.sum(axis=-1)
+        return violations, penalties
+
+    def _weight(self, rule):
+        return self.change_penalty if rule == "change" else PENALTY_WEIGHTS[rule]
+
+    def score(self, matrices):
+        """
+        Note un lot de plannings.
+
+        Returns:
+            dict: {objective: (lot,) pénalité totale, num_violations: (lot,) violations DURES}
+        """
+        violations, penalties = self.counts(matrices)
+        objective = sum(np.asarray(units).reshape(len(units), -1).sum(axis=-1) * self._weight(rule)
+                        for rule, units in penalties.items())
+        num_violations = sum(v.reshape(len(v), -1).sum(axis=-1) for v in violations.values())
+        return {"objective": objective.astype(np.int64), "num_violations": num_violations.astype(np.int64)}
+
+    def validate(self, schedule):
+        """
+        Valide un planning (DataFrame Jour/Matin/Nuit ou matrice agent×jour).
+
+        Returns:
+            dict: valid (bool), violations ([{rule, agent, day, shift}]), objective,
+                penalties_by_rule, penalties_by_agent, penalty_breakdown (même format
+                que le résultat de scheduler.solve_schedule).
+        """
+        found = []
+        if isinstance(schedule, pd.DataFrame):
+            found = _dataframe_violations(schedule, self.names)
+        matrix = schedule_to_matrix(schedule, self.names, self.num_days)
+        violations, penalties = self.counts(matrix)
+
+        shift_names = {DAY: "Matin", NIGHT: "Nuit"}
+        for rule, flags in violations.items():
+            for _, i, j in np.argwhere(flags[:1]):
+                if rule == "capacity":
+                    found.append({"rule": rule, "agent": TEAM, "day": int(i) + 1, "shift": shift_names[int(j)]})
+                else:
+                    found.append({"rule": rule, "agent": self.names[i], "day": int(j) + 1,
+                                  "shift": shift_names.get(int(matrix[i, j]))})
+        found.sort(key=lambda v: (v["day"], v["rule"], v["agent"]))
+
+        by_rule_agent = {}
+        for rule, units in penalties.items():
+            units = np.asarray(units)[0]
+            agents = [TEAM] if units.ndim == 0 else self.names
+            for agent, unit in zip(agents, np.atleast_1d(units)):
+                amount = int(unit) * self._weight(rule)
+                if amount:
+                    by_rule_agent[(rule, agent)] = by_rule_agent.get((rule, agent), 0) + amount
+        by_rule, by_agent = {}, {}
+        for (rule, agent), amount in by_rule_agent.items():
+            by_rule[rule] = by_rule.get(rule, 0) + amount
+            by_agent[agent] = by_agent.get(agent, 0) + amount
+        return {
+            "valid": not found,
+            "violations": found,
+            "objective": sum(by_rule.values()),
+            "penalties_by_rule": dict(sorted(by_rule.items(), key=lambda kv: -kv[1])),
+            "penalties_by_agent": by_agent,
+            "penalty_breakdown": [{"rule": rule, "agent": agent, "penalty": amount}
+                                  for (rule, agent), amount in sorted(by_rule_agent.items())],
+        }
+
+
+def _dataframe_violations(schedule, names):
+    """Erreurs de saisie propres au format DataFrame : double poste le même jour, agent inconnu."""
+    known = set(names)
+    found = []
+    for _, row in schedule.iterrows():
+        day = int(row["Jour"])
+        morning, night = _split_names(row.get("Matin")), _split_names(row.get("Nuit"))
+        for name in sorted(set(morning) & set(night)):
+            found.append({"rule": "one_shift_per_day", "agent": name, "day": day, "shift": None})
+        for name in sorted(set(morning + night) - known):
+            found.append({"rule": "unknown_agent", "agent": name, "day": day, "shift": None})
+    return found
+
+
+def validate_schedule(year, month, employees, leaves, params, schedule):
+    """Raccourci : ScheduleValidator(...).validate(schedule)."""
+    return ScheduleValidator(year, month, employees, leaves, params).validate(schedule)
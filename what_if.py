@@ -0,0 +1,148 @@
+"""
+Simulation de demandes de congés (« et si ? ») avant leur validation.
+
+Chaque demande (jours de congé ajoutés à un ou plusieurs agents) devient un
+scénario résolu à partir de la configuration de base :
+- délai court par scénario, scénarios résolus en parallèle (cœurs répartis) ;
+- le planning de base sert d'indice au solveur, et une pénalité de changement
+  minimale départage les solutions équivalentes au profit de la plus proche ;
+- les modèles sont instanciés depuis le cache de gabarits (model_template.py) :
+  les scénarios d'un même mois ne reconstruisent pas le modèle.
+
+Pour chaque scénario : faisabilité, écart de pénalité avec le planning de base
+(noté par validator.ScheduleValidator, indépendamment du solveur), écart par
+règle (dont l'équité) et agents dont le planning change.
+"""
+import calendar
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from schedule_matrix import schedule_to_matrix
+from scheduler import solve_schedule
+from validator import ScheduleValidator
+
+# Délai par scénario (s) et arrêt anticipé sans amélioration
+DEFAULT_TIME_LIMIT = 2.0
+DEFAULT_NO_IMPROVEMENT = 0.5
+# Pénalité par journée modifiée : ne fait que départager des solutions de même pénalité
+# (au plus un « vendredi » de l'agente par changement évité)
+WHAT_IF_CHANGE_PENALTY = 1
+
+# Règles d'équité (règle 6) : leur écart est résumé dans "fairness_delta"
+FAIRNESS_RULES = ("ratio_gap", "internal_balance", "internal_over3", "internal_over4", "weekend_gap")
+
+
+def request_leaves(request):
+    """Congés ajoutés par une demande : {"agent", "days"} ou {"leaves": {nom: [jours]}}."""
+    if "leaves" in request:
+        return {name: list(days) for name, days in request["leaves"].items()}
+    return {request["agent"]: list(request["days"])}
+
+
+def merge_leaves(leaves, added):
+    """Congés de base complétés par `added` (jours triés, dédoublonnés)."""
+    merged = {name: list(days) for name, days in leaves.items()}
+    for name, days in added.items():
+        merged[name] = sorted(set(merged.get(name, [])) | set(days))
+    return merged
+
+
+def _score(year, month, employees, leaves, params, matrix):
+    # Pénalités des règles seules : le coût de changement par rapport au planning précédent de
+    # l'appelant (démarrage à chaud) n'est pas une perte d'équité
+    params = {key: value for key, value in params.items() if key not in ("previous_schedule", "change_penalty")}
+    report = ScheduleValidator(year, month, employees, leaves, params).validate(matrix)
+    return report["objective"], report["penalties_by_rule"]
+
+
+def _feasibility(status):
+    """
+    True / False, ou None si le délai n'a permis ni solution ni preuve d'infaisabilité
+    (ou si le modèle est invalide : erreur du modèle, pas un refus ; cf. le statut du scénario).
+    """
+    if status in ("OPTIMAL", "FEASIBLE"):
+        return True
+    if status == "INFEASIBLE":
+        return False
+    return None
+
+
+def evaluate_leave_requests(year, month, employees, leaves, params, requests, base_schedule=None,
+                            time_limit=DEFAULT_TIME_LIMIT, jobs=None, stop_event=None, on_result=None):
+    """
+    Évalue des demandes de congés par rapport à une configuration de base.
+
+    Args:
+        leaves (dict): Congés déjà accordés {nom: [jours]}.
+        params (dict): Paramètres de la configuration de base (fériés, historique, ...) ;
+            params["num_workers"] limite les cœurs de toute la simulation (défaut : tous).
+        requests (list): Demandes {"agent": nom, "days": [jours]} ou {"leaves": {nom: [jours]}},
+            avec un "id" facultatif.
+        base_schedule: Planning de base (matrice agent×jour, DataFrame ou dict nom -> ligne) ;
+            résolu avec `params` s'il n'est pas fourni.
+        time_limit (float): Délai maximal par scénario (s).
+        jobs (int): Scénarios résolus simultanément (défaut : un par cœur).
+        stop_event (threading.Event): Interrompt les scénarios en cours et à venir.
+        on_result (callable): Appelée avec chaque scénario évalué (dans l'ordre d'achèvement).
+
+    Returns:
+        dict: base ({status, objective, penalties_by_rule, matrix}), scenarios (même ordre que
+            `requests` : {id, leaves, status, feasible, objective, delta, rule_deltas,
+            fairness_delta, affected, changed_days, wall_time, matrix}), wall_time.
+    """
+    start = time.monotonic()
+    names = [e['name'] for e in employees]
+    num_days = calendar.monthrange(year, month)[1]
+    base_status = "PROVIDED"
+    if base_schedule is None:
+        base_run = solve_schedule(year, month, employees, leaves, params, stop_event=stop_event)
+        base_status, base_schedule = base_run["status"], base_run["matrix"]
+    base = {"status": base_status, "objective": None, "penalties_by_rule": {}, "matrix": None}
+    if base_schedule is not None:
+        base["matrix"] = schedule_to_matrix(base_schedule, names, num_days)
+        base["objective"], base["penalties_by_rule"] = _score(year, month, employees, leaves, params, base["matrix"])
+
+    cores = int(params.get("num_workers") or os.cpu_count() or 1)
+    jobs = max(1, min(jobs or cores, len(requests) or 1))
+    scenario_params = {
+        **params,
+        "model": "template",
+        "stop_rules": {"max_time": time_limit, "no_improvement": DEFAULT_NO_IMPROVEMENT},
+        "num_workers": max(1, cores // jobs),
+    }
+    if base["matrix"] is not None:
+        scenario_params["previous_schedule"] = base["matrix"]
+        scenario_params["change_penalty"] = WHAT_IF_CHANGE_PENALTY
+
+    def evaluate(i, request):
+        added = request_leaves(request)
+        scenario_leaves = merge_leaves(leaves, added)
+        scenario = {"id": request.get("id", i), "leaves": added, "status": "UNKNOWN", "feasible": None,
+                    "objective": None, "delta": None, "rule_deltas": {}, "fairness_delta": None,
+                    "affected": [], "changed_days": None, "wall_time": 0.0, "matrix": None}
+        if stop_event is not None and stop_event.is_set():
+            return scenario
+        result = solve_schedule(year, month, employees, scenario_leaves, scenario_params, stop_event=stop_event)
+        scenario.update(status=result["status"], feasible=_feasibility(result["status"]),
+                        wall_time=result["wall_time"] + result["build_time"], matrix=result["matrix"])
+        if result["matrix"] is not None:
+            scenario["objective"], by_rule = _score(year, month, employees, scenario_leaves, params, result["matrix"])
+            if base["matrix"] is not None:
+                scenario["delta"] = scenario["objective"] - base["objective"]
+                deltas = {rule: by_rule.get(rule, 0) - base["penalties_by_rule"].get(rule, 0)
+                          for rule in sorted(set(by_rule) | set(base["penalties_by_rule"]))}
+                scenario["rule_deltas"] = {rule: d for rule, d in deltas.items() if d}
+                scenario["fairness_delta"] = sum(scenario["rule_deltas"].get(rule, 0) for rule in FAIRNESS_RULES)
+                changed = result["matrix"] != base["matrix"]
+                scenario["affected"] = [name for name, row in zip(names, changed) if row.any()]
+                scenario["changed_days"] = int(np.count_nonzero(changed))
+        if on_result is not None:
+            on_result(scenario)
+        return scenario
+
+    with ThreadPoolExecutor(max_workers=jobs, thread_name_prefix="what-if") as pool:
+        scenarios = list(pool.map(evaluate, range(len(requests)), requests))
+    return {"base": base, "scenarios": scenarios, "wall_time": time.monotonic() - start}